@@ -0,0 +1,85 @@
+"""
+Constant-product (Uniswap V2) AMM math.
+
+Pure functions with no I/O so they can be benchmarked and called in tight
+loops. Fees are percentages, matching the ``fee`` field stored on pools
+(0.3 means 0.3%).
+"""
+from typing import List, NamedTuple, Sequence, Tuple
+
+
+class Quote(NamedTuple):
+    amount_out: float
+    fee: float  # Fee charged, expressed in token_out
+    price_impact: float  # Percent move of the execution price away from the mid price
+    mid_price: float  # token_out per token_in before the trade
+    execution_price: float  # token_out per token_in actually received
+
+
+def get_amount_out(amount_in: float, reserve_in: float, reserve_out: float, fee: float = 0.3) -> float:
+    """Output amount for an exact input, as in UniswapV2Library.getAmountOut"""
+    if amount_in <= 0:
+        raise ValueError("Insufficient input amount")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("Insufficient liquidity")
+    amount_in_with_fee = amount_in * (100 - fee)
+    return amount_in_with_fee * reserve_out / (reserve_in * 100 + amount_in_with_fee)
+
+
+def get_amount_in(amount_out: float, reserve_in: float, reserve_out: float, fee: float = 0.3) -> float:
+    """Input amount required for an exact output, as in UniswapV2Library.getAmountIn"""
+    if amount_out <= 0:
+        raise ValueError("Insufficient output amount")
+    if reserve_in <= 0 or reserve_out <= 0 or amount_out >= reserve_out:
+        raise ValueError("Insufficient liquidity")
+    return reserve_in * amount_out * 100 / ((reserve_out - amount_out) * (100 - fee))
+
+
+def price_impact(amount_in: float, reserve_in: float, fee: float = 0.3) -> float:
+    """Price impact in percent of an exact-input trade, excluding the LP fee"""
+    amount_in_with_fee = amount_in * (100 - fee) / 100
+    return amount_in_with_fee / (reserve_in + amount_in_with_fee) * 100
+
+
+def quote_exact_in(amount_in: float, reserve_in: float, reserve_out: float, fee: float = 0.3) -> Quote:
+    """Full quote for an exact-input swap through one pool"""
+    if amount_in <= 0:
+        raise ValueError("Insufficient input amount")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("Insufficient liquidity")
+    amount_in_with_fee = amount_in * (100 - fee) / 100
+    amount_out = amount_in_with_fee * reserve_out / (reserve_in + amount_in_with_fee)
+    amount_out_without_fee = amount_in * reserve_out / (reserve_in + amount_in)
+    return Quote(
+        amount_out,
+        amount_out_without_fee - amount_out,
+        amount_in_with_fee / (reserve_in + amount_in_with_fee) * 100,
+        reserve_out / reserve_in,
+        amount_out / amount_in
+    )
+
+
+def get_amounts_out(amount_in: float, hops: Sequence[Tuple[float, float, float]]) -> List[float]:
+    """Amounts along a multi-hop path; each hop is (reserve_in, reserve_out, fee)"""
+    amounts = [amount_in]
+    for reserve_in, reserve_out, fee in hops:
+        amounts.append(get_amount_out(amounts[-1], reserve_in, reserve_out, fee))
+    return amounts
+
+
+def get_amounts_out_batch(
+    amounts_in: Sequence[float],
+    reserves_in: Sequence[float],
+    reserves_out: Sequence[float],
+    fees: Sequence[float]
+) -> List[float]:
+    """Exact-input outputs for many independent swaps; invalid swaps yield 0.0"""
+    result = []
+    append = result.append
+    for amount_in, reserve_in, reserve_out, fee in zip(amounts_in, reserves_in, reserves_out, fees):
+        if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+            append(0.0)
+            continue
+        amount_in_with_fee = amount_in * (100 - fee)
+        append(amount_in_with_fee * reserve_out / (reserve_in * 100 + amount_in_with_fee))
+    return result
@@ -0,0 +1,162 @@
+"""
+Rebuild OHLCV candles from the full transactions collection.
+
+Candles are computed server-side with an aggregation pipeline, streamed
+back in bucket/pair order and upserted in bulk batches. After every batch
+the last (bucket, pair_key) written is checkpointed. An interrupted run
+resumes where it stopped: trades before the checkpointed bucket are
+filtered out before they are grouped, so the resumed run only aggregates
+what is left.
+
+Usage:
+    python backfill_candles.py                  # all intervals, resume if interrupted
+    python backfill_candles.py --interval 1h    # one interval
+    python backfill_candles.py --reset          # drop candles and checkpoints first
+
+Buckets are overwritten with the recomputed values, so trades recorded
+live while a bucket is being rewritten may be dropped from that bucket;
+run the backfill when traffic is low or re-run it afterwards.
+"""
+from database import db
+from candles import INTERVALS
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+from typing import Optional
+import argparse
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CHECKPOINT_ORDER = "bucket"  # Checkpoints written in pair-first order can't be resumed
+
+
+def candle_pipeline(seconds: int, after: Optional[dict] = None) -> list:
+    """Aggregation computing one document per (pair_key, bucket) for an interval,
+    ordered by bucket then pair and starting after the `after` checkpoint
+    """
+    base_is_in = {"$lte": ["$token0_address", "$token1_address"]}
+    timestamp_ms = {"$toLong": "$timestamp"}
+    match = {"type": "swap", "amount0": {"$gt": 0}, "amount1": {"$gt": 0}}
+    if after:
+        # The checkpointed bucket may be partly written; regroup it whole
+        match["timestamp"] = {"$gte": after["bucket"]}
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"timestamp": 1}},
+        {"$project": {
+            "_id": 0,
+            "timestamp": 1,
+            "pair_key": {"$cond": [
+                base_is_in,
+                {"$concat": ["$token0_address", "_", "$token1_address"]},
+                {"$concat": ["$token1_address", "_", "$token0_address"]}
+            ]},
+            "base_amount": {"$cond": [base_is_in, "$amount0", "$amount1"]},
+            "quote_amount": {"$cond": [base_is_in, "$amount1", "$amount0"]},
+            "bucket": {"$toDate": {"$subtract": [timestamp_ms, {"$mod": [timestamp_ms, seconds * 1000]}]}}
+        }},
+        {"$set": {"price": {"$divide": ["$quote_amount", "$base_amount"]}}},
+        {"$group": {
+            "_id": {"pair_key": "$pair_key", "bucket": "$bucket"},
+            "open": {"$first": "$price"},
+            "close": {"$last": "$price"},
+            "high": {"$max": "$price"},
+            "low": {"$min": "$price"},
+            "open_time": {"$first": "$timestamp"},
+            "close_time": {"$last": "$timestamp"},
+            "volume_base": {"$sum": "$base_amount"},
+            "volume_quote": {"$sum": "$quote_amount"},
+            "trades": {"$sum": 1}
+        }}
+    ]
+    if after:
+        pipeline.append({"$match": {"$or": [
+            {"_id.bucket": {"$gt": after["bucket"]}},
+            {"_id.bucket": after["bucket"], "_id.pair_key": {"$gt": after["pair_key"]}}
+        ]}})
+    pipeline.append({"$sort": {"_id.bucket": 1, "_id.pair_key": 1}})
+    return pipeline
+
+
+async def backfill_interval(interval: str, batch_size: int = BATCH_SIZE) -> int:
+    """Backfill one interval, resuming from its checkpoint; returns candles written"""
+    checkpoint_id = f"candles:{interval}"
+    checkpoint = await db.backfill_checkpoints.find_one({"_id": checkpoint_id})
+    if checkpoint and checkpoint.get("completed"):
+        logger.info(f"Candles {interval}: already backfilled, use --reset to rebuild")
+        return 0
+    after = checkpoint.get("after") if checkpoint else None
+    if after and checkpoint.get("order") != CHECKPOINT_ORDER:
+        logger.info(f"Candles {interval}: checkpoint predates bucket-ordered backfills, starting over")
+        after = None
+    if after:
+        logger.info(f"Candles {interval}: resuming after {after['pair_key']} {after['bucket']}")
+    
+    written = 0
+    batch = []
+    
+    async def flush():
+        nonlocal written, batch
+        if not batch:
+            return
+        await db.candles.bulk_write([op for op, _ in batch], ordered=False)
+        written += len(batch)
+        last = batch[-1][1]
+        await db.backfill_checkpoints.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"after": last, "order": CHECKPOINT_ORDER, "completed": False,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        logger.info(f"Candles {interval}: {written} written, last {last['pair_key']} {last['bucket']}")
+        batch = []
+    
+    cursor = db.transactions.aggregate(
+        candle_pipeline(INTERVALS[interval], after),
+        allowDiskUse=True,
+        batchSize=batch_size
+    )
+    async for doc in cursor:
+        key = doc.pop("_id")
+        batch.append((UpdateOne(
+            {"pair_key": key["pair_key"], "interval": interval, "bucket": key["bucket"]},
+            {"$set": doc},
+            upsert=True
+        ), key))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    
+    await db.backfill_checkpoints.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {"completed": True, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    logger.info(f"Candles {interval}: backfill complete, {written} candles written")
+    return written
+
+
+async def backfill_candles(intervals=None, reset: bool = False, batch_size: int = BATCH_SIZE):
+    """Backfill candles for the given intervals (all by default)"""
+    intervals = intervals or list(INTERVALS)
+    if reset:
+        await db.candles.delete_many({"interval": {"$in": intervals}})
+        await db.backfill_checkpoints.delete_many({"_id": {"$in": [f"candles:{i}" for i in intervals]}})
+        logger.info(f"Dropped candles and checkpoints for {', '.join(intervals)}")
+    await db.candles.create_index([("pair_key", 1), ("interval", 1), ("bucket", 1)], unique=True)
+    for interval in intervals:
+        await backfill_interval(interval, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild OHLCV candles from transactions")
+    parser.add_argument("--interval", choices=list(INTERVALS), action="append",
+                        help="Interval to backfill (repeatable, default: all)")
+    parser.add_argument("--reset", action="store_true", help="Drop existing candles and checkpoints first")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(backfill_candles(args.interval, args.reset, args.batch_size))
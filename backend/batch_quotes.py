@@ -0,0 +1,137 @@
+"""
+Vectorized quoting of many swaps against a snapshot of the pool graph.
+
+Requests are grouped by pair and by order of magnitude of the amount, since
+the best route for a small trade can differ from the best for a large one.
+Each group is routed once with the scalar router at its median amount, then
+every amount is pushed through its group's hops with NumPy in a single pass
+over the whole batch. Amounts are quoted exactly along that route; the route
+itself is only guaranteed best at the median, so a quote near the edge of a
+bucket can come out slightly below what ``/quote`` finds for the same amount.
+"""
+from routing import DEFAULT_MAX_HOPS, PoolGraph
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+DEFAULT_FEE = 0.3
+# Amount buckets per power of ten; each bucket of a pair is routed separately
+BUCKETS_PER_DECADE = 2
+
+
+class BatchQuote(NamedTuple):
+    amount_out: float
+    fee: float  # In token_out
+    price_impact: float  # Percent
+    exchange_rate: float  # Mid price, token_out per token_in
+    pools: List[str]
+    path: List[str]
+    error: Optional[str] = None
+
+
+def quote_many(
+    graph: PoolGraph,
+    requests: Sequence[Tuple[str, str, float]],
+    prices: Dict[str, float],
+    max_hops: int = DEFAULT_MAX_HOPS
+) -> List[BatchQuote]:
+    """Quote (token_in, token_out, amount_in) tuples; addresses must be lowercase.
+
+    ``prices`` maps every known token to its USD price. Pairs without a
+    liquid route get an indicative quote from those prices, like the single
+    quote endpoint: the direct pool's fee applies if one exists.
+    """
+    n = len(requests)
+    amounts = np.array([request[2] for request in requests], dtype=float)
+    reserve_in = np.ones((n, max_hops))
+    reserve_out = np.ones((n, max_hops))
+    fees = np.zeros((n, max_hops))
+    hops = np.zeros((n, max_hops), dtype=bool)
+    price_in = np.zeros(n)
+    price_out = np.zeros(n)
+    indicative_fee = np.full(n, DEFAULT_FEE)
+    errors: List[Optional[str]] = [None] * n
+    routes = [None] * n
+    direct = [None] * n  # Unfunded direct pool behind an indicative quote
+
+    buckets: Dict[Tuple[str, str, int], List[int]] = {}
+    for i, (token_in, token_out, amount_in) in enumerate(requests):
+        if token_in not in prices or token_out not in prices:
+            errors[i] = "Token not found"
+        elif amount_in <= 0:
+            errors[i] = "Insufficient input amount"
+        else:
+            bucket = int(np.floor(np.log10(amount_in) * BUCKETS_PER_DECADE))
+            buckets.setdefault((token_in, token_out, bucket), []).append(i)
+
+    # Route each bucket once at its median amount, then fill the hop arrays for all its rows
+    for (token_in, token_out, _), indexes in buckets.items():
+        rows = np.array(indexes)
+        price_in[rows] = prices[token_in]
+        price_out[rows] = prices[token_out]
+        route = graph.best_route(token_in, token_out, float(np.median(amounts[rows])), max_hops)
+        if route is None:
+            pool = graph.direct_pool(token_in, token_out)
+            if pool is not None:
+                indicative_fee[rows] = pool.fee
+                for i in indexes:
+                    direct[i] = pool
+            continue
+        for i in indexes:
+            routes[i] = route
+        for hop, (token, pool_id) in enumerate(zip(route.path, route.pools)):
+            edge = graph.pools[pool_id]
+            r_in, r_out = edge.reserves(token)
+            reserve_in[rows, hop] = r_in
+            reserve_out[rows, hop] = r_out
+            fees[rows, hop] = edge.fee
+            hops[rows, hop] = True
+
+    # Constant-product math for every row and hop at once
+    amount = np.where(amounts > 0, amounts, 0.0)
+    amount_without_fee = amount.copy()
+    mid_price = np.ones(n)
+    for hop in range(max_hops):
+        active = hops[:, hop]
+        with_fee = amount * (100 - fees[:, hop])
+        out = with_fee * reserve_out[:, hop] / (reserve_in[:, hop] * 100 + with_fee)
+        out_without_fee = amount_without_fee * reserve_out[:, hop] / (reserve_in[:, hop] + amount_without_fee)
+        amount = np.where(active, out, amount)
+        amount_without_fee = np.where(active, out_without_fee, amount_without_fee)
+        mid_price = np.where(active, mid_price * reserve_out[:, hop] / reserve_in[:, hop], mid_price)
+
+    routed = hops[:, 0]
+    safe_amounts = np.where(amounts > 0, amounts, 1.0)
+    impact = (1 - amount_without_fee / (safe_amounts * mid_price)) * 100
+
+    # Indicative price-based quotes for pairs without liquidity
+    rate = np.divide(price_in, price_out, out=np.zeros(n), where=price_out > 0)
+    indicative = amounts * rate
+    step_impact = np.select([amounts < 1000, amounts < 10000], [0.1, 0.5], 1.0)
+    amount_out = np.where(routed, amount, indicative * (1 - indicative_fee / 100))
+    fee = np.where(routed, amount_without_fee - amount, indicative * indicative_fee / 100)
+    price_impact = np.where(routed, impact, step_impact)
+    exchange_rate = np.where(routed, mid_price, rate)
+
+    results = []
+    for i in range(n):
+        if errors[i] is None and not routed[i] and rate[i] == 0:
+            errors[i] = "No liquidity"
+        if errors[i] is not None:
+            results.append(BatchQuote(0.0, 0.0, 0.0, 0.0, [], [], errors[i]))
+            continue
+        route = routes[i]
+        if route is not None:
+            pools, path = route.pools, route.path
+        elif direct[i] is not None:
+            pools, path = [direct[i].id], [requests[i][0], requests[i][1]]
+        else:
+            pools, path = [], []
+        results.append(BatchQuote(
+            float(amount_out[i]),
+            float(fee[i]),
+            float(price_impact[i]),
+            float(exchange_rate[i]),
+            pools,
+            path
+        ))
+    return results
@@ -0,0 +1,44 @@
+"""
+Benchmark: constant-product quote engine throughput
+
+Measures scalar quotes and get_amounts_out_batch() over randomly generated
+pools. Pure Python, no database or server required.
+
+Run from the backend directory:
+    python benchmarks/bench_amm.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from amm import get_amount_out, get_amounts_out_batch, quote_exact_in  # noqa: E402
+
+N = 1_000_000
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms  {N / elapsed / 1e6:>6.2f} M quotes/s")
+
+
+def main():
+    rng = random.Random(42)
+    amounts = [rng.uniform(1, 1_000) for _ in range(N)]
+    reserves_in = [rng.uniform(10_000, 1_000_000) for _ in range(N)]
+    reserves_out = [rng.uniform(10_000, 1_000_000) for _ in range(N)]
+    fees = [0.3] * N
+    rows = list(zip(amounts, reserves_in, reserves_out, fees))
+
+    print(f"{N:,} quotes")
+    timed("get_amount_out (loop)", lambda: [get_amount_out(*row) for row in rows])
+    timed("quote_exact_in (loop)", lambda: [quote_exact_in(*row) for row in rows])
+    timed("get_amounts_out_batch", lambda: get_amounts_out_batch(amounts, reserves_in, reserves_out, fees))
+
+
+if __name__ == "__main__":
+    main()
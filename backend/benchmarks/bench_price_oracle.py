@@ -0,0 +1,89 @@
+"""
+Benchmark: deriving token prices from pool reserves
+
+Builds graphs of a few thousand tokens hanging off a handful of hubs, then
+times a full PriceEngine.recompute() and incremental update_pools() calls
+after single-pool reserve changes. Pure Python, no database or server
+required.
+
+Run from the backend directory:
+    python benchmarks/bench_price_oracle.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pricing import PriceEngine  # noqa: E402
+from routing import PoolGraph  # noqa: E402
+
+HUBS = 5
+UPDATES = 500
+BUDGET_MS = 50.0
+ANCHOR = f"0x{0:040x}"
+
+
+def build_graph(token_count, rng):
+    tokens = [f"0x{i:040x}" for i in range(token_count)]
+    graph = PoolGraph()
+    pools = []
+    pairs = set()
+
+    def add(a, b):
+        if a == b or (min(a, b), max(a, b)) in pairs:
+            return
+        pairs.add((min(a, b), max(a, b)))
+        pool = {
+            "id": f"pool{len(pools)}",
+            "token0_address": tokens[a],
+            "token1_address": tokens[b],
+            "token0_reserve": rng.uniform(1e3, 1e6),
+            "token1_reserve": rng.uniform(1e3, 1e6),
+            "fee": 0.3,
+        }
+        pools.append(pool)
+        graph.upsert_pool(pool)
+
+    for hub in range(1, HUBS):
+        add(hub, 0)
+    for token in range(HUBS, token_count):
+        # Every token trades against a hub, some against a second one or another token
+        add(token, rng.randrange(HUBS))
+        if rng.random() < 0.5:
+            add(token, rng.randrange(token_count))
+    return graph, pools
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'tokens':>7} {'pools':>6} {'recompute ms':>13} {'update ms':>10} {'fallbacks':>10}")
+    for token_count in (1000, 3000, 5000, 10000):
+        graph, pools = build_graph(token_count, rng)
+        engine = PriceEngine(ANCHOR, min_liquidity=0)
+
+        start = time.perf_counter()
+        engine.recompute(graph)
+        recompute_ms = (time.perf_counter() - start) * 1000
+
+        fallbacks = 0
+        elapsed = 0.0
+        for _ in range(UPDATES):
+            pool = rng.choice(pools)
+            pool["token0_reserve"] *= rng.uniform(0.99, 1.01)
+            graph.upsert_pool(pool)
+            before = engine.prices
+            start = time.perf_counter()
+            engine.update_pools(graph, [pool["id"]])
+            elapsed += time.perf_counter() - start
+            fallbacks += engine.prices is not before
+        update_ms = elapsed * 1000 / UPDATES
+
+        flag = "" if recompute_ms <= BUDGET_MS else "  over budget"
+        print(f"{token_count:>7} {len(pools):>6} {recompute_ms:>13.2f} {update_ms:>10.3f} {fallbacks:>10}{flag}")
+    print(f"Budget: {BUDGET_MS} ms per full recompute")
+
+
+if __name__ == "__main__":
+    main()
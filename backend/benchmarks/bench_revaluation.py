@@ -0,0 +1,90 @@
+"""
+Benchmark: revaluing pools after token prices move
+
+Builds a graph of pools hanging off a handful of hubs, moves the price of
+one hub (touching thousands of pools) and times the CPU side of a
+revaluation tick: the token -> pools lookup, the vectorized tvl/apr pass
+and building the bulk_write operations. Pure Python, no database or server
+required.
+
+Run from the backend directory:
+    python benchmarks/bench_revaluation.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import UpdateOne  # noqa: E402
+from revaluation import TVL_EPSILON, pools_for_tokens, valuations  # noqa: E402
+from routing import PoolGraph  # noqa: E402
+
+HUBS = 5
+RUNS = 20
+BUDGET_MS = 100.0
+
+
+def build(pool_count, rng):
+    graph = PoolGraph()
+    pools = []
+    for i in range(pool_count):
+        pool = {
+            "id": f"pool{i}",
+            "token0_address": f"0x{i % HUBS:040x}",
+            "token1_address": f"0x{HUBS + i:040x}",
+            "token0_reserve": rng.uniform(1e3, 1e6),
+            "token1_reserve": rng.uniform(1e3, 1e6),
+            "fee": 0.3,
+            "tvl": rng.uniform(1e3, 1e6),
+        }
+        graph.upsert_pool(pool)
+        pools.append(pool)
+    return graph, {pool["id"]: pool for pool in pools}
+
+
+def tick(graph, pools, prices, changed):
+    affected = [pools[pool_id] for pool_id in pools_for_tokens(graph, changed)]
+
+    def column(key):
+        return np.array([pool[key] for pool in affected], dtype=float)
+
+    price0 = np.array([prices.get(pool["token0_address"], 1.0) for pool in affected])
+    price1 = np.array([prices.get(pool["token1_address"], 1.0) for pool in affected])
+    tvl, apr = valuations(column("token0_reserve"), column("token1_reserve"), price0, price1, column("fee"))
+    old_tvl = column("tvl")
+    moved = np.flatnonzero(np.abs(tvl - old_tvl) > np.maximum(np.abs(old_tvl), 1.0) * TVL_EPSILON)
+    tvl_values, apr_values = tvl.tolist(), apr.tolist()
+    updates = [
+        UpdateOne(
+            {"id": affected[i]["id"], "token0_reserve": affected[i]["token0_reserve"],
+             "token1_reserve": affected[i]["token1_reserve"]},
+            {"$set": {"tvl": tvl_values[i], "apr": apr_values[i]}}
+        )
+        for i in moved.tolist()
+    ]
+    return len(updates)
+
+
+def main():
+    rng = random.Random(42)
+    hub = f"0x{0:040x}"
+    print(f"{'pools':>8} {'affected':>9} {'tick ms':>9}")
+    for pool_count in (1_000, 5_000, 10_000, 25_000):
+        graph, pools = build(pool_count, rng)
+        prices = {f"0x{i:040x}": rng.uniform(0.1, 10) for i in range(HUBS + pool_count)}
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            prices[hub] *= 1.01
+            written = tick(graph, pools, prices, {hub: prices[hub]})
+        elapsed = (time.perf_counter() - start) / RUNS * 1000
+        status = "OK" if elapsed < BUDGET_MS else "over budget"
+        print(f"{pool_count:>8} {written:>9} {elapsed:>9.2f}  {status}")
+    print(f"\nbudget {BUDGET_MS:.0f} ms per tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: split-route optimizer latency on large pool graphs
+
+Builds random graphs of a few hundred pools around a handful of hub tokens
+and times best_route() and best_split() for large trades. Pure Python, no
+database or server required.
+
+Run from the backend directory:
+    python benchmarks/bench_split_routing.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from routing import PoolGraph, best_split  # noqa: E402
+
+HUBS = 5
+ITERATIONS = 200
+BUDGET_MS = 5.0
+
+
+def build_graph(pool_count, rng):
+    token_count = max(HUBS + 2, pool_count // 3)
+    tokens = [f"0x{i:040x}" for i in range(token_count)]
+    graph = PoolGraph()
+    pairs = set()
+    while len(graph) < pool_count:
+        # Most pools pair a long-tail token with a hub, like real DEX graphs
+        a = rng.randrange(token_count)
+        b = rng.randrange(HUBS) if rng.random() < 0.8 else rng.randrange(token_count)
+        if a == b or (min(a, b), max(a, b)) in pairs:
+            continue
+        pairs.add((min(a, b), max(a, b)))
+        graph.upsert_pool({
+            "id": f"pool{len(graph)}",
+            "token0_address": tokens[a],
+            "token1_address": tokens[b],
+            "token0_reserve": rng.uniform(1e3, 1e6),
+            "token1_reserve": rng.uniform(1e3, 1e6),
+            "fee": 0.3,
+        })
+    return graph, tokens
+
+
+def time_ms(fn):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) * 1000 / ITERATIONS
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'pools':>6} {'best_route ms':>14} {'best_split ms':>14} {'legs':>5} {'gain %':>7}")
+    for pool_count in (100, 300, 500, 1000):
+        graph, tokens = build_graph(pool_count, rng)
+        token_in, token_out = tokens[0], tokens[1]
+        amount_in = 50_000.0
+        single = graph.best_route(token_in, token_out, amount_in)
+        split = best_split(graph, token_in, token_out, amount_in)
+        route_ms = time_ms(lambda: graph.best_route(token_in, token_out, amount_in))
+        split_ms = time_ms(lambda: best_split(graph, token_in, token_out, amount_in))
+        gain = (split.amount_out / single.amount_out - 1) * 100 if single and split else 0.0
+        flag = "" if split_ms <= BUDGET_MS else "  over budget"
+        legs = len(split.legs) if split else 0
+        print(f"{pool_count:>6} {route_ms:>14.3f} {split_ms:>14.3f} {legs:>5} {gain:>7.2f}{flag}")
+    print(f"Budget: {BUDGET_MS} ms per split quote")
+
+
+if __name__ == "__main__":
+    main()
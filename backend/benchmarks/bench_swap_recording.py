@@ -0,0 +1,162 @@
+"""
+Benchmark: swap recording latency percentiles
+
+Compares the old execute_swap write sequence (pool read, pool update, graph
+version bump, transaction insert, candles, stats, volume windows, wallet
+sketches: 8 sequential round-trips) with swap_recorder.record_swap(), which
+updates the pool with one pipeline and then issues the rest concurrently.
+
+Mongo is replaced by a fake whose round-trips sleep for a random latency
+with a slow tail, so p99 reflects how many round-trips sit on the critical
+path rather than the speed of this machine. Swaps arrive at a fixed rate
+(open loop) so both variants see the same offered load.
+
+Run from the backend directory:
+    python benchmarks/bench_swap_recording.py
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cache_versions  # noqa: E402
+import candles  # noqa: E402
+import idempotency  # noqa: E402
+import pool_graph as pool_graph_module  # noqa: E402
+import protocol_stats  # noqa: E402
+import swap_recorder  # noqa: E402
+import unique_wallets  # noqa: E402
+import volume_windows as volume_windows_module  # noqa: E402
+from pool_graph import pool_graph  # noqa: E402
+from pairs import pair_key  # noqa: E402
+
+SWAPS = 2000
+SWAPS_PER_SECOND = 200
+MEDIAN_ROUND_TRIP_SECONDS = 0.001
+SLOW_ROUND_TRIP_SECONDS = 0.010
+SLOW_FRACTION = 0.02
+
+TOKEN_IN = "0x9da12b8cf8b94f2e0eedd9841e268631af03adb1"
+TOKEN_OUT = "0x75c681d7d00b6cda3778535bba87e433ca369c96"
+POOL = {
+    "id": "pool1",
+    "token0_address": TOKEN_IN,
+    "token1_address": TOKEN_OUT,
+    "pair_key": pair_key(TOKEN_IN, TOKEN_OUT),
+    "fee": 0.3,
+    "token0_reserve": 1_000_000.0,
+    "token1_reserve": 2_450_000.0,
+}
+
+
+async def round_trip():
+    if random.random() < SLOW_FRACTION:
+        await asyncio.sleep(SLOW_ROUND_TRIP_SECONDS)
+    else:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * MEDIAN_ROUND_TRIP_SECONDS)
+
+
+class FakeCollection:
+    """Accepts every write; reads return the benchmark pool"""
+
+    async def find_one(self, *args, **kwargs):
+        await round_trip()
+        return dict(POOL)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        await round_trip()
+        return {**POOL, "version": 1}
+
+    async def insert_one(self, *args, **kwargs):
+        await round_trip()
+
+    async def update_one(self, *args, **kwargs):
+        await round_trip()
+
+    async def bulk_write(self, *args, **kwargs):
+        await round_trip()
+
+
+class FakeDB:
+    def __getattr__(self, name):
+        collection = FakeCollection()
+        setattr(self, name, collection)
+        return collection
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+async def record_sequential(tx: dict, volume_usd: float):
+    """The write sequence execute_swap used before swap_recorder"""
+    db = swap_recorder.db
+    pool = await db.pools.find_one({"pair_key": tx["pair_key"]})
+    updated_pool = await db.pools.find_one_and_update({"id": pool["id"]}, {"$inc": {"volume_24h": volume_usd}})
+    await pool_graph.apply(updated_pool)
+    await db.transactions.insert_one(tx)
+    await candles.record_trade(tx["token0_address"], tx["token1_address"], tx["amount0"], tx["amount1"], tx["timestamp"])
+    await protocol_stats.record_swap(volume_usd)
+    await volume_windows_module.volume_windows.record(pool["id"], volume_usd, tx["timestamp"])
+    await unique_wallets.record_wallet(tx["wallet_address"], pool["id"], tx["timestamp"])
+
+
+def make_tx():
+    return {
+        "id": str(uuid.uuid4()),
+        "type": "swap",
+        "wallet_address": f"0x{random.getrandbits(160):040x}",
+        "token0_address": TOKEN_IN,
+        "token1_address": TOKEN_OUT,
+        "pair_key": POOL["pair_key"],
+        "amount0": 10.0,
+        "amount1": 24.0,
+        "timestamp": datetime.now(timezone.utc),
+    }
+
+
+async def measure(record) -> list:
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await record(make_tx(), 24.5)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    for _ in range(SWAPS):
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(1 / SWAPS_PER_SECOND)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def run():
+    fake_db = FakeDB()
+    for module in (cache_versions, candles, idempotency, pool_graph_module, protocol_stats, swap_recorder,
+                   unique_wallets, volume_windows_module):
+        module.db = fake_db
+    swap_recorder._supports_transactions = False
+    random.seed(42)
+
+    print(f"{SWAPS} swaps at {SWAPS_PER_SECOND}/s; round-trip ~{MEDIAN_ROUND_TRIP_SECONDS * 1000:.1f} ms, "
+          f"{SLOW_FRACTION:.0%} at {SLOW_ROUND_TRIP_SECONDS * 1000:.0f} ms")
+    print(f"{'':>12} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, record in (("sequential", record_sequential), ("recorder", swap_recorder.record_swap)):
+        latencies = await measure(record)
+        print(f"{name:>12} {percentile(latencies, 50):>8.2f} {percentile(latencies, 90):>8.2f} "
+              f"{percentile(latencies, 99):>8.2f} {statistics.mean(latencies):>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
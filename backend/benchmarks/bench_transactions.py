@@ -0,0 +1,149 @@
+"""
+Benchmark: transaction history latency vs page size
+
+Compares the old per-row token lookups (2 round-trips per transaction) with
+build_transaction_responses(), which resolves every token on the page with a
+single batched lookup. Mongo is replaced by an in-memory fake that sleeps for
+a fixed latency on every round-trip, so the numbers reflect round-trip counts.
+
+Run from the backend directory:
+    python benchmarks/bench_transactions.py
+"""
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cache_versions  # noqa: E402
+import token_registry as token_registry_module  # noqa: E402
+from models import Token, TransactionResponse  # noqa: E402
+from routes import transactions as transactions_route  # noqa: E402
+
+ROUND_TRIP_SECONDS = 0.001
+PAGE_SIZES = [10, 50, 100, 250, 500]
+TOKEN_COUNT = 20
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(ROUND_TRIP_SECONDS)
+        return list(self.docs if length is None else self.docs[:length])
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.round_trips = 0
+
+    def _matches(self, doc, query):
+        for key, value in query.items():
+            if isinstance(value, dict) and "$in" in value:
+                if doc.get(key) not in value["$in"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        self.round_trips += 1
+        return FakeCursor([d for d in self.docs if self._matches(d, query or {})])
+
+    async def find_one(self, query, projection=None):
+        self.round_trips += 1
+        await asyncio.sleep(ROUND_TRIP_SECONDS)
+        return next((d for d in self.docs if self._matches(d, query)), None)
+
+
+class FakeDB:
+    def __init__(self, tokens, transactions):
+        self.tokens = FakeCollection(tokens)
+        self.transactions = FakeCollection(transactions)
+        self.cache_versions = FakeCollection([{"_id": "tokens", "version": 1}])
+
+
+def make_data(page_size):
+    tokens = [{
+        "id": f"t{i}",
+        "symbol": f"TK{i}",
+        "name": f"Token {i}",
+        "address": f"0x{i:040x}",
+        "decimals": 18,
+        "price": 1.0 + i,
+    } for i in range(TOKEN_COUNT)]
+    now = datetime.utcnow()
+    transactions = [{
+        "id": str(uuid.uuid4()),
+        "type": "swap",
+        "wallet_address": "0xbench",
+        "token0_address": tokens[i % TOKEN_COUNT]["address"],
+        "token1_address": tokens[(i + 1) % TOKEN_COUNT]["address"],
+        "amount0": 1.0,
+        "amount1": 2.0,
+        "tx_hash": None,
+        "timestamp": now - timedelta(seconds=i),
+        "status": "confirmed",
+    } for i in range(page_size)]
+    return tokens, transactions
+
+
+async def per_row_lookups(fake_db, transactions):
+    """The previous implementation: two token queries per transaction"""
+    result = []
+    for tx in transactions:
+        token0 = await fake_db.tokens.find_one({"address": tx["token0_address"]})
+        token1 = await fake_db.tokens.find_one({"address": tx["token1_address"]})
+        if token0 and token1:
+            result.append(TransactionResponse(
+                id=tx["id"], type=tx["type"], wallet_address=tx["wallet_address"],
+                token0=Token(**token0), token1=Token(**token1),
+                amount0=tx["amount0"], amount1=tx["amount1"], tx_hash=tx.get("tx_hash"),
+                timestamp=tx["timestamp"], status=tx["status"]
+            ))
+    return result
+
+
+async def run():
+    print(f"Simulated round-trip latency: {ROUND_TRIP_SECONDS * 1000:.1f} ms")
+    print(f"{'page size':>10} {'per-row ms':>12} {'trips':>7} {'batched ms':>12} {'trips':>7}")
+    for page_size in PAGE_SIZES:
+        tokens, transactions = make_data(page_size)
+
+        fake_db = FakeDB(tokens, transactions)
+        start = time.perf_counter()
+        page = await fake_db.transactions.find().sort("timestamp", -1).limit(page_size).to_list(page_size)
+        await per_row_lookups(fake_db, page)
+        per_row_ms = (time.perf_counter() - start) * 1000
+        per_row_trips = fake_db.tokens.round_trips + fake_db.transactions.round_trips
+
+        # Cold registry for every run so the batched lookup really hits the fake DB
+        fake_db = FakeDB(tokens, transactions)
+        cache_versions.db = token_registry_module.db = transactions_route.db = fake_db
+        registry = token_registry_module.TokenRegistry()
+        registry._version = 1
+        registry._checked_at = registry._loaded_at = time.monotonic()
+        transactions_route.token_registry = registry
+        start = time.perf_counter()
+        page = await fake_db.transactions.find().sort("timestamp", -1).limit(page_size).to_list(page_size)
+        await transactions_route.build_transaction_responses(page)
+        batched_ms = (time.perf_counter() - start) * 1000
+        batched_trips = fake_db.tokens.round_trips + fake_db.transactions.round_trips
+
+        print(f"{page_size:>10} {per_row_ms:>12.1f} {per_row_trips:>7} {batched_ms:>12.1f} {batched_trips:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
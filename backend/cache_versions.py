@@ -0,0 +1,20 @@
+"""Shared version counters used to invalidate in-process caches across workers"""
+from pymongo import ReturnDocument
+from database import db
+
+
+async def get_version(name: str) -> int:
+    """Return the current version of a cached collection"""
+    doc = await db.cache_versions.find_one({"_id": name})
+    return doc["version"] if doc else 0
+
+
+async def bump_version(name: str) -> int:
+    """Increment the version of a cached collection and return the new value"""
+    doc = await db.cache_versions.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
@@ -0,0 +1,128 @@
+"""
+Pre-aggregated OHLCV candles per pair and interval.
+
+Candles are keyed by the canonical pair key, so prices are stored as quote
+token per base token (see pairs.sorted_pair) and oriented per request when
+read. Every recorded trade updates one bucket per interval in a single
+bulk write.
+"""
+from database import db
+from events import broker
+from pairs import pair_key, sorted_pair
+from pymongo import UpdateOne
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+END_OF_TIME = datetime(9999, 12, 31, tzinfo=timezone.utc)
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes; make them timezone-aware"""
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp
+
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    """Start of the interval bucket containing a timestamp"""
+    offset = int((as_utc(timestamp) - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=offset - offset % seconds)
+
+
+def candle_update(price: float, base_amount: float, quote_amount: float, timestamp: datetime) -> list:
+    """Update pipeline folding one trade into a candle, tolerating out-of-order trades"""
+    # A new candle has no open/close time yet, so its first trade is both
+    first = {"$lt": [timestamp, {"$ifNull": ["$open_time", END_OF_TIME]}]}
+    last = {"$gte": [timestamp, {"$ifNull": ["$close_time", EPOCH]}]}
+    return [{"$set": {
+        "open": {"$cond": [first, price, "$open"]},
+        "close": {"$cond": [last, price, "$close"]},
+        "high": {"$max": ["$high", price]},
+        "low": {"$min": ["$low", price]},
+        "open_time": {"$min": ["$open_time", timestamp]},
+        "close_time": {"$max": ["$close_time", timestamp]},
+        "volume_base": {"$add": [{"$ifNull": ["$volume_base", 0]}, base_amount]},
+        "volume_quote": {"$add": [{"$ifNull": ["$volume_quote", 0]}, quote_amount]},
+        "trades": {"$add": [{"$ifNull": ["$trades", 0]}, 1]},
+    }}]
+
+
+async def record_trade(token_in: str, token_out: str, amount_in: float, amount_out: float, timestamp: datetime):
+    """Fold a swap into the candles of every interval"""
+    if amount_in <= 0 or amount_out <= 0:
+        return
+    base, _ = sorted_pair(token_in, token_out)
+    if token_in.lower() == base:
+        base_amount, quote_amount = amount_in, amount_out
+    else:
+        base_amount, quote_amount = amount_out, amount_in
+    price = quote_amount / base_amount
+    timestamp = as_utc(timestamp)
+    key = pair_key(token_in, token_out)
+    
+    await db.candles.bulk_write([
+        UpdateOne(
+            {"pair_key": key, "interval": interval, "bucket": bucket_start(timestamp, seconds)},
+            candle_update(price, base_amount, quote_amount, timestamp),
+            upsert=True
+        )
+        for interval, seconds in INTERVALS.items()
+    ], ordered=False)
+    
+    for interval, seconds in INTERVALS.items():
+        broker.publish(key, "candle", {
+            "interval": interval,
+            "time": bucket_start(timestamp, seconds),
+            "price": price,
+            "volume": base_amount,
+            "quote_volume": quote_amount
+        })
+
+
+async def get_candles(
+    token0: str,
+    token1: str,
+    interval: str,
+    start: datetime,
+    end: Optional[datetime] = None
+) -> List[dict]:
+    """Candles for a window, priced as token1 per token0 with volume in token0"""
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    query = {
+        "pair_key": pair_key(token0, token1),
+        "interval": interval,
+        "bucket": {"$gte": bucket_start(start, INTERVALS[interval])}
+    }
+    if end is not None:
+        query["bucket"]["$lt"] = end
+    docs = await db.candles.find(query, {"_id": 0}).sort("bucket", 1).to_list(None)
+    
+    inverted = token0.lower() != sorted_pair(token0, token1)[0]
+    candles = []
+    for doc in docs:
+        bucket = as_utc(doc["bucket"])
+        if inverted:
+            prices = (1 / doc["open"], 1 / doc["low"], 1 / doc["high"], 1 / doc["close"])
+            volume = doc.get("volume_quote", 0)
+        else:
+            prices = (doc["open"], doc["high"], doc["low"], doc["close"])
+            volume = doc.get("volume_base", 0)
+        candles.append({
+            "time": bucket.strftime("%Y-%m-%d") if interval == "1d" else bucket.isoformat(),
+            "open": prices[0],
+            "high": prices[1],
+            "low": prices[2],
+            "close": prices[3],
+            "volume": volume,
+            "trades": doc.get("trades", 0)
+        })
+    return candles
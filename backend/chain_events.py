@@ -0,0 +1,96 @@
+"""
+Decoding of Uniswap-V2 factory and pair event logs.
+
+Decoders are keyed by topic0 (the keccak hash of the event signature).
+Each returns a flat dict with the log's position (address, block number,
+tx hash, log index) and the event arguments as raw integers; scaling by
+token decimals is left to the caller.
+"""
+from typing import Callable, Dict, List, Optional
+
+PAIR_CREATED = "0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9"  # PairCreated(address,address,address,uint256)
+SWAP = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"  # Swap(address,uint256,uint256,uint256,uint256,address)
+SYNC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"  # Sync(uint112,uint112)
+MINT = "0x4c209b5fc8ad50758f13e2e1088ba56a560dff690a1c6fef26394f4c03821c4f"  # Mint(address,uint256,uint256)
+BURN = "0xdccd412f0b1252819cb1fd330b93224ca42612892bb3f4f789976e6d81936496"  # Burn(address,uint256,uint256,address)
+
+
+def data_words(data: str) -> List[int]:
+    """Split ABI-encoded log data into 32-byte words"""
+    data = data[2:] if data.startswith("0x") else data
+    return [int(data[i:i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def topic_address(topic: str) -> str:
+    """An indexed address topic as a lowercased 20-byte address"""
+    return "0x" + topic[-40:].lower()
+
+
+def _decode_pair_created(log: dict, words: List[int]) -> dict:
+    return {
+        "token0": topic_address(log["topics"][1]),
+        "token1": topic_address(log["topics"][2]),
+        "pair": "0x" + format(words[0], "040x")
+    }
+
+
+def _decode_swap(log: dict, words: List[int]) -> dict:
+    return {
+        "sender": topic_address(log["topics"][1]),
+        "to": topic_address(log["topics"][2]),
+        "amount0_in": words[0],
+        "amount1_in": words[1],
+        "amount0_out": words[2],
+        "amount1_out": words[3]
+    }
+
+
+def _decode_sync(log: dict, words: List[int]) -> dict:
+    return {"reserve0": words[0], "reserve1": words[1]}
+
+
+def _decode_mint(log: dict, words: List[int]) -> dict:
+    return {"sender": topic_address(log["topics"][1]), "amount0": words[0], "amount1": words[1]}
+
+
+def _decode_burn(log: dict, words: List[int]) -> dict:
+    return {
+        "sender": topic_address(log["topics"][1]),
+        "to": topic_address(log["topics"][2]),
+        "amount0": words[0],
+        "amount1": words[1]
+    }
+
+
+DECODERS: Dict[str, Callable[[dict, List[int]], dict]] = {
+    PAIR_CREATED: _decode_pair_created,
+    SWAP: _decode_swap,
+    SYNC: _decode_sync,
+    MINT: _decode_mint,
+    BURN: _decode_burn
+}
+
+EVENT_NAMES = {PAIR_CREATED: "PairCreated", SWAP: "Swap", SYNC: "Sync", MINT: "Mint", BURN: "Burn"}
+
+
+def decode_log(log: dict) -> Optional[dict]:
+    """Decode one eth_getLogs entry, or None for events we don't index and removed (reorged) logs"""
+    topics = log.get("topics") or []
+    decoder = DECODERS.get(topics[0].lower()) if topics else None
+    if decoder is None or log.get("removed"):
+        return None
+    try:
+        args = decoder(log, data_words(log.get("data", "0x")))
+    except (IndexError, ValueError):
+        # Same topic0 but a different argument layout (not a V2 pair)
+        return None
+    return {
+        "event": EVENT_NAMES[topics[0].lower()],
+        "address": log["address"].lower(),
+        "block_number": int(log["blockNumber"], 16),
+        "tx_hash": log["transactionHash"].lower(),
+        "log_index": int(log["logIndex"], 16),
+        # Only some nodes include the block time in logs
+        "block_timestamp": int(log["blockTimestamp"], 16) if log.get("blockTimestamp") else None,
+        **args
+    }
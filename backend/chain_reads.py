@@ -0,0 +1,105 @@
+"""
+Aggregated contract reads: ERC-20 metadata and pair reserves.
+
+Each helper turns N contracts into one ``RPCClient.call_many`` (JSON-RPC
+batches of eth_call), so reading hundreds of tokens or pairs costs a
+handful of HTTP round trips. A contract that reverts or returns nothing
+decodes to None rather than failing the whole batch. A call the node
+failed to run is not a revert: token metadata reads raise its RPCError, so
+an unreachable node is never taken for "not a token".
+"""
+from rpc_client import RPCClient, RPCError
+from chain_events import data_words
+from pairs import sorted_pair
+from typing import Dict, Iterable, Optional, Tuple
+
+# 4-byte selectors of the view functions read here
+NAME = "0x06fdde03"  # name()
+SYMBOL = "0x95d89b41"  # symbol()
+DECIMALS = "0x313ce567"  # decimals()
+GET_RESERVES = "0x0902f1ac"  # getReserves()
+
+MAX_DECIMALS = 77  # 10**77 is the largest power of ten below 2**256
+DEFAULT_DECIMALS = 18
+
+
+def scale(raw: int, decimals: int) -> float:
+    return raw / 10 ** decimals
+
+
+def pool_reserves(pool: dict, raw0: int, raw1: int, decimals: Dict[str, int]) -> Tuple[float, float]:
+    """Raw pair reserves (in the contract's token order, i.e. sorted by address) as
+    (token0_reserve, token1_reserve) in the pool's own token order
+    """
+    token0, token1 = sorted_pair(pool["token0_address"], pool["token1_address"])
+    reserve0 = scale(raw0, decimals.get(token0, DEFAULT_DECIMALS))
+    reserve1 = scale(raw1, decimals.get(token1, DEFAULT_DECIMALS))
+    return (reserve0, reserve1) if pool["token0_address"].lower() == token0 else (reserve1, reserve0)
+
+
+def decode_string(data: Optional[str]) -> Optional[str]:
+    """An ABI `string` return value; also accepts the `bytes32` some older tokens return"""
+    if not data or data == "0x":
+        return None
+    raw = bytes.fromhex(data[2:])
+    try:
+        if len(raw) == 32:
+            text = raw.rstrip(b"\0").decode()
+        else:
+            offset = int.from_bytes(raw[:32], "big")
+            length = int.from_bytes(raw[offset:offset + 32], "big")
+            text = raw[offset + 32:offset + 32 + length].decode()
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return text or None
+
+
+def decode_uint(data: Optional[str]) -> Optional[int]:
+    if not data or data == "0x":
+        return None
+    try:
+        return data_words(data)[0]
+    except (IndexError, ValueError):
+        return None
+
+
+async def token_metadata_many(rpc: RPCClient, addresses: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """address -> {"name", "symbol", "decimals"}, or None for addresses that aren't ERC-20 tokens.
+    Raises the RPCError of any call the node failed to run.
+    """
+    addresses = [address.lower() for address in addresses]
+    calls = [(address, selector) for address in addresses for selector in (NAME, SYMBOL, DECIMALS)]
+    results = await rpc.call_many(calls)
+    for result in results:
+        if isinstance(result, RPCError):
+            raise result
+
+    metadata = {}
+    for i, address in enumerate(addresses):
+        name, symbol, decimals = results[3 * i:3 * i + 3]
+        symbol = decode_string(symbol)
+        decimals = decode_uint(decimals)
+        if symbol is None or decimals is None or decimals > MAX_DECIMALS:
+            metadata[address] = None
+        else:
+            metadata[address] = {"name": decode_string(name) or symbol, "symbol": symbol, "decimals": decimals}
+    return metadata
+
+
+async def pair_reserves_many(rpc: RPCClient, pairs: Iterable[str],
+                             block: str = "latest") -> Dict[str, Optional[Tuple[int, int]]]:
+    """pair address -> raw (reserve0, reserve1) in the pair's token order, or None if the call failed"""
+    pairs = [pair.lower() for pair in pairs]
+    results = await rpc.call_many([(pair, GET_RESERVES) for pair in pairs], block)
+
+    reserves = {}
+    for pair, data in zip(pairs, results):
+        if isinstance(data, RPCError):
+            reserves[pair] = None
+            continue
+        try:
+            words = data_words(data) if data and data != "0x" else []
+        except ValueError:
+            words = []
+        reserves[pair] = (words[0], words[1]) if len(words) >= 3 else None
+    return reserves
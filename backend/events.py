@@ -0,0 +1,55 @@
+"""
+In-process publish/subscribe for live updates.
+
+Write paths publish once per event; every connected SSE/WebSocket client
+has its own bounded queue, so a slow client drops its oldest events rather
+than slowing down writers or other clients. Brokers are per process: with
+several workers, each client sees the events written by its own worker,
+plus pool updates its worker catches up from the pool change log. Trades
+recorded by other workers are not pushed, so clients also reload trade
+history periodically and whenever their stream reconnects.
+"""
+from typing import Dict, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(topic, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[topic]
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic: str, event_type: str, data: dict):
+        """Deliver an event to every subscriber of a topic without blocking"""
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        event = {"type": event_type, "data": data}
+        for queue in subscribers:
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+
+broker = EventBroker()
@@ -0,0 +1,75 @@
+"""
+HyperLogLog cardinality sketch.
+
+Registers can be updated independently (index, rank), which lets Mongo
+store a sketch as a sparse ``{index: rank}`` document updated with
+``$max``. Sketches with the same precision merge by register-wise max.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import math
+
+DEFAULT_PRECISION = 12  # 4096 registers, ~1.6% standard error
+HASH_BITS = 64
+
+
+def register_update(value: str, precision: int = DEFAULT_PRECISION) -> Tuple[int, int]:
+    """(register index, rank) that adding `value` would set"""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    h = int.from_bytes(digest, "big")
+    index = h >> (HASH_BITS - precision)
+    remaining_bits = HASH_BITS - precision
+    w = h & ((1 << remaining_bits) - 1)
+    rank = remaining_bits - w.bit_length() + 1
+    return index, rank
+
+
+class HyperLogLog:
+    """Approximate distinct counter using 2**precision one-byte registers"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 18:
+            raise ValueError("Precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    @classmethod
+    def from_sparse(cls, registers: Dict[str, int], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Build from a sparse {index: rank} mapping as stored in Mongo"""
+        sketch = cls(precision)
+        for index, rank in registers.items():
+            sketch.registers[int(index)] = max(sketch.registers[int(index)], rank)
+        return sketch
+
+    def add(self, value: str) -> bool:
+        """Add a value; returns True if a register changed"""
+        index, rank = register_update(value, self.precision)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch into this one (union of the counted sets)"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,134 @@
+"""
+Exactly-once ingestion of on-chain writes keyed by tx_hash.
+
+Write endpoints claim a tx_hash by inserting their transaction record
+before touching pools, positions or stats. The unique partial index on
+(tx_hash, log_index) makes a second insert with the same hash fail, so a
+retried request is turned away after one cheap insert and the original
+record is returned instead. Records without a tx_hash are never deduplicated.
+Client reports carry no log_index, so they don't collide with the
+per-event records the chain indexer stores for the same transaction; a
+report whose tx_hash the indexer already recorded is turned away too.
+
+Outside a Mongo transaction the claim and the writes it guards are
+separate, so the writes run under ``release_on_failure()``: if they fail,
+the claim is deleted again and a retry applies them instead of being
+turned away as a duplicate. Where a request makes two writes, a failure
+of the second undoes the first before ``release_transaction()``.
+
+Deployments that predate the index may already hold duplicate records,
+which would keep the index from being built. ``dedupe_transactions()``
+runs before the index is created and keeps the first record of each
+(tx_hash, log_index). What a duplicate already applied to a pool is not
+reverted; the reserve reconciler brings pools back in line with the chain.
+"""
+from database import db
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches the partialFilterExpression of the unique tx_hash index
+HAS_TX_HASH = {"tx_hash": {"$type": "string"}}
+
+DUPLICATE_KEY = 11000
+
+
+class AlreadyRecorded(Exception):
+    """Raised when a tx_hash was already ingested; carries the stored transaction"""
+
+    def __init__(self, transaction: dict):
+        super().__init__(f"Transaction {transaction.get('tx_hash')} already recorded")
+        self.transaction = transaction
+
+
+def tx_hash_filter(tx_hash: str, log_index: Optional[int] = None) -> dict:
+    """Query for the record of one event; repeats the index filter so the index is used"""
+    return {"tx_hash": {"$eq": tx_hash, "$type": "string"}, "log_index": log_index}
+
+
+async def claim_transaction(tx: dict, session=None):
+    """Insert a transaction record, raising AlreadyRecorded if its tx_hash was seen before"""
+    if tx.get("tx_hash") and tx.get("log_index") is None:
+        indexed = await db.transactions.find_one(
+            {"tx_hash": {"$eq": tx["tx_hash"], "$type": "string"}}, {"_id": 0}, session=session
+        )
+        if indexed is not None:
+            raise AlreadyRecorded(indexed)
+    try:
+        await db.transactions.insert_one(tx, session=session)
+    except DuplicateKeyError:
+        if not tx.get("tx_hash"):
+            raise
+        existing = await db.transactions.find_one(
+            tx_hash_filter(tx["tx_hash"], tx.get("log_index")), {"_id": 0}
+        )
+        if existing is None:
+            raise
+        raise AlreadyRecorded(existing)
+
+
+async def release_transaction(tx: dict):
+    """Delete a claimed transaction record so a retry can apply its writes"""
+    await db.transactions.delete_one({"id": tx["id"]})
+
+
+@asynccontextmanager
+async def release_on_failure(tx: dict):
+    """Release a claimed transaction if the writes it guards raise, so a retry can apply them.
+    Only wrap writes that leave nothing applied when they raise.
+    """
+    try:
+        yield
+    except BaseException:
+        await release_transaction(tx)
+        raise
+
+
+async def insert_new_transactions(txs: List[dict]) -> List[dict]:
+    """Bulk-insert transaction records, skipping events already recorded; returns the ones inserted"""
+    if not txs:
+        return []
+    try:
+        await db.transactions.insert_many(txs, ordered=False)
+        return txs
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            raise
+        skipped = {error["index"] for error in errors}
+        return [tx for i, tx in enumerate(txs) if i not in skipped]
+
+
+async def has_tx_hash_index() -> bool:
+    async for info in db.transactions.list_indexes():
+        if list(info["key"].items()) == [("tx_hash", 1), ("log_index", 1)] and info.get("unique"):
+            return True
+    return False
+
+
+async def dedupe_transactions() -> int:
+    """Delete all but the first record of each (tx_hash, log_index) so the unique index can be built.
+    Skipped once the index exists; returns the number of records deleted.
+    """
+    if await has_tx_hash_index():
+        return 0
+    groups = db.transactions.aggregate([
+        {"$match": HAS_TX_HASH},
+        {"$sort": {"timestamp": 1, "_id": 1}},
+        # A missing log_index and a null one collide in the index
+        {"$group": {
+            "_id": {"tx_hash": "$tx_hash", "log_index": {"$ifNull": ["$log_index", None]}},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    deleted = 0
+    async for group in groups:
+        result = await db.transactions.delete_many({"_id": {"$in": group["ids"][1:]}})
+        deleted += result.deleted_count
+        logger.warning(f"Removed {result.deleted_count} duplicate records of tx {group['_id']['tx_hash']}")
+    return deleted
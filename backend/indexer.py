@@ -0,0 +1,290 @@
+"""
+On-chain indexer for the PioSwap factory and pair contracts.
+
+Pulls Swap/Sync/Mint/Burn/PairCreated logs from the PIOGOLD RPC in
+block-range batches, a few blocks behind the head, and writes them in bulk:
+
+- Swap, Mint and Burn logs become transaction records keyed by
+  (tx_hash, log_index). The unique index skips events that were already
+  recorded, so re-indexing a range is harmless. A client-reported record
+  for the same tx_hash (log_index None) is replaced by the indexed ones;
+  derived aggregates (stats, candles, volume windows, wallet sketches)
+  were already counted for it when it was reported, so only events not
+  seen before are fed to them. A Mint is attributed to its transaction's
+  `from` (Mint.sender is the router), and a swap hop paid to another
+  tracked pair isn't counted as a wallet.
+- The last Sync of each pair in the range sets that pool's reserves and
+  refreshes its tvl and apr (liquidity.set_reserves_many, one bulk_write).
+- PairCreated logs from the factory register pools not yet in Mongo.
+
+The last indexed block is checkpointed in indexer_state after each batch's
+writes, so a restart resumes where the previous run stopped.
+
+Usage:
+    python indexer.py                  # follow the chain
+    python indexer.py --once           # catch up to the head and exit
+    python indexer.py --from-block N   # re-index from block N
+"""
+from database import db
+from rpc_client import RPCClient, RPCError
+from chain_events import DECODERS, decode_log
+from chain_reads import DEFAULT_DECIMALS, pool_reserves, scale
+from seed_data import CONTRACT_ADDRESSES
+from idempotency import insert_new_transactions
+from liquidity import set_reserves_many
+from models import Pool, Transaction
+from pairs import pair_key, sorted_pair
+from pool_graph import pool_graph
+from token_registry import token_registry
+from candles import record_trade
+from volume_windows import volume_windows
+from unique_wallets import record_wallet
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import protocol_stats
+import argparse
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = "pair_events"
+FACTORY_ADDRESS = CONTRACT_ADDRESSES["FACTORY"].lower()
+
+START_BLOCK = int(os.environ.get('INDEXER_START_BLOCK', '0'))
+BATCH_BLOCKS = int(os.environ.get('INDEXER_BATCH_BLOCKS', '500'))
+CONFIRMATIONS = int(os.environ.get('INDEXER_CONFIRMATIONS', '3'))
+POLL_SECONDS = float(os.environ.get('INDEXER_POLL_SECONDS', '5'))
+
+
+def event_transaction(event: dict, pool: dict, decimals: Dict[str, int], timestamp: datetime,
+                      sender: Optional[str] = None) -> Optional[dict]:
+    """Transaction record for a Swap, Mint or Burn event of a pool's pair.
+    `sender` is the `from` of the event's transaction; Mint.sender is the router,
+    so a Mint is attributed to it instead.
+    """
+    # Pair amounts are in the contract's token order, i.e. sorted by address
+    token0, token1 = sorted_pair(pool["token0_address"], pool["token1_address"])
+    decimals0 = decimals.get(token0, DEFAULT_DECIMALS)
+    decimals1 = decimals.get(token1, DEFAULT_DECIMALS)
+
+    if event["event"] == "Swap":
+        if event["amount0_in"] > 0:
+            fields = dict(token0_address=token0, token1_address=token1,
+                          amount0=scale(event["amount0_in"], decimals0), amount1=scale(event["amount1_out"], decimals1))
+        else:
+            fields = dict(token0_address=token1, token1_address=token0,
+                          amount0=scale(event["amount1_in"], decimals1), amount1=scale(event["amount0_out"], decimals0))
+        fields.update(type="swap", wallet_address=event["to"])
+    elif event["event"] in ("Mint", "Burn"):
+        fields = dict(
+            type="add" if event["event"] == "Mint" else "remove",
+            wallet_address=sender if event["event"] == "Mint" else event["to"],
+            token0_address=token0, token1_address=token1,
+            amount0=scale(event["amount0"], decimals0), amount1=scale(event["amount1"], decimals1)
+        )
+    else:
+        return None
+    return Transaction(
+        tx_hash=event["tx_hash"], log_index=event["log_index"], timestamp=timestamp, status="confirmed", **fields
+    ).model_dump()
+
+
+def latest_reserves(events: List[dict], pools: Dict[str, dict], decimals: Dict[str, int]) -> Dict[str, tuple]:
+    """pool id -> (token0_reserve, token1_reserve) in the pool's own token order, from each pair's last Sync"""
+    reserves = {}
+    for event in events:
+        if event["event"] != "Sync":
+            continue
+        pool = pools[event["address"]]
+        reserves[pool["id"]] = pool_reserves(pool, event["reserve0"], event["reserve1"], decimals)
+    return reserves
+
+
+class PairIndexer:
+    def __init__(self, rpc: RPCClient, batch_blocks: int = BATCH_BLOCKS, confirmations: int = CONFIRMATIONS,
+                 factory: str = FACTORY_ADDRESS):
+        self.rpc = rpc
+        self.batch_blocks = batch_blocks
+        self.confirmations = confirmations
+        self.factory = factory.lower()
+        self.pools: Dict[str, dict] = {}  # pair address -> pool
+
+    async def load_pools(self):
+        pools = await db.pools.find(
+            {"pair_address": {"$type": "string"}},
+            {"_id": 0, "id": 1, "token0_address": 1, "token1_address": 1, "pair_key": 1, "pair_address": 1}
+        ).to_list(None)
+        self.pools = {pool["pair_address"].lower(): pool for pool in pools}
+        logger.info(f"Indexer tracking {len(self.pools)} pairs")
+
+    async def last_block(self) -> Optional[int]:
+        state = await db.indexer_state.find_one({"_id": CHECKPOINT_ID})
+        return state["last_block"] if state else None
+
+    async def save_checkpoint(self, block: int):
+        await db.indexer_state.update_one(
+            {"_id": CHECKPOINT_ID},
+            {"$set": {"last_block": block, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def fetch_events(self, from_block: int, to_block: int) -> List[dict]:
+        """Decoded events of the indexed kinds in a block range, in chain order"""
+        logs = await self.rpc.get_logs(from_block, to_block, topics=[list(DECODERS)])
+        events = [event for event in map(decode_log, logs) if event]
+        events.sort(key=lambda e: (e["block_number"], e["log_index"]))
+        return events
+
+    async def add_pair(self, event: dict):
+        """Register the pool of a PairCreated event unless the pair is already known"""
+        token0, token1, pair = event["token0"], event["token1"], event["pair"]
+        pool = Pool(token0_address=token0, token1_address=token1, pair_address=pair).model_dump()
+        del pool["pair_address"]
+        result = await db.pools.update_one(
+            {"$or": [{"pair_key": pair_key(token0, token1)}, {"pair_address": pair}]},
+            {"$set": {"pair_address": pair}, "$setOnInsert": pool},
+            upsert=True
+        )
+        stored = await db.pools.find_one({"pair_address": pair}, {"_id": 0})
+        self.pools[pair] = stored
+        if result.upserted_id is not None:
+            await pool_graph.apply(stored)
+            await protocol_stats.record_pool_created()
+            logger.info(f"Indexed new pair {pair} ({token0}/{token1}) at block {event['block_number']}")
+
+    async def block_timestamps(self, events: List[dict]) -> Dict[int, datetime]:
+        """Block number -> block time for the events, fetching headers the logs didn't carry"""
+        times = {e["block_number"]: e["block_timestamp"] for e in events if e["block_timestamp"] is not None}
+        missing = sorted({e["block_number"] for e in events} - set(times))
+        blocks = await self.rpc.get_blocks(missing) if missing else []
+        for number, block in zip(missing, blocks):
+            times[number] = int(block["timestamp"], 16)
+        return {number: datetime.fromtimestamp(ts, tz=timezone.utc) for number, ts in times.items()}
+
+    async def transaction_senders(self, events: List[dict]) -> Dict[str, str]:
+        """tx hash -> `from` address for the transactions of the Mint events"""
+        hashes = sorted({e["tx_hash"] for e in events if e["event"] == "Mint"})
+        if not hashes:
+            return {}
+        senders = {}
+        for tx_hash, tx in zip(hashes, await self.rpc.get_transactions(hashes)):
+            if tx is None:
+                raise RPCError(-32000, f"transaction {tx_hash} not found")
+            senders[tx_hash] = tx["from"].lower()
+        return senders
+
+    async def write_transactions(self, events: List[dict], decimals: Dict[str, int], tokens: Dict[str, dict]) -> int:
+        """Insert transaction records for Swap/Mint/Burn events; returns how many were new"""
+        events = [e for e in events if e["event"] in ("Swap", "Mint", "Burn")]
+        if not events:
+            return 0
+        timestamps, senders = await asyncio.gather(self.block_timestamps(events), self.transaction_senders(events))
+        txs = [
+            event_transaction(e, self.pools[e["address"]], decimals, timestamps[e["block_number"]],
+                              senders.get(e["tx_hash"]))
+            for e in events
+        ]
+        hashes = list({tx["tx_hash"] for tx in txs})
+        reported = set(await db.transactions.distinct("tx_hash", {"tx_hash": {"$in": hashes}, "log_index": None}))
+
+        inserted = await insert_new_transactions(txs)
+        if reported:
+            await db.transactions.delete_many({"tx_hash": {"$in": list(reported)}, "log_index": None})
+
+        pool_ids = {pool["pair_key"]: pool["id"] for pool in self.pools.values() if pool.get("pair_key")}
+        derived = []
+        for tx in inserted:
+            if tx["type"] != "swap" or tx["tx_hash"] in reported:
+                continue
+            pool_id = pool_ids.get(tx["pair_key"])
+            volume_usd = tx["amount0"] * tokens.get(tx["token0_address"], {}).get("price", 1)
+            derived += [
+                protocol_stats.record_swap(volume_usd),
+                record_trade(tx["token0_address"], tx["token1_address"], tx["amount0"], tx["amount1"], tx["timestamp"]),
+                volume_windows.record(pool_id, volume_usd, tx["timestamp"])
+            ]
+            # A multi-hop swap pays each hop but the last to the next pair, which is no wallet
+            if tx["wallet_address"] not in self.pools:
+                derived.append(record_wallet(tx["wallet_address"], pool_id, tx["timestamp"]))
+        await asyncio.gather(*derived)
+        return len(inserted)
+
+    async def index_range(self, from_block: int, to_block: int) -> dict:
+        """Index one block range and checkpoint it"""
+        events = await self.fetch_events(from_block, to_block)
+
+        # New pairs first, so their own events in the same range are kept
+        tracked = []
+        for event in events:
+            if event["event"] == "PairCreated":
+                if event["address"] == self.factory:
+                    await self.add_pair(event)
+            elif event["address"] in self.pools:
+                tracked.append(event)
+
+        token_addresses = {a for e in tracked for a in sorted_pair(
+            self.pools[e["address"]]["token0_address"], self.pools[e["address"]]["token1_address"]
+        )}
+        tokens = await token_registry.get_many(token_addresses)
+        decimals = {address: token.get("decimals", DEFAULT_DECIMALS) for address, token in tokens.items()}
+
+        transactions = await self.write_transactions(tracked, decimals, tokens)
+        pools = await set_reserves_many(latest_reserves(tracked, self.pools, decimals))
+        await self.save_checkpoint(to_block)
+        if events:
+            logger.info(f"Indexed blocks {from_block}-{to_block}: {len(events)} events, "
+                        f"{transactions} new transactions, {pools} pools resynced")
+        return {"events": len(events), "transactions": transactions, "pools": pools}
+
+    async def run_once(self, from_block: Optional[int] = None) -> int:
+        """Index from the checkpoint (or `from_block`) up to the confirmed head; returns the last block indexed"""
+        if not self.pools:
+            await self.load_pools()
+        if from_block is None:
+            last = await self.last_block()
+            from_block = START_BLOCK if last is None else last + 1
+        head = await self.rpc.block_number() - self.confirmations
+
+        while from_block <= head:
+            to_block = min(from_block + self.batch_blocks - 1, head)
+            try:
+                await self.index_range(from_block, to_block)
+            except RPCError as e:
+                # Nodes cap the size of a getLogs reply; retry with a smaller range
+                if to_block == from_block:
+                    raise
+                self.batch_blocks = max(1, self.batch_blocks // 2)
+                logger.warning(f"getLogs {from_block}-{to_block} failed ({e.message}), batch now {self.batch_blocks} blocks")
+                continue
+            from_block = to_block + 1
+        return head
+
+    async def run_forever(self, poll_seconds: float = POLL_SECONDS, from_block: Optional[int] = None):
+        while True:
+            try:
+                await self.run_once(from_block)
+                from_block = None
+            except Exception as e:
+                logger.error(f"Error indexing chain: {e}")
+            await asyncio.sleep(poll_seconds)
+
+
+async def main(once: bool, from_block: Optional[int]):
+    async with RPCClient() as rpc:
+        indexer = PairIndexer(rpc)
+        if once:
+            await indexer.run_once(from_block)
+        else:
+            await indexer.run_forever(from_block=from_block)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index PioSwap pair events from the PIOGOLD chain")
+    parser.add_argument("--once", action="store_true", help="Catch up to the head and exit")
+    parser.add_argument("--from-block", type=int, help="Re-index starting at this block instead of the checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main(args.once, args.from_block))
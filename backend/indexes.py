@@ -0,0 +1,187 @@
+"""
+Declared index plan and idempotent reconciliation.
+
+Every index the API relies on is listed in INDEX_PLAN. On startup
+``ensure_indexes()`` creates whichever are missing; existing indexes with
+the same keys are left alone, so it is safe to run on every boot and on
+deployments that were seeded before an index was added.
+
+Indexes are never dropped automatically. ``index_report()`` uses
+``$indexStats`` to list planned indexes that are missing, indexes that are
+not in the plan, and indexes with no recorded use since the server started.
+
+Usage:
+    python indexes.py             # create missing indexes
+    python indexes.py --report    # print the index report as JSON
+"""
+from database import db
+from volume_windows import BUCKET_TTL_SECONDS
+from idempotency import HAS_TX_HASH
+from pool_graph import CHANGE_LOG_TTL_SECONDS
+from token_registry import CHANGE_LOG_TTL_SECONDS as TOKEN_CHANGE_LOG_TTL_SECONDS
+from pricing import SNAPSHOT_TTL_SECONDS
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only documents that carry a canonical pair key are indexed on it. $exists
+# (rather than $type) lets plain equality lookups on pair_key use the index.
+HAS_PAIR_KEY = {"pair_key": {"$exists": True}}
+
+# Keyset pagination indexes put equality fields first, then (timestamp, id)
+INDEX_PLAN: Dict[str, List[IndexModel]] = {
+    "tokens": [
+        IndexModel([("address", 1)], unique=True),
+        IndexModel([("symbol", 1)]),
+    ],
+    "pools": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("pair_key", 1)], unique=True, partialFilterExpression=HAS_PAIR_KEY),
+        IndexModel([("token0_address", 1), ("token1_address", 1)]),
+        IndexModel([("token1_address", 1)]),
+        IndexModel([("pair_address", 1)]),
+        IndexModel([("tvl", -1), ("id", -1)]),
+        IndexModel([("volume_24h", -1), ("id", -1)]),
+        IndexModel([("apr", -1), ("id", -1)]),
+    ],
+    "positions": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("wallet_address", 1)]),
+        # One position per wallet and pool; positions are upserted on this key
+        IndexModel([("pool_id", 1), ("wallet_address", 1)], unique=True),
+    ],
+    "transactions": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("timestamp", -1), ("id", -1)]),
+        IndexModel([("wallet_address", 1), ("timestamp", -1), ("id", -1)]),
+        IndexModel([("pair_key", 1), ("timestamp", -1), ("id", -1)], partialFilterExpression=HAS_PAIR_KEY),
+        IndexModel([("tx_hash", 1), ("log_index", 1)], unique=True, partialFilterExpression=HAS_TX_HASH),
+    ],
+    "candles": [
+        IndexModel([("pair_key", 1), ("interval", 1), ("bucket", 1)], unique=True),
+    ],
+    "volume_buckets": [
+        IndexModel([("key", 1), ("epoch", 1)], unique=True),
+        IndexModel([("bucket", 1)], expireAfterSeconds=BUCKET_TTL_SECONDS),
+    ],
+    "price_snapshots": [
+        IndexModel([("address", 1), ("hour", 1)], unique=True),
+        IndexModel([("hour", 1)], expireAfterSeconds=SNAPSHOT_TTL_SECONDS),
+    ],
+    "pool_changes": [
+        IndexModel([("version", 1)], unique=True),
+        IndexModel([("created_at", 1)], expireAfterSeconds=CHANGE_LOG_TTL_SECONDS),
+    ],
+    "token_changes": [
+        IndexModel([("version", 1)], unique=True),
+        IndexModel([("created_at", 1)], expireAfterSeconds=TOKEN_CHANGE_LOG_TTL_SECONDS),
+    ],
+    "sketches": [
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+}
+
+# Options that make two indexes on the same keys behave differently
+COMPARED_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression")
+
+# Indexes correctness depends on (not just speed); startup fails without them
+REQUIRED_INDEXES = {
+    "transactions": [(("tx_hash", 1), ("log_index", 1))],  # Exactly-once ingestion by tx_hash
+    "positions": [(("pool_id", 1), ("wallet_address", 1))],  # add_to_position upserts on this key
+}
+
+
+def index_key(keys) -> Tuple[Tuple[str, int], ...]:
+    """Normalize an index key spec (SON, dict or list of pairs) for comparison"""
+    items = keys.items() if hasattr(keys, "items") else keys
+    return tuple((field, int(direction)) for field, direction in items)
+
+
+async def existing_indexes(collection: str) -> Dict[Tuple[Tuple[str, int], ...], dict]:
+    """Indexes on a collection keyed by their normalized key spec"""
+    indexes = {}
+    async for info in db[collection].list_indexes():
+        indexes[index_key(info["key"])] = info
+    return indexes
+
+
+async def ensure_indexes() -> List[str]:
+    """Create every planned index that is missing and return their names"""
+    created = []
+    for collection, models in INDEX_PLAN.items():
+        existing = await existing_indexes(collection)
+        missing = []
+        for model in models:
+            spec = model.document
+            current = existing.get(index_key(spec["key"]))
+            if current is None:
+                missing.append(model)
+                continue
+            for option in COMPARED_OPTIONS:
+                if current.get(option) != spec.get(option):
+                    logger.warning(
+                        f"Index {collection}.{current['name']} differs from the plan on '{option}' "
+                        f"({current.get(option)!r} != {spec.get(option)!r}); drop it to rebuild"
+                    )
+        for model in missing:
+            # One at a time, so a failing index (e.g. duplicates under a
+            # unique key) doesn't block the rest of the plan
+            try:
+                names = await db[collection].create_indexes([model])
+                created.extend(f"{collection}.{name}" for name in names)
+            except OperationFailure as e:
+                logger.error(f"Failed to create index {collection}.{model.document['name']}: {e}")
+    if created:
+        logger.info(f"Created indexes: {', '.join(created)}")
+    return created
+
+
+async def verify_required_indexes():
+    """Raise if a required index is missing or differs from the plan"""
+    problems = []
+    for collection, keys in REQUIRED_INDEXES.items():
+        existing = await existing_indexes(collection)
+        planned = {index_key(model.document["key"]): model.document for model in INDEX_PLAN[collection]}
+        for key in keys:
+            current = existing.get(key)
+            if current is None or any(current.get(option) != planned[key].get(option) for option in COMPARED_OPTIONS):
+                problems.append(f"{collection}.{planned[key]['name']}")
+    if problems:
+        raise RuntimeError(f"Required indexes missing or not as planned: {', '.join(problems)}")
+
+
+async def index_report() -> Dict[str, dict]:
+    """Compare live indexes against the plan using $indexStats"""
+    report = {}
+    for collection, models in INDEX_PLAN.items():
+        planned = {index_key(model.document["key"]): model.document["name"] for model in models}
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        live = {index_key(s["key"]): s for s in stats}
+        report[collection] = {
+            "missing": [name for key, name in planned.items() if key not in live],
+            "unplanned": sorted(
+                s["name"] for key, s in live.items() if key not in planned and s["name"] != "_id_"
+            ),
+            "unused": sorted(s["name"] for s in stats if s["accesses"]["ops"] == 0),
+            "accesses": {s["name"]: s["accesses"]["ops"] for s in stats},
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes with the declared plan")
+    parser.add_argument("--report", action="store_true",
+                        help="Print missing, unplanned and unused indexes instead of creating any")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.report:
+        print(json.dumps(asyncio.run(index_report()), indent=2, default=str))
+    else:
+        asyncio.run(ensure_indexes())
@@ -0,0 +1,69 @@
+"""
+Time-limited leases so a background job runs in one worker at a time.
+
+Every uvicorn worker starts the same background tasks. Jobs that must not
+run concurrently take a named lease in the leases collection first: one
+document per lease holding the current holder and when the lease expires.
+``acquire()`` takes a free or expired lease, or renews one already held,
+in a single conditional upsert; a lease held by someone else makes the
+upsert collide on ``_id`` and fails. A worker that dies simply stops
+renewing, and another takes over once the lease expires.
+"""
+from database import db
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire(name: str, ttl_seconds: float, holder: str = WORKER_ID) -> bool:
+    """Take or renew the lease `name` for `ttl_seconds`; False if another holder has it"""
+    now = datetime.utcnow()
+    try:
+        lease = await db.leases.find_one_and_update(
+            {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return False
+    return lease is not None
+
+
+async def release(name: str, holder: str = WORKER_ID):
+    """Give the lease up early if we hold it"""
+    await db.leases.delete_one({"_id": name, "holder": holder})
+
+
+@asynccontextmanager
+async def held(name: str, ttl_seconds: float, holder: str = WORKER_ID):
+    """Yield whether the lease was taken; while it is, keep renewing it and release it on exit"""
+    if not await acquire(name, ttl_seconds, holder):
+        yield False
+        return
+
+    async def renew():
+        while True:
+            await asyncio.sleep(ttl_seconds / 3)
+            try:
+                if not await acquire(name, ttl_seconds, holder):
+                    logger.warning(f"Lost the {name} lease")
+            except Exception as e:
+                logger.error(f"Error renewing the {name} lease: {e}")
+
+    renewer = asyncio.create_task(renew())
+    try:
+        yield True
+    finally:
+        renewer.cancel()
+        await release(name, holder)
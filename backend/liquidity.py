@@ -0,0 +1,251 @@
+"""
+Atomic liquidity changes for pools and positions.
+
+Reserve changes are applied with one ``find_one_and_update`` whose update
+pipeline adds the deltas and recomputes tvl and apr from the stored
+reserves, so concurrent adds and removes can't overwrite each other.
+The pool is returned as it was before the update; ``apply_reserve_change``
+mirrors the pipeline in Python to derive the updated pool from it, which
+gives the exact TVL change for the protocol stats without another read.
+"""
+from database import db
+from pool_graph import pool_graph
+from token_registry import token_registry
+from pymongo import ReturnDocument, UpdateOne
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import protocol_stats
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# APR grows with TVL from the fee rate and is capped at 100%
+APR_TVL_SCALE = 1_000_000
+MAX_APR = 100.0
+
+
+def pool_apr(fee: float, tvl: float) -> float:
+    return min(fee * 100 * (1 + tvl / APR_TVL_SCALE), MAX_APR) if tvl > 0 else 0.0
+
+
+def _valuation_stages(price0: float, price1: float) -> list:
+    """Pipeline stages refreshing tvl and apr from the stored reserves"""
+    return [
+        {"$set": {"tvl": {"$add": [
+            {"$multiply": ["$token0_reserve", price0]},
+            {"$multiply": ["$token1_reserve", price1]}
+        ]}}},
+        {"$set": {"apr": {"$cond": [
+            {"$gt": ["$tvl", 0]},
+            {"$min": [
+                {"$multiply": [{"$multiply": ["$fee", 100]}, {"$add": [1, {"$divide": ["$tvl", APR_TVL_SCALE]}]}]},
+                MAX_APR
+            ]},
+            0
+        ]}}}
+    ]
+
+
+def reserve_update(amount0: float, amount1: float, price0: float, price1: float) -> list:
+    """Update pipeline adding signed amounts to the reserves (floored at 0) and refreshing tvl and apr"""
+    return [
+        {"$set": {
+            "token0_reserve": {"$max": [0, {"$add": [{"$ifNull": ["$token0_reserve", 0]}, amount0]}]},
+            "token1_reserve": {"$max": [0, {"$add": [{"$ifNull": ["$token1_reserve", 0]}, amount1]}]}
+        }},
+        *_valuation_stages(price0, price1)
+    ]
+
+
+def reserve_set(reserve0: float, reserve1: float, price0: float, price1: float) -> list:
+    """Update pipeline replacing the reserves with on-chain values and refreshing tvl and apr"""
+    return [
+        {"$set": {"token0_reserve": reserve0, "token1_reserve": reserve1}},
+        *_valuation_stages(price0, price1)
+    ]
+
+
+def apply_reserve_change(pool: dict, amount0: float, amount1: float, price0: float, price1: float) -> dict:
+    """The pool document reserve_update() produces from `pool`"""
+    reserve0 = max(0, pool.get("token0_reserve", 0) + amount0)
+    reserve1 = max(0, pool.get("token1_reserve", 0) + amount1)
+    tvl = reserve0 * price0 + reserve1 * price1
+    return {
+        **pool,
+        "token0_reserve": reserve0,
+        "token1_reserve": reserve1,
+        "tvl": tvl,
+        "apr": pool_apr(pool["fee"], tvl)
+    }
+
+
+async def change_reserves(pool: dict, amount0: float, amount1: float) -> Optional[Tuple[dict, dict]]:
+    """Atomically add signed amounts to a pool's reserves.
+    Returns (pool before, pool after), or None if the pool no longer exists.
+    """
+    tokens = await token_registry.get_many([pool["token0_address"], pool["token1_address"]])
+    price0 = tokens.get(pool["token0_address"], {}).get("price", 1)
+    price1 = tokens.get(pool["token1_address"], {}).get("price", 1)
+
+    before = await db.pools.find_one_and_update(
+        {"id": pool["id"]},
+        reserve_update(amount0, amount1, price0, price1),
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not before:
+        return None
+    after = apply_reserve_change(before, amount0, amount1, price0, price1)
+    await pool_graph.apply(after)
+    await protocol_stats.record_tvl_change(after["tvl"] - before.get("tvl", 0))
+    return before, after
+
+
+async def set_reserves_many(reserves: Dict[str, Tuple[float, float]]) -> int:
+    """Replace the reserves of several pools (pool id -> (token0_reserve, token1_reserve)) with one
+    bulk_write, refreshing tvl and apr. Returns the number of pools written.
+    """
+    if not reserves:
+        return 0
+    pools = await db.pools.find(
+        {"id": {"$in": list(reserves)}},
+        {"_id": 0, "id": 1, "token0_address": 1, "token1_address": 1, "fee": 1, "tvl": 1}
+    ).to_list(None)
+    tokens = await token_registry.get_many(
+        address for pool in pools for address in (pool["token0_address"], pool["token1_address"])
+    )
+    updates, updated = [], []
+    tvl_change = 0.0
+    for pool in pools:
+        price0 = tokens.get(pool["token0_address"], {}).get("price", 1)
+        price1 = tokens.get(pool["token1_address"], {}).get("price", 1)
+        reserve0, reserve1 = reserves[pool["id"]]
+        updates.append(UpdateOne({"id": pool["id"]}, reserve_set(reserve0, reserve1, price0, price1)))
+        tvl = reserve0 * price0 + reserve1 * price1
+        updated.append({
+            **pool, "token0_reserve": reserve0, "token1_reserve": reserve1, "tvl": tvl, "apr": pool_apr(pool["fee"], tvl)
+        })
+        tvl_change += tvl - pool.get("tvl", 0)
+    if updates:
+        await db.pools.bulk_write(updates, ordered=False)
+        await protocol_stats.record_tvl_change(tvl_change)
+        await pool_graph.apply_many(updated)
+    return len(updates)
+
+
+def position_add_update(position_id: str, amount0: float, amount1: float, min_price: float, max_price: float) -> list:
+    """Upsert pipeline adding amounts to a wallet's position and recomputing its liquidity"""
+    now = datetime.utcnow()
+    return [
+        {"$set": {
+            "id": {"$ifNull": ["$id", position_id]},
+            "token0_amount": {"$add": [{"$ifNull": ["$token0_amount", 0]}, amount0]},
+            "token1_amount": {"$add": [{"$ifNull": ["$token1_amount", 0]}, amount1]},
+            "min_price": min_price,
+            "max_price": max_price,
+            "unclaimed_fees": {"$ifNull": ["$unclaimed_fees", 0.0]},
+            "in_range": {"$ifNull": ["$in_range", True]},
+            "created_at": {"$ifNull": ["$created_at", now]},
+            "updated_at": now
+        }},
+        {"$set": {"liquidity": {"$sqrt": {"$multiply": ["$token0_amount", "$token1_amount"]}}}}
+    ]
+
+
+async def add_to_position(pool_id: str, wallet_address: str, amount0: float, amount1: float,
+                          min_price: float, max_price: float) -> dict:
+    """Atomically create or grow a wallet's position in a pool and return it"""
+    return await db.positions.find_one_and_update(
+        {"pool_id": pool_id, "wallet_address": wallet_address},
+        position_add_update(str(uuid.uuid4()), amount0, amount1, min_price, max_price),
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def remove_from_position(position_id: str, amount0: float, amount1: float) -> Optional[dict]:
+    """Atomically take amounts out of a position and return it.
+    Returns None if the position is gone or no longer holds the amounts.
+    """
+    return await db.positions.find_one_and_update(
+        {"id": position_id, "token0_amount": {"$gte": amount0}, "token1_amount": {"$gte": amount1}},
+        [
+            {"$set": {
+                "token0_amount": {"$max": [0, {"$subtract": ["$token0_amount", amount0]}]},
+                "token1_amount": {"$max": [0, {"$subtract": ["$token1_amount", amount1]}]},
+                "updated_at": datetime.utcnow()
+            }},
+            {"$set": {"liquidity": {"$sqrt": {"$multiply": ["$token0_amount", "$token1_amount"]}}}}
+        ],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+
+async def undo_position_add(position_id: str, amount0: float, amount1: float) -> bool:
+    """Take an add back out of a position, deleting it if that empties it.
+    Returns False if the position no longer holds the amounts.
+    """
+    position = await remove_from_position(position_id, amount0, amount1)
+    if position is None:
+        return False
+    await db.positions.delete_one({"id": position_id, "token0_amount": 0, "token1_amount": 0})
+    return True
+
+
+async def restore_position(position: dict, amount0: float, amount1: float):
+    """Put amounts taken out of a position back, recreating it if it was deleted"""
+    await db.positions.update_one(
+        {"id": position["id"], "pool_id": position["pool_id"], "wallet_address": position["wallet_address"]},
+        position_add_update(position["id"], amount0, amount1,
+                            position.get("min_price", 0.0), position.get("max_price", 0.0)),
+        upsert=True
+    )
+
+
+async def has_position_key_index() -> bool:
+    async for info in db.positions.list_indexes():
+        if list(info["key"].items()) == [("pool_id", 1), ("wallet_address", 1)] and info.get("unique"):
+            return True
+    return False
+
+
+async def merge_duplicate_positions() -> int:
+    """Fold every wallet's positions in a pool into its oldest one so the unique
+    (pool_id, wallet_address) index can be built. Skipped once the index exists;
+    returns the number of positions merged away.
+    """
+    if await has_position_key_index():
+        return 0
+    groups = db.positions.aggregate([
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$group": {
+            "_id": {"pool_id": "$pool_id", "wallet_address": "$wallet_address"},
+            "ids": {"$push": "$_id"},
+            "token0_amount": {"$sum": "$token0_amount"},
+            "token1_amount": {"$sum": "$token1_amount"},
+            "unclaimed_fees": {"$sum": "$unclaimed_fees"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    merged = 0
+    async for group in groups:
+        keep, duplicates = group["ids"][0], group["ids"][1:]
+        await db.positions.update_one({"_id": keep}, {"$set": {
+            "token0_amount": group["token0_amount"],
+            "token1_amount": group["token1_amount"],
+            "liquidity": (group["token0_amount"] * group["token1_amount"]) ** 0.5,
+            "unclaimed_fees": group["unclaimed_fees"],
+            "updated_at": datetime.utcnow()
+        }})
+        result = await db.positions.delete_many({"_id": {"$in": duplicates}})
+        merged += result.deleted_count
+        logger.warning(
+            f"Merged {result.deleted_count} duplicate positions of {group['_id']['wallet_address']} "
+            f"in pool {group['_id']['pool_id']}"
+        )
+    return merged
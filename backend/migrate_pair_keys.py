@@ -0,0 +1,67 @@
+"""
+Backfill the canonical pair_key on pools and transactions.
+
+Documents written before pair_key existed are updated server-side with an
+update pipeline, so nothing is read back into the API process. The
+migration records completion in backfill_checkpoints and is skipped on
+later startups; new writes carry pair_key from the Pool and Transaction
+models.
+
+Usage:
+    python migrate_pair_keys.py            # run once, skip if already done
+    python migrate_pair_keys.py --force    # re-scan for documents missing pair_key
+"""
+from database import db
+import argparse
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = "pair_keys"
+COLLECTIONS = ("pools", "transactions")
+
+
+def pair_key_expression() -> dict:
+    """Aggregation expression matching pairs.pair_key: lowercased addresses, sorted, joined by '_'"""
+    token0 = {"$toLower": "$token0_address"}
+    token1 = {"$toLower": "$token1_address"}
+    return {"$cond": [
+        {"$lte": [token0, token1]},
+        {"$concat": [token0, "_", token1]},
+        {"$concat": [token1, "_", token0]}
+    ]}
+
+
+async def backfill_pair_keys(collection: str) -> int:
+    """Set pair_key on every document of a collection that lacks it; returns documents updated"""
+    result = await db[collection].update_many(
+        {"pair_key": {"$exists": False}},
+        [{"$set": {"pair_key": pair_key_expression()}}]
+    )
+    logger.info(f"pair_key: updated {result.modified_count} {collection}")
+    return result.modified_count
+
+
+async def migrate_pair_keys(force: bool = False) -> int:
+    """Backfill pair_key on pools and transactions unless already done"""
+    if not force:
+        checkpoint = await db.backfill_checkpoints.find_one({"_id": CHECKPOINT_ID})
+        if checkpoint and checkpoint.get("completed"):
+            return 0
+    updated = 0
+    for collection in COLLECTIONS:
+        updated += await backfill_pair_keys(collection)
+    await db.backfill_checkpoints.update_one(
+        {"_id": CHECKPOINT_ID}, {"$set": {"completed": True}}, upsert=True
+    )
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill canonical pair keys on pools and transactions")
+    parser.add_argument("--force", action="store_true", help="Run even if the migration already completed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(migrate_pair_keys(args.force))
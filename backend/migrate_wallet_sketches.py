@@ -0,0 +1,155 @@
+"""
+Backfill the unique-wallet sketches from historical swaps.
+
+Only swaps recorded after the sketches existed were counted in them, so on
+older deployments total_swappers would start near zero. This folds the
+wallet of every swap in the transactions collection into the total, pool,
+daily and hourly sketches (hourly and daily only while still inside their
+retention). Sketch registers merge with ``$max``, so a swap counted both
+live and by the backfill, or twice after a resumed run, is still one
+wallet.
+
+Swaps are streamed in (timestamp, id) order and flushed in batches. The
+last swap of each flushed batch is checkpointed in backfill_checkpoints,
+so an interrupted run resumes where it stopped, and a completed run is
+skipped on later startups.
+
+The server runs it in the background (``backfill_in_background()``) under
+the ``wallet_sketches`` lease, so only one worker scans the swaps and
+startup doesn't wait for it. Until it completes, swapper counts only
+include swaps recorded since the sketches existed.
+
+Usage:
+    python migrate_wallet_sketches.py            # run once, skip if already done
+    python migrate_wallet_sketches.py --force    # re-scan every swap
+"""
+from database import db
+from hyperloglog import DEFAULT_PRECISION, register_update
+from unique_wallets import DAILY_RETENTION, HOURLY_RETENTION, TOTAL_SKETCH, day_sketch, hour_sketch, pool_sketch
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import argparse
+import asyncio
+import leases
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = "wallet_sketches"
+BATCH_SIZE = 5000
+LEASE_SECONDS = 60.0
+
+
+class SketchBatch:
+    """Registers to raise per sketch, accumulated in memory between flushes"""
+
+    def __init__(self):
+        self.registers: Dict[str, Dict[str, int]] = {}
+        self.expires_at: Dict[str, datetime] = {}
+
+    def add(self, sketch_id: str, index: int, rank: int, expires_at: Optional[datetime] = None):
+        registers = self.registers.setdefault(sketch_id, {})
+        key = f"registers.{index}"
+        if rank > registers.get(key, 0):
+            registers[key] = rank
+        if expires_at is not None:
+            self.expires_at[sketch_id] = max(expires_at, self.expires_at.get(sketch_id, expires_at))
+
+    def operations(self) -> list:
+        operations = []
+        for sketch_id, registers in self.registers.items():
+            on_insert = {"precision": DEFAULT_PRECISION}
+            if sketch_id in self.expires_at:
+                on_insert["expires_at"] = self.expires_at[sketch_id]
+            operations.append(UpdateOne({"_id": sketch_id}, {"$max": registers, "$setOnInsert": on_insert}, upsert=True))
+        return operations
+
+
+def add_swap(batch: SketchBatch, wallet_address: str, timestamp: datetime, pool_id: Optional[str], now: datetime):
+    """Count one historical swap, mirroring unique_wallets.record_wallet"""
+    ts = timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp
+    index, rank = register_update(wallet_address.lower())
+    batch.add(TOTAL_SKETCH, index, rank)
+    if pool_id:
+        batch.add(pool_sketch(pool_id), index, rank)
+    if ts + HOURLY_RETENTION > now:
+        batch.add(hour_sketch(ts), index, rank, ts + HOURLY_RETENTION)
+    if ts + DAILY_RETENTION > now:
+        batch.add(day_sketch(ts), index, rank, ts + DAILY_RETENTION)
+
+
+async def backfill_wallet_sketches(force: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """Fold historical swap wallets into the sketches unless already done; returns swaps read"""
+    checkpoint = await db.backfill_checkpoints.find_one({"_id": CHECKPOINT_ID})
+    if checkpoint and checkpoint.get("completed") and not force:
+        return 0
+    after = checkpoint.get("after") if checkpoint and not force else None
+
+    query = {"type": "swap"}
+    if after:
+        logger.info(f"Wallet sketches: resuming after {after['timestamp']} {after['id']}")
+        query["$or"] = [
+            {"timestamp": {"$gt": after["timestamp"]}},
+            {"timestamp": after["timestamp"], "id": {"$gt": after["id"]}}
+        ]
+    pools = await db.pools.find({"pair_key": {"$exists": True}}, {"_id": 0, "id": 1, "pair_key": 1}).to_list(None)
+    pool_ids = {pool["pair_key"]: pool["id"] for pool in pools}
+    now = datetime.now(timezone.utc)
+
+    read = 0
+    batch, last = SketchBatch(), None
+
+    async def flush():
+        nonlocal batch
+        if last is None:
+            return
+        operations = batch.operations()
+        if operations:
+            await db.sketches.bulk_write(operations, ordered=False)
+        await db.backfill_checkpoints.update_one(
+            {"_id": CHECKPOINT_ID}, {"$set": {"after": last, "completed": False}}, upsert=True
+        )
+        logger.info(f"Wallet sketches: {read} swaps folded in")
+        batch = SketchBatch()
+
+    cursor = db.transactions.find(
+        query, {"_id": 0, "id": 1, "wallet_address": 1, "timestamp": 1, "pair_key": 1}
+    ).sort([("timestamp", 1), ("id", 1)]).batch_size(batch_size)
+    async for tx in cursor:
+        if tx.get("wallet_address") and tx.get("timestamp"):
+            add_swap(batch, tx["wallet_address"], tx["timestamp"], pool_ids.get(tx.get("pair_key")), now)
+        read += 1
+        last = {"timestamp": tx["timestamp"], "id": tx["id"]}
+        if read % batch_size == 0:
+            await flush()
+    await flush()
+
+    await db.backfill_checkpoints.update_one(
+        {"_id": CHECKPOINT_ID}, {"$set": {"completed": True}}, upsert=True
+    )
+    logger.info(f"Wallet sketches: backfill complete, {read} swaps read")
+    return read
+
+
+async def backfill_in_background():
+    """Background task running the backfill in whichever worker takes the lease first"""
+    try:
+        checkpoint = await db.backfill_checkpoints.find_one({"_id": CHECKPOINT_ID}, {"completed": 1})
+        if checkpoint and checkpoint.get("completed"):
+            return
+        async with leases.held(CHECKPOINT_ID, LEASE_SECONDS) as leader:
+            if leader:
+                await backfill_wallet_sketches()
+    except Exception as e:
+        logger.error(f"Error backfilling wallet sketches: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill unique-wallet sketches from historical swaps")
+    parser.add_argument("--force", action="store_true", help="Run even if the backfill already completed")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(backfill_wallet_sketches(args.force, args.batch_size))
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
 from datetime import datetime
 import uuid
 
+from pairs import pair_key as make_pair_key
+
 
 # Token Models
 class TokenBase(BaseModel):
@@ -54,11 +56,17 @@ class Pool(BaseModel):
     token1_reserve: float = 0.0
     creator_address: Optional[str] = None  # Only creator can add/remove liquidity
     pair_address: Optional[str] = None  # On-chain pair contract address
+    pair_key: Optional[str] = None  # Canonical sorted-pair key, filled in from the addresses
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def fill_pair_key(self):
+        self.pair_key = make_pair_key(self.token0_address, self.token1_address)
+        return self
+
 
 class PoolResponse(BaseModel):
     id: str
@@ -85,7 +93,7 @@ class PositionBase(BaseModel):
 
 
 class PositionCreate(PositionBase):
-    pass
+    tx_hash: Optional[str] = None  # On-chain tx; retries with the same hash are no-ops
 
 
 class Position(PositionBase):
@@ -104,6 +112,7 @@ class PositionRemove(BaseModel):
     position_id: str
     wallet_address: str
     percent: float = 100.0
+    tx_hash: Optional[str] = None  # On-chain tx; retries with the same hash are no-ops
 
 
 # Swap Models
@@ -111,15 +120,49 @@ class SwapQuoteRequest(BaseModel):
     token_in: str
     token_out: str
     amount_in: float
+    max_hops: int = Field(default=3, ge=1, le=4)
+    split: bool = False  # Allow splitting the trade across parallel routes
+
+
+class SwapSplit(BaseModel):
+    route: List[str]  # Pool ids, one per hop
+    path: List[str]  # Token addresses visited
+    amount_in: float
+    amount_out: float
+    percent: float  # Share of amount_in sent down this route
 
 
 class SwapQuoteResponse(BaseModel):
     amount_out: float
     price_impact: float
-    route: List[str]
+    route: List[str]  # Pool ids, one per hop
+    path: List[str] = []  # Token addresses visited, from token_in to token_out
     exchange_rate: float
     minimum_received: float
     fee: float
+    splits: List[SwapSplit] = []  # Per-route breakdown when the quote is split
+
+
+class SwapQuoteBatchItem(BaseModel):
+    token_in: str
+    token_out: str
+    amount_in: float
+
+
+class SwapQuoteBatchRequest(BaseModel):
+    quotes: List[SwapQuoteBatchItem] = Field(max_length=1000)
+    max_hops: int = Field(default=3, ge=1, le=4)
+
+
+class SwapQuoteBatchResult(SwapQuoteResponse):
+    token_in: str
+    token_out: str
+    amount_in: float
+    error: Optional[str] = None  # Set when this quote could not be computed
+
+
+class SwapQuoteBatchResponse(BaseModel):
+    quotes: List[SwapQuoteBatchResult]
 
 
 class SwapExecuteRequest(BaseModel):
@@ -142,12 +185,19 @@ class Transaction(BaseModel):
     amount0: float
     amount1: float
     tx_hash: Optional[str] = None
+    log_index: Optional[int] = None  # Position of the event in its tx, when ingested from logs
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     status: str = "confirmed"  # pending, confirmed, failed
+    pair_key: Optional[str] = None  # Canonical sorted-pair key, filled in from the addresses
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def fill_pair_key(self):
+        self.pair_key = make_pair_key(self.token0_address, self.token1_address)
+        return self
+
 
 class TransactionResponse(BaseModel):
     id: str
@@ -167,6 +217,8 @@ class ProtocolStats(BaseModel):
     total_volume: float = 0.0
     tvl: float = 0.0
     total_swappers: int = 0
+    swappers_24h: int = 0
+    swappers_7d: int = 0
     volume_24h: float = 0.0
     transactions_24h: int = 0
     active_pools: int = 0
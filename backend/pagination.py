@@ -0,0 +1,71 @@
+"""Opaque keyset cursors shared by paginated endpoints"""
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import base64
+import json
+
+
+def encode_cursor(value: Any, last_id: str) -> str:
+    """Encode the sort value and id of the last row on a page"""
+    if isinstance(value, datetime):
+        payload = {"t": "dt", "v": value.isoformat(), "id": last_id}
+    else:
+        payload = {"v": value, "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        return value, str(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(field: str, value: Any, last_id: str, descending: bool = True) -> dict:
+    """Filter matching rows strictly after (value, last_id) in (field, id) order"""
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "id": {op: last_id}}
+    ]}
+
+
+def page_query(query: dict, field: str, cursor: Optional[str], descending: bool = True) -> dict:
+    """Combine a base query with the keyset filter for a cursor, if any"""
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor)
+    after = keyset_filter(field, value, last_id, descending)
+    return {"$and": [query, after]} if query else after
+
+
+async def find_page(
+    collection,
+    query: dict,
+    field: str,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True
+) -> Tuple[List[dict], Optional[str]]:
+    """Get one page ordered by (field, id) and the cursor for the next page (None on the last page).
+    Needs a compound index on (field, id) after any equality fields in the query.
+    """
+    direction = -1 if descending else 1
+    # Fetch one extra row to know whether another page exists
+    docs = await collection.find(page_query(query, field, cursor, descending), {"_id": 0}).sort(
+        [(field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(field, 0), last["id"])
+    return docs, next_cursor
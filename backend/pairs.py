@@ -0,0 +1,15 @@
+"""Canonical token-pair keys"""
+from typing import Tuple
+
+
+def sorted_pair(token_a: str, token_b: str) -> Tuple[str, str]:
+    """The two addresses, lowercased, in canonical (base, quote) order"""
+    token_a = token_a.lower()
+    token_b = token_b.lower()
+    return (token_a, token_b) if token_a <= token_b else (token_b, token_a)
+
+
+def pair_key(token_a: str, token_b: str) -> str:
+    """Direction-independent key identifying a token pair"""
+    base, quote = sorted_pair(token_a, token_b)
+    return f"{base}_{quote}"
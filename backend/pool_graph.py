@@ -0,0 +1,139 @@
+"""Process-wide pool graph kept in sync with the pools collection"""
+from database import db
+from cache_versions import get_version, bump_version
+from routing import PoolGraph
+from events import broker
+from pairs import pair_key
+from datetime import datetime
+from typing import Callable, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+POOLS_VERSION_KEY = "pools"
+CHANGE_LOG_TTL_SECONDS = 3600
+GRAPH_FIELDS = {"_id": 0, "id": 1, "token0_address": 1, "token1_address": 1,
+                "token0_reserve": 1, "token1_reserve": 1, "fee": 1}
+
+
+class PoolGraphCache:
+    """Holds a PoolGraph that is updated in place by the write endpoints.
+
+    Local writes call ``apply()`` with the updated pool document, bump the
+    shared ``pools`` version and log the ids of the pools they changed under
+    the new version in ``pool_changes``. When a read finds the version moved
+    past ours, the logged pools of the missing versions are re-read and
+    applied, so other workers' writes cost one small query rather than a
+    rebuild. The graph is only rebuilt from scratch when a version has no
+    log entry: after ``invalidate()``, once an entry has expired, or when a
+    read races the write of an entry.
+
+    Listeners are called with the pool documents of every update, local or
+    caught up from the log (just ``{"id"}`` for a pool that no longer exists).
+    Pool events are published to this worker's stream subscribers for both
+    too, so clients of one worker see reserve changes written by another
+    once it catches up.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.graph = PoolGraph()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.listeners: List[Callable[[List[dict]], None]] = []
+
+    async def reload(self, version: Optional[int] = None):
+        """Rebuild the graph from every pool in Mongo"""
+        if version is None:
+            version = await get_version(POOLS_VERSION_KEY)
+        pools = await db.pools.find({}, GRAPH_FIELDS).to_list(None)
+        graph = PoolGraph()
+        for pool in pools:
+            graph.upsert_pool(pool)
+        self.graph = graph
+        self._version = version
+        self._checked_at = time.monotonic()
+        logger.info(f"Pool graph loaded {len(graph)} pools (version {version})")
+
+    async def get(self) -> PoolGraph:
+        """Get the graph, reloading it if another worker changed a pool"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self.graph
+        async with self._lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked_at >= self.check_interval:
+                version = await get_version(POOLS_VERSION_KEY)
+                if version == self._version:
+                    self._checked_at = now
+                elif self._version is None or version < self._version or not await self._catch_up(version):
+                    await self.reload(version)
+        return self.graph
+
+    async def _catch_up(self, version: int) -> bool:
+        """Apply the pools logged between our version and `version`; False if the log has a gap"""
+        changes = await db.pool_changes.find(
+            {"version": {"$gt": self._version, "$lte": version}}, {"_id": 0, "pool_ids": 1}
+        ).to_list(None)
+        if len(changes) != version - self._version:
+            return False
+        pool_ids = {pool_id for change in changes for pool_id in change["pool_ids"]}
+        pools = await db.pools.find({"id": {"$in": list(pool_ids)}}, {**GRAPH_FIELDS, "tvl": 1}).to_list(None)
+        for pool in pools:
+            self._upsert(pool)
+        removed = pool_ids - {pool["id"] for pool in pools}
+        for pool_id in removed:
+            self.graph.remove_pool(pool_id)
+        self._notify(pools + [{"id": pool_id} for pool_id in removed])
+        self._version = version
+        self._checked_at = time.monotonic()
+        return True
+
+    def _notify(self, pools: List[dict]):
+        for listener in self.listeners:
+            listener(pools)
+
+    def _upsert(self, pool: dict):
+        self.graph.upsert_pool(pool)
+        broker.publish(pair_key(pool["token0_address"], pool["token1_address"]), "pool", {
+            "pool_id": pool["id"],
+            "token0_address": pool["token0_address"],
+            "token1_address": pool["token1_address"],
+            "token0_reserve": pool.get("token0_reserve", 0),
+            "token1_reserve": pool.get("token1_reserve", 0),
+            "tvl": pool.get("tvl", 0)
+        })
+
+    async def apply(self, pool: Optional[dict]):
+        """Apply a created or updated pool document to the graph"""
+        if not pool:
+            return
+        await self.apply_many([pool])
+
+    async def apply_many(self, pools: List[dict]):
+        """Apply several updated pool documents with a single version bump"""
+        if not pools:
+            return
+        for pool in pools:
+            self._upsert(pool)
+        self._notify(pools)
+        version = await bump_version(POOLS_VERSION_KEY)
+        await db.pool_changes.insert_one({
+            "version": version, "pool_ids": [pool["id"] for pool in pools], "created_at": datetime.utcnow()
+        })
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            # Someone else wrote in between; catch up from the change log on the next read
+            self._checked_at = 0.0
+
+    async def invalidate(self):
+        """Force every worker to rebuild its graph after a bulk pool write (no change log entry)"""
+        await bump_version(POOLS_VERSION_KEY)
+        self._version = None
+
+
+pool_graph = PoolGraphCache()
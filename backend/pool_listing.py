@@ -0,0 +1,67 @@
+"""Bulk pool listing with joined tokens, server-side sorting and cursors"""
+from database import db
+from models import PoolResponse, Token
+from pagination import find_page
+from token_registry import token_registry
+from typing import List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = ("tvl", "volume_24h", "apr")
+MAX_PAGE_SIZE = 1000
+
+
+async def build_pool_responses(pools: List[dict]) -> List[PoolResponse]:
+    """Join pools with their tokens using one batched token lookup"""
+    addresses = set()
+    for pool in pools:
+        addresses.add(pool["token0_address"])
+        addresses.add(pool["token1_address"])
+    tokens = await token_registry.get_many(addresses)
+    models = {address: Token(**token) for address, token in tokens.items()}
+    
+    result = []
+    for pool in pools:
+        token0 = models.get(pool["token0_address"].lower())
+        token1 = models.get(pool["token1_address"].lower())
+        if not token0 or not token1:
+            logger.warning(f"Tokens not found for pool: {pool['token0_address']}, {pool['token1_address']}")
+            continue
+        result.append(PoolResponse(
+            id=pool["id"],
+            token0=token0,
+            token1=token1,
+            fee=pool["fee"],
+            tvl=pool["tvl"],
+            volume_24h=pool["volume_24h"],
+            apr=pool["apr"],
+            token0_reserve=pool["token0_reserve"],
+            token1_reserve=pool["token1_reserve"],
+            creator_address=pool.get("creator_address"),
+            pair_address=pool.get("pair_address")
+        ))
+    return result
+
+
+async def list_pools(
+    sort_by: str = "tvl",
+    order: str = "desc",
+    token: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE
+) -> Tuple[List[PoolResponse], Optional[str]]:
+    """Get one page of pools and the cursor for the next page (None on the last page)"""
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {sort_by}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Unsupported sort order: {order}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    descending = order == "desc"
+    
+    query = {}
+    if token:
+        token_addr = token.lower()
+        query = {"$or": [{"token0_address": token_addr}, {"token1_address": token_addr}]}
+    pools, next_cursor = await find_page(db.pools, query, sort_by, cursor, limit, descending)
+    return await build_pool_responses(pools), next_cursor
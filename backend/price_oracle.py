@@ -0,0 +1,144 @@
+"""
+Token prices kept in line with pool reserves.
+
+A background task runs the pricing.PriceEngine against the process-wide
+pool graph. Pool updates, local or caught up from other workers, mark their
+pools dirty through a pool_graph listener, so a tick only re-prices tokens
+downstream of those pools. When the graph was rebuilt from scratch, the
+tick re-prices everything, which is one pass over the graph. Tokens whose price moved
+are written with one bulk_write and patched into the token registry
+(token_registry.apply_updates) rather than invalidating it. The pools
+holding them are then revalued through revaluation.revalue_pools.
+
+Every worker starts the task, but only the holder of the ``price_oracle``
+lease (see leases.py) prices; the others skip their ticks, so workers
+don't race each other's price writes and revaluations.
+
+Every hour the first tick stores a snapshot of all derived prices in
+price_snapshots. price_change_24h is measured against the snapshot from
+24 hours earlier, and all priced tokens are rewritten on that tick so the
+figure rolls forward even when a price is flat. Tokens the anchor can't
+reach keep their stored price.
+"""
+from database import db
+from pool_graph import pool_graph
+from pricing import PriceEngine, changed_prices
+from revaluation import revalue_pools
+from seed_data import CONTRACT_ADDRESSES
+from token_registry import token_registry
+from pymongo import UpdateOne
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+import asyncio
+import leases
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_TOKEN = CONTRACT_ADDRESSES["USDT"].lower()
+# Tokens without pools of their own that trade 1:1 with another
+PRICE_ALIASES = {"0x0000000000000000000000000000000000000000": CONTRACT_ADDRESSES["WPIO"].lower()}
+MIN_LIQUIDITY_USD = float(os.environ.get('PRICE_MIN_LIQUIDITY_USD', '100'))
+LEASE_NAME = "price_oracle"
+LEASE_SECONDS = 30.0
+
+
+def snapshot_hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def price_change_pct(price: float, baseline: Optional[float]) -> Optional[float]:
+    return (price - baseline) / baseline * 100 if baseline else None
+
+
+class PriceOracle:
+    def __init__(self, min_liquidity: float = MIN_LIQUIDITY_USD):
+        self.engine = PriceEngine(ANCHOR_TOKEN, 1.0, min_liquidity)
+        self._graph = None
+        self._dirty: Set[str] = set()
+        self._hour: Optional[datetime] = None
+        self._baseline: Dict[str, float] = {}  # token -> price 24h ago
+        pool_graph.listeners.append(self.mark_dirty)
+
+    def mark_dirty(self, pools: List[dict]):
+        self._dirty.update(pool["id"] for pool in pools)
+
+    def prices(self) -> Dict[str, float]:
+        """Derived prices, including aliased tokens"""
+        prices = dict(self.engine.prices)
+        for alias, target in PRICE_ALIASES.items():
+            if alias not in prices and target in prices:
+                prices[alias] = prices[target]
+        return prices
+
+    async def _roll_hour(self, now: datetime) -> bool:
+        """Snapshot prices at the start of each hour and load the baseline from 24h earlier"""
+        hour = snapshot_hour(now)
+        if hour == self._hour:
+            return False
+        prices = self.prices()
+        if prices:
+            await db.price_snapshots.bulk_write([
+                UpdateOne({"address": address, "hour": hour}, {"$setOnInsert": {"price": price}}, upsert=True)
+                for address, price in prices.items()
+            ], ordered=False)
+        baseline = await db.price_snapshots.find(
+            {"hour": hour - timedelta(hours=24)}, {"_id": 0, "address": 1, "price": 1}
+        ).to_list(None)
+        self._baseline = {doc["address"]: doc["price"] for doc in baseline}
+        self._hour = hour
+        return True
+
+    async def update(self, full: bool = False) -> Dict[str, float]:
+        """Re-price from the pool graph and store what moved; returns token -> new price"""
+        graph = await pool_graph.get()
+        before = self.prices()
+        if full or graph is not self._graph:
+            self._dirty.clear()
+            self.engine.recompute(graph)
+            self._graph = graph
+        elif self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            self.engine.update_pools(graph, dirty)
+        prices = self.prices()
+        changed = changed_prices(before, prices)
+
+        rolled = await self._roll_hour(datetime.now(timezone.utc))
+        to_write = prices if rolled else changed
+        if not to_write:
+            return changed
+
+        updates = {}
+        for address, price in to_write.items():
+            fields = {"price": price}
+            change = price_change_pct(price, self._baseline.get(address))
+            if change is not None:
+                fields["price_change_24h"] = change
+            updates[address] = fields
+        await db.tokens.bulk_write(
+            [UpdateOne({"address": address}, {"$set": fields}) for address, fields in updates.items()], ordered=False
+        )
+        await token_registry.apply_updates(updates)
+        if changed:
+            logger.info(f"Price oracle: {len(changed)} token prices moved")
+            await revalue_pools(graph, changed, prices)
+        return changed
+
+    async def run_periodically(self, interval_seconds: float):
+        """Background task running update() forever, in whichever worker holds the oracle lease"""
+        ttl = max(LEASE_SECONDS, 3 * interval_seconds)
+        while True:
+            try:
+                if await leases.acquire(LEASE_NAME, ttl):
+                    await self.update()
+                else:
+                    # Another worker prices; start from scratch if this one takes over later
+                    self._graph = None
+                    self._dirty.clear()
+            except Exception as e:
+                logger.error(f"Error updating token prices: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+price_oracle = PriceOracle()
@@ -0,0 +1,155 @@
+"""
+USD prices derived from pool reserves.
+
+Prices spread out from an anchor token (USDT at $1) over the pool graph in
+breadth-first levels: a token one hop further out is priced from its
+neighbours one level closer to the anchor, each pool quoting
+``price_neighbour * reserve_neighbour / reserve_token``. The quotes are
+averaged, weighted by the USD liquidity on the priced side, so a deep pool
+outweighs a shallow one. Pools with less than ``min_liquidity`` USD on that
+side are ignored, and tokens the anchor can't reach get no price.
+
+``recompute()`` is one O(tokens + pools) pass. ``update_pools()``
+re-prices only the tokens downstream of changed pools, stopping where a
+price doesn't move. It falls back to a full pass when a change could
+reshape the levels, for example when a pool starts or stops counting. Like
+routing.py this is pure data with no I/O; ``price_oracle.py`` runs it
+against the live pool graph.
+"""
+from routing import PoolEdge, PoolGraph
+from typing import Dict, Iterable, List, Optional
+import heapq
+
+PRICE_EPSILON = 1e-12  # Relative change below which a price counts as unchanged
+SNAPSHOT_TTL_SECONDS = 2 * 24 * 3600  # Retention of hourly price snapshots, past the 24h baseline
+
+
+class PriceEngine:
+    def __init__(self, anchor: str, anchor_price: float = 1.0, min_liquidity: float = 100.0):
+        self.anchor = anchor.lower()
+        self.anchor_price = anchor_price
+        self.min_liquidity = min_liquidity
+        self.prices: Dict[str, float] = {}
+        self.levels: Dict[str, int] = {}
+        self.parents: Dict[str, List[str]] = {}  # token -> ids of the pools its price came from
+
+    def _quote(self, edge: PoolEdge, token: str) -> Optional[tuple]:
+        """(price, weight) for `token` through `edge` from its already-priced other side, if usable"""
+        other = edge.other(token)
+        other_price = self.prices.get(other)
+        if not other_price or edge.reserve0 <= 0 or edge.reserve1 <= 0:
+            return None
+        reserve_token, reserve_other = edge.reserves(token)
+        liquidity = reserve_other * other_price
+        if liquidity < self.min_liquidity:
+            return None
+        return other_price * reserve_other / reserve_token, liquidity
+
+    def _price_from(self, graph: PoolGraph, token: str, level: int) -> tuple:
+        """Liquidity-weighted price of `token` from its neighbours at `level - 1`, and the pools used"""
+        total = weight_sum = 0.0
+        used = []
+        for edge in graph.adjacency.get(token, {}).values():
+            if self.levels.get(edge.other(token)) != level - 1:
+                continue
+            quote = self._quote(edge, token)
+            if quote is not None:
+                total += quote[0] * quote[1]
+                weight_sum += quote[1]
+                used.append(edge.id)
+        return (total / weight_sum if weight_sum else None), used
+
+    def recompute(self, graph: PoolGraph) -> Dict[str, float]:
+        """Price every token reachable from the anchor"""
+        self.prices = {self.anchor: self.anchor_price}
+        self.levels = {self.anchor: 0}
+        self.parents = {self.anchor: []}
+        frontier = [self.anchor]
+        level = 0
+        while frontier:
+            level += 1
+            # One pass over the frontier's pools accumulates every quote for the next level
+            quotes: Dict[str, list] = {}  # token -> [sum of price * weight, sum of weight, pool ids]
+            for token in frontier:
+                price = self.prices[token]
+                for edge in graph.adjacency.get(token, {}).values():
+                    if token == edge.token0:
+                        other, reserve_near, reserve_far = edge.token1, edge.reserve0, edge.reserve1
+                    else:
+                        other, reserve_near, reserve_far = edge.token0, edge.reserve1, edge.reserve0
+                    if other in self.levels or reserve_near <= 0 or reserve_far <= 0:
+                        continue
+                    liquidity = reserve_near * price
+                    if liquidity < self.min_liquidity:
+                        continue
+                    quote = quotes.get(other)
+                    if quote is None:
+                        quote = quotes[other] = [0.0, 0.0, []]
+                    quote[0] += price * reserve_near / reserve_far * liquidity
+                    quote[1] += liquidity
+                    quote[2].append(edge.id)
+            for token, (total, weight, used) in quotes.items():
+                self.levels[token] = level
+                self.prices[token] = total / weight
+                self.parents[token] = used
+            frontier = list(quotes)
+        return dict(self.prices)
+
+    def update_pools(self, graph: PoolGraph, pool_ids: Iterable[str]) -> Dict[str, float]:
+        """Re-price after the reserves of some pools changed; returns the prices that moved"""
+        dirty = []
+        moved: Dict[str, float] = {}
+        for pool_id in pool_ids:
+            edge = graph.pools.get(pool_id)
+            if edge is None:
+                return self._full_diff(graph)
+            level0, level1 = self.levels.get(edge.token0), self.levels.get(edge.token1)
+            if level0 is None and level1 is None:
+                continue
+            far = edge.token0 if level1 is not None and (level0 is None or level0 > level1) else edge.token1
+            near_level = min(level for level in (level0, level1) if level is not None)
+            if self.levels.get(far) == near_level + 1:
+                heapq.heappush(dirty, (near_level + 1, far))
+            elif self._shortcut(edge, far, near_level):
+                return self._full_diff(graph)
+
+        seen = set()
+        while dirty:
+            level, token = heapq.heappop(dirty)
+            if token in seen:
+                continue
+            seen.add(token)
+            price, used = self._price_from(graph, token, level)
+            if price is None or sorted(used) != sorted(self.parents.get(token, [])):
+                # A pool started or stopped counting; levels may shift
+                return self._full_diff(graph, moved)
+            old = self.prices[token]
+            self.prices[token] = price
+            if abs(price - old) > abs(old) * PRICE_EPSILON:
+                moved[token] = old
+                for edge in graph.adjacency.get(token, {}).values():
+                    other = edge.other(token)
+                    if self.levels.get(other) == level + 1:
+                        heapq.heappush(dirty, (level + 1, other))
+                    elif self._shortcut(edge, other, level):
+                        return self._full_diff(graph, moved)
+        return {token: self.prices[token] for token in moved}
+
+    def _shortcut(self, edge: PoolEdge, far: str, near_level: int) -> bool:
+        """Whether `edge` now prices `far` (unpriced or more than a level out) from the near side"""
+        far_level = self.levels.get(far)
+        return (far_level is None or far_level > near_level + 1) and self._quote(edge, far) is not None
+
+    def _full_diff(self, graph: PoolGraph, moved: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Fall back to a full pass; `moved` holds the old prices of tokens already re-priced"""
+        before = {**self.prices, **(moved or {})}
+        self.recompute(graph)
+        return changed_prices(before, self.prices)
+
+
+def changed_prices(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    """Tokens whose price is new or moved; tokens that lost their price are not included"""
+    return {
+        token: price for token, price in after.items()
+        if token not in before or abs(price - before[token]) > abs(before[token]) * PRICE_EPSILON
+    }
@@ -0,0 +1,172 @@
+"""
+Protocol stats maintained incrementally by the write paths.
+
+Write endpoints apply atomic ``$inc`` updates to the single stats document,
+so reading stats is one document fetch. ``reconcile()`` recomputes the
+counters with aggregation pipelines and corrects drift. It runs
+periodically in the background and on POST /api/stats/refresh.
+
+Writes keep landing while the recompute runs, and a write updates its
+source (a pool's tvl, a volume bucket) before it increments the counter.
+A single comparison would therefore see in-flight writes as drift.
+Reconcile measures the drift twice and only corrects what both passes
+agree on, with an ``$inc`` by the measured difference so concurrent
+increments are kept. ``total_volume`` is accumulated at the price of each
+trade and is never recomputed at today's prices, except to build the
+stats document the first time.
+"""
+from database import db
+from models import ProtocolStats
+from rolling_window import WINDOW_BUCKETS, bucket_epoch
+from volume_windows import GLOBAL_KEY
+from unique_wallets import unique_wallets
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Counters the write paths $inc; corrected by the drift both passes agree on
+RECONCILE_FIELDS = ("tvl", "volume_24h", "transactions_24h", "active_pools")
+# Figures read from the wallet sketches and only ever $set
+SKETCH_FIELDS = ("total_swappers", "swappers_24h", "swappers_7d")
+
+
+async def _inc(fields: dict, session=None):
+    await db.stats.update_one(
+        {},
+        {"$inc": fields, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        session=session
+    )
+
+
+async def record_swap(volume_usd: float, session=None):
+    """Count a swap and its USD volume (24h figures are re-based by volume_windows.flush)"""
+    await _inc({"total_volume": volume_usd, "volume_24h": volume_usd, "transactions_24h": 1}, session)
+
+
+async def record_pool_created():
+    await _inc({"active_pools": 1})
+
+
+async def record_tvl_change(delta: float):
+    """Apply the TVL change of a pool to the protocol TVL"""
+    if delta:
+        await _inc({"tvl": delta})
+
+
+async def get_protocol_stats() -> Optional[ProtocolStats]:
+    stats = await db.stats.find_one({}, {"_id": 0})
+    return ProtocolStats(**stats) if stats else None
+
+
+async def compute_stats(include_volume: bool = True) -> ProtocolStats:
+    """Recompute the counters server-side with aggregation pipelines and the wallet sketches.
+    total_volume (valued at today's token prices) is left at 0 unless `include_volume`.
+    """
+    pools = await db.pools.aggregate([
+        {"$group": {
+            "_id": None,
+            "tvl": {"$sum": "$tvl"},
+            "active_pools": {"$sum": 1}
+        }}
+    ]).to_list(1)
+    pools = pools[0] if pools else {}
+    
+    now_epoch = bucket_epoch(time.time())
+    recent = await db.volume_buckets.aggregate([
+        {"$match": {"key": GLOBAL_KEY, "epoch": {"$gt": now_epoch - WINDOW_BUCKETS, "$lte": now_epoch}}},
+        {"$group": {"_id": None, "volume": {"$sum": "$volume"}, "count": {"$sum": "$count"}}}
+    ]).to_list(1)
+    recent = recent[0] if recent else {}
+    
+    total_volume = 0.0
+    if include_volume:
+        volume = await db.transactions.aggregate([
+            {"$match": {"type": "swap"}},
+            {"$lookup": {
+                "from": "tokens",
+                "localField": "token0_address",
+                "foreignField": "address",
+                "as": "token"
+            }},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": {"$multiply": [
+                    "$amount0",
+                    {"$ifNull": [{"$arrayElemAt": ["$token.price", 0]}, 1]}
+                ]}}
+            }}
+        ], allowDiskUse=True).to_list(1)
+        total_volume = volume[0]["total"] if volume else 0
+    swappers = await unique_wallets.compute()
+    
+    return ProtocolStats(
+        total_volume=total_volume,
+        tvl=pools.get("tvl", 0),
+        total_swappers=swappers["total_swappers"],
+        swappers_24h=swappers["swappers_24h"],
+        swappers_7d=swappers["swappers_7d"],
+        volume_24h=recent.get("volume", 0),
+        transactions_24h=recent.get("count", 0),
+        active_pools=pools.get("active_pools", 0),
+        updated_at=datetime.utcnow()
+    )
+
+
+def _differs(stored: float, expected: float) -> bool:
+    return abs(stored - expected) > max(1e-6, abs(expected) * 1e-9)
+
+
+async def _measure() -> tuple:
+    """(stored stats, recomputed stats) read one after the other"""
+    stored = await db.stats.find_one({}, {"_id": 0}) or {}
+    computed = (await compute_stats(include_volume=False)).model_dump()
+    return stored, computed
+
+
+async def reconcile() -> dict:
+    """Verify the incremental counters against a full recompute and fix stable drift"""
+    if not await db.stats.find_one({}, {"_id": 1}):
+        # Nothing to drift from yet; build the document, volume included
+        computed = await compute_stats()
+        await db.stats.update_one({}, {"$setOnInsert": computed.model_dump()}, upsert=True)
+        return {"stats": await get_protocol_stats(), "drift": {}}
+
+    first_stored, first_computed = await _measure()
+    stored, computed = await _measure()
+
+    drift, corrections, unstable = {}, {}, []
+    for field in RECONCILE_FIELDS:
+        first = first_computed[field] - (first_stored.get(field, 0) or 0)
+        second = computed[field] - (stored.get(field, 0) or 0)
+        if not _differs(stored.get(field, 0) or 0, computed[field]):
+            continue
+        if _differs(first, second):
+            unstable.append(field)
+            continue
+        drift[field] = {"stored": stored.get(field, 0) or 0, "computed": computed[field]}
+        corrections[field] = second
+
+    update = {"$set": {**{field: computed[field] for field in SKETCH_FIELDS}, "updated_at": datetime.utcnow()}}
+    if corrections:
+        update["$inc"] = corrections
+    await db.stats.update_one({}, update, upsert=True)
+    if drift:
+        logger.warning(f"Stats drift corrected: {drift}")
+    if unstable:
+        logger.info(f"Stats reconcile skipped fields changing under it: {', '.join(unstable)}")
+    return {"stats": await get_protocol_stats(), "drift": drift}
+
+
+async def reconcile_periodically(interval_seconds: float):
+    """Background task running reconcile() forever"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await reconcile()
+        except Exception as e:
+            logger.error(f"Error reconciling stats: {e}")
@@ -0,0 +1,122 @@
+"""
+Periodic reconciliation of pool reserves against the on-chain pair contracts.
+
+Each run reads ``getReserves`` for the pairs that may have changed and
+bulk-writes only the pools whose stored reserves differ. This is done
+through liquidity.set_reserves_many, which refreshes tvl and apr, moves the
+protocol TVL and applies the pools to the graph with one bump of the pools
+version.
+
+A pair's reserves only change on chain when it emits Sync, so an
+incremental run asks for the Sync logs since the previous run and reads
+just those pairs. Every ``full_sweep_every`` runs (never if it is 0), on
+the first run, and after a gap longer than ``max_log_range`` blocks, every
+registered pair is read instead. The full sweep also corrects drift from client-reported
+liquidity writes, which change Mongo without a Sync. All reads of one
+run are pinned to the same block.
+"""
+from database import db
+from rpc_client import RPCClient, to_hex
+from chain_events import SYNC
+from chain_reads import DEFAULT_DECIMALS, pair_reserves_many, pool_reserves
+from liquidity import set_reserves_many
+from token_registry import token_registry
+from typing import Dict, Iterable, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FULL_SWEEP_EVERY = int(os.environ.get('RESERVE_SYNC_FULL_SWEEP_EVERY', '15'))
+MAX_LOG_RANGE = int(os.environ.get('RESERVE_SYNC_MAX_LOG_RANGE', '5000'))
+POOL_FIELDS = {"_id": 0, "id": 1, "token0_address": 1, "token1_address": 1,
+               "token0_reserve": 1, "token1_reserve": 1, "pair_address": 1}
+
+
+def reserves_differ(stored: Tuple[float, float], onchain: Tuple[float, float]) -> bool:
+    return any(abs(a - b) > max(1e-12, abs(b) * 1e-9) for a, b in zip(stored, onchain))
+
+
+def changed_reserves(pools: Iterable[dict], onchain: Dict[str, Optional[Tuple[int, int]]],
+                     decimals: Dict[str, int]) -> Dict[str, Tuple[float, float]]:
+    """pool id -> on-chain (token0_reserve, token1_reserve) for pools whose stored reserves differ"""
+    changed = {}
+    for pool in pools:
+        raw = onchain.get(pool["pair_address"].lower())
+        if raw is None:
+            continue
+        reserves = pool_reserves(pool, raw[0], raw[1], decimals)
+        stored = (pool.get("token0_reserve") or 0, pool.get("token1_reserve") or 0)
+        if reserves_differ(stored, reserves):
+            changed[pool["id"]] = reserves
+    return changed
+
+
+class ReserveReconciler:
+    def __init__(self, rpc: Optional[RPCClient] = None, full_sweep_every: int = FULL_SWEEP_EVERY,
+                 max_log_range: int = MAX_LOG_RANGE):
+        self._rpc = rpc
+        self.full_sweep_every = full_sweep_every
+        self.max_log_range = max_log_range
+        self.last_block: Optional[int] = None
+        self._runs = 0
+
+    @property
+    def rpc(self) -> RPCClient:
+        if self._rpc is None:
+            self._rpc = RPCClient()
+        return self._rpc
+
+    async def close(self):
+        if self._rpc is not None:
+            await self._rpc.close()
+            self._rpc = None
+
+    async def synced_pairs(self, from_block: int, to_block: int) -> Set[str]:
+        """Addresses of the contracts that emitted Sync in a block range"""
+        logs = await self.rpc.get_logs(from_block, to_block, topics=[SYNC])
+        return {log["address"].lower() for log in logs if not log.get("removed")}
+
+    async def reconcile(self, full: bool = False) -> int:
+        """Bring stored reserves in line with the chain; returns the number of pools updated"""
+        head = await self.rpc.block_number()
+        full = (full or self.last_block is None or head - self.last_block > self.max_log_range
+                or (self.full_sweep_every > 0 and self._runs % self.full_sweep_every == 0))
+
+        if full:
+            pools = await db.pools.find({"pair_address": {"$type": "string"}}, POOL_FIELDS).to_list(None)
+        elif head > self.last_block:
+            pairs = await self.synced_pairs(self.last_block + 1, head)
+            pools = await db.pools.find({"pair_address": {"$in": list(pairs)}}, POOL_FIELDS).to_list(None) if pairs else []
+        else:
+            return 0
+
+        changed = {}
+        if pools:
+            onchain = await pair_reserves_many(self.rpc, [pool["pair_address"] for pool in pools], to_hex(head))
+            tokens = await token_registry.get_many(
+                address for pool in pools for address in (pool["token0_address"], pool["token1_address"])
+            )
+            decimals = {address: token.get("decimals", DEFAULT_DECIMALS) for address, token in tokens.items()}
+            changed = changed_reserves(pools, onchain, decimals)
+            await set_reserves_many(changed)
+
+        self.last_block = head
+        self._runs += 1
+        if changed:
+            logger.info(f"Reserve sync at block {head}: {len(changed)} of {len(pools)} "
+                        f"{'registered' if full else 'synced'} pools updated")
+        return len(changed)
+
+    async def run_periodically(self, interval_seconds: float):
+        """Background task running reconcile() forever"""
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling reserves: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+reserve_reconciler = ReserveReconciler()
@@ -0,0 +1,110 @@
+"""
+Bulk TVL/APR revaluation of the pools affected by token price moves.
+
+Pool tvl and apr are refreshed inline whenever a pool's reserves change,
+using the token prices of that moment. When a price moves, every other pool
+holding the token keeps a stale valuation. ``revalue_pools()`` fixes this
+for a batch of moved prices:
+
+1. The pool graph's token adjacency works as a token -> pools index, so
+   finding the affected pools costs nothing extra.
+2. Their reserves, fee and stored tvl are read with one query, and tvl and
+   apr are recomputed for all of them in one numpy pass.
+3. Pools whose tvl actually moved are flushed with one unordered
+   bulk_write of plain ``$set`` updates. Each update is guarded by the
+   reserves that were read. A pool whose reserves changed in between was
+   already revalued by that write and is left alone, and its tvl delta is
+   not added to the protocol TVL (that write recorded its own).
+
+Reserves don't change here, so the pool graph is left alone.
+"""
+from database import db
+from liquidity import APR_TVL_SCALE, MAX_APR
+from routing import PoolGraph
+from token_registry import token_registry
+from pymongo import UpdateOne
+from typing import Dict, Iterable, List, Set, Tuple
+import numpy as np
+import logging
+import protocol_stats
+
+logger = logging.getLogger(__name__)
+
+TVL_EPSILON = 1e-9  # Relative tvl change below which a pool isn't rewritten
+POOL_FIELDS = {"_id": 0, "id": 1, "token0_address": 1, "token1_address": 1,
+               "token0_reserve": 1, "token1_reserve": 1, "fee": 1, "tvl": 1}
+
+
+def pools_for_tokens(graph: PoolGraph, tokens: Iterable[str]) -> Set[str]:
+    """Ids of the pools holding any of `tokens`"""
+    pool_ids = set()
+    for token in tokens:
+        pool_ids.update(graph.adjacency.get(token.lower(), ()))
+    return pool_ids
+
+
+def valuations(reserve0: np.ndarray, reserve1: np.ndarray, price0: np.ndarray, price1: np.ndarray,
+               fee: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(tvl, apr) for arrays of pools; the vectorized form of liquidity.pool_apr"""
+    tvl = reserve0 * price0 + reserve1 * price1
+    apr = np.where(tvl > 0, np.minimum(fee * 100 * (1 + tvl / APR_TVL_SCALE), MAX_APR), 0.0)
+    return tvl, apr
+
+
+async def matched_rows(pools: List[dict], rows: List[int]) -> List[int]:
+    """The rows whose pool still holds the reserves that were read, i.e. whose guarded update matched"""
+    current = await db.pools.find(
+        {"id": {"$in": [pools[i]["id"] for i in rows]}}, {"_id": 0, "id": 1, "token0_reserve": 1, "token1_reserve": 1}
+    ).to_list(None)
+    current = {pool["id"]: (pool.get("token0_reserve"), pool.get("token1_reserve")) for pool in current}
+    return [i for i in rows
+            if current.get(pools[i]["id"]) == (pools[i].get("token0_reserve"), pools[i].get("token1_reserve"))]
+
+
+async def revalue_pools(graph: PoolGraph, changed: Dict[str, float], prices: Dict[str, float]) -> int:
+    """Refresh tvl and apr of the pools holding a token in `changed`.
+    `prices` overrides the registry price per token. Returns the number of pools written.
+    """
+    pool_ids = pools_for_tokens(graph, changed)
+    if not pool_ids:
+        return 0
+    pools = await db.pools.find({"id": {"$in": list(pool_ids)}}, POOL_FIELDS).to_list(None)
+    if not pools:
+        return 0
+    tokens = await token_registry.get_many(
+        address for pool in pools for address in (pool["token0_address"], pool["token1_address"])
+    )
+
+    def price_of(address: str) -> float:
+        address = address.lower()
+        if address in prices:
+            return prices[address]
+        return tokens.get(address, {}).get("price", 1)
+
+    reserve0 = np.array([pool.get("token0_reserve") or 0 for pool in pools], dtype=float)
+    reserve1 = np.array([pool.get("token1_reserve") or 0 for pool in pools], dtype=float)
+    price0 = np.array([price_of(pool["token0_address"]) for pool in pools], dtype=float)
+    price1 = np.array([price_of(pool["token1_address"]) for pool in pools], dtype=float)
+    fee = np.array([pool.get("fee", 0.3) for pool in pools], dtype=float)
+    old_tvl = np.array([pool.get("tvl") or 0 for pool in pools], dtype=float)
+
+    tvl, apr = valuations(reserve0, reserve1, price0, price1, fee)
+    moved = np.flatnonzero(np.abs(tvl - old_tvl) > np.maximum(np.abs(old_tvl), 1.0) * TVL_EPSILON)
+    if not len(moved):
+        return 0
+
+    tvl_values, apr_values = tvl.tolist(), apr.tolist()
+    moved = moved.tolist()
+    result = await db.pools.bulk_write([
+        UpdateOne(
+            {"id": pools[i]["id"], "token0_reserve": pools[i].get("token0_reserve"),
+             "token1_reserve": pools[i].get("token1_reserve")},
+            {"$set": {"tvl": tvl_values[i], "apr": apr_values[i]}}
+        )
+        for i in moved
+    ], ordered=False)
+    if result.matched_count < len(moved):
+        moved = await matched_rows(pools, moved)
+    await protocol_stats.record_tvl_change(float((tvl[moved] - old_tvl[moved]).sum()))
+    logger.info(f"Revalued {len(moved)} of {len(pools)} pools after {len(changed)} price moves")
+    return len(moved)
@@ -0,0 +1,56 @@
+"""Fixed-size ring buffer of time buckets for exact rolling-window totals"""
+from typing import Tuple
+
+BUCKET_SECONDS = 300  # 5 minutes
+WINDOW_BUCKETS = 288  # 24 hours
+
+
+def bucket_epoch(timestamp: float, bucket_seconds: int = BUCKET_SECONDS) -> int:
+    """Index of the bucket containing a unix timestamp"""
+    return int(timestamp // bucket_seconds)
+
+
+class RollingWindow:
+    """Volume and count per bucket over the last ``size`` buckets.
+
+    Each slot remembers which bucket it holds, so slots left over from
+    earlier windows are ignored (and overwritten) without any sweeping.
+    """
+    __slots__ = ("size", "epochs", "volumes", "counts")
+
+    def __init__(self, size: int = WINDOW_BUCKETS):
+        self.size = size
+        self.epochs = [-1] * size
+        self.volumes = [0.0] * size
+        self.counts = [0] * size
+
+    def add(self, epoch: int, volume: float, count: int = 1):
+        slot = epoch % self.size
+        if self.epochs[slot] != epoch:
+            if self.epochs[slot] > epoch:
+                return  # Older than the window
+            self.epochs[slot] = epoch
+            self.volumes[slot] = 0.0
+            self.counts[slot] = 0
+        self.volumes[slot] += volume
+        self.counts[slot] += count
+
+    def set(self, epoch: int, volume: float, count: int):
+        """Overwrite a bucket, e.g. when hydrating from storage"""
+        slot = epoch % self.size
+        if self.epochs[slot] > epoch:
+            return
+        self.epochs[slot] = epoch
+        self.volumes[slot] = volume
+        self.counts[slot] = count
+
+    def totals(self, now_epoch: int) -> Tuple[float, int]:
+        """(volume, count) over the window ending with bucket now_epoch"""
+        oldest = now_epoch - self.size
+        volume = 0.0
+        count = 0
+        for epoch, slot_volume, slot_count in zip(self.epochs, self.volumes, self.counts):
+            if oldest < epoch <= now_epoch:
+                volume += slot_volume
+                count += slot_count
+        return volume, count
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import List, Optional
 from pydantic import BaseModel
-from models import Pool, PoolCreate, PoolResponse, Token
+from models import Pool, PoolCreate, PoolResponse, Token, Transaction
 from database import db
+from token_registry import token_registry
+from pool_graph import pool_graph
+from pool_listing import list_pools, MAX_PAGE_SIZE
+from pairs import pair_key
+from idempotency import AlreadyRecorded, claim_transaction, release_on_failure
+from liquidity import change_reserves
+from unique_wallets import count_pools
+import protocol_stats
 import logging
 import uuid
 
@@ -40,8 +48,8 @@ async def get_pool_with_tokens(pool: dict) -> PoolResponse:
     token0_addr = pool["token0_address"].lower()
     token1_addr = pool["token1_address"].lower()
     
-    token0 = await db.tokens.find_one({"address": token0_addr})
-    token1 = await db.tokens.find_one({"address": token1_addr})
+    token0 = await token_registry.get(token0_addr)
+    token1 = await token_registry.get(token1_addr)
     
     if not token0 or not token1:
         logger.warning(f"Tokens not found for pool: {token0_addr}, {token1_addr}")
@@ -63,21 +71,42 @@ async def get_pool_with_tokens(pool: dict) -> PoolResponse:
 
 
 @router.get("", response_model=List[PoolResponse])
-async def get_pools():
-    """Get all pools with token details"""
+async def get_pools(
+    response: Response,
+    sort_by: str = "tvl",
+    order: str = "desc",
+    token: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE
+):
+    """Get pools with token details, sorted server-side and paginated by cursor.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        pools = await db.pools.find().to_list(1000)
-        result = []
-        for pool in pools:
-            pool_response = await get_pool_with_tokens(pool)
-            if pool_response:
-                result.append(pool_response)
-        return result
+        try:
+            pools, next_cursor = await list_pools(sort_by, order, token, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return pools
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching pools: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch pools")
 
 
+@router.get("/{pool_id}/traders")
+async def get_pool_traders(pool_id: str):
+    """Get the approximate number of unique wallets that swapped in a pool"""
+    try:
+        return {"pool_id": pool_id, "unique_traders": await count_pools([pool_id])}
+    except Exception as e:
+        logger.error(f"Error counting pool traders: {e}")
+        raise HTTPException(status_code=500, detail="Failed to count pool traders")
+
+
 @router.get("/{pool_id}", response_model=PoolResponse)
 async def get_pool(pool_id: str):
     """Get pool by ID"""
@@ -108,19 +137,14 @@ async def create_pool(pool_data: PoolCreate):
         pair_addr = pool_data.pair_address.lower() if pool_data.pair_address else None
         
         # Check if tokens exist
-        token0 = await db.tokens.find_one({"address": token0_addr})
-        token1 = await db.tokens.find_one({"address": token1_addr})
+        token0 = await token_registry.get(token0_addr)
+        token1 = await token_registry.get(token1_addr)
         
         if not token0 or not token1:
             raise HTTPException(status_code=400, detail="One or both tokens not found")
         
         # Check if pool already exists
-        existing = await db.pools.find_one({
-            "$or": [
-                {"token0_address": token0_addr, "token1_address": token1_addr},
-                {"token0_address": token1_addr, "token1_address": token0_addr}
-            ]
-        })
+        existing = await db.pools.find_one({"pair_key": pair_key(token0_addr, token1_addr)})
         if existing:
             raise HTTPException(status_code=400, detail="Pool already exists")
         
@@ -140,6 +164,8 @@ async def create_pool(pool_data: PoolCreate):
         )
         
         await db.pools.insert_one(pool.model_dump())
+        await pool_graph.apply(pool.model_dump())
+        await protocol_stats.record_pool_created()
         
         logger.info(f"Created new pool {pool.id} for {token0['symbol']}/{token1['symbol']} by {creator_addr}")
         
@@ -181,32 +207,40 @@ async def add_liquidity(request: AddLiquidityRequest):
                 detail=f"Only the pool creator ({creator_addr[:10]}...) can add liquidity to this pool"
             )
         
-        # Get token prices for TVL calculation
-        token0 = await db.tokens.find_one({"address": pool["token0_address"]})
-        token1 = await db.tokens.find_one({"address": pool["token1_address"]})
-        
-        token0_price = token0.get("price", 1) if token0 else 1
-        token1_price = token1.get("price", 1) if token1 else 1
-        
-        # Update reserves
-        new_reserve0 = pool["token0_reserve"] + request.amount0
-        new_reserve1 = pool["token1_reserve"] + request.amount1
-        new_tvl = (new_reserve0 * token0_price) + (new_reserve1 * token1_price)
-        
-        # Calculate APR based on TVL
-        base_apr = pool["fee"] * 100
-        new_apr = min(base_apr * (1 + (new_tvl / 1000000)), 100.0)
-        
-        # Update pool
-        await db.pools.update_one(
-            {"id": request.pool_id},
-            {"$set": {
-                "token0_reserve": new_reserve0,
-                "token1_reserve": new_reserve1,
-                "tvl": new_tvl,
-                "apr": new_apr
-            }}
+        # Claim the tx_hash first so a retried request changes nothing
+        tx = Transaction(
+            type="add",
+            wallet_address=wallet_addr,
+            token0_address=pool["token0_address"],
+            token1_address=pool["token1_address"],
+            amount0=request.amount0,
+            amount1=request.amount1,
+            tx_hash=request.tx_hash
         )
+        tx_doc = tx.model_dump()
+        try:
+            await claim_transaction(tx_doc)
+        except AlreadyRecorded:
+            logger.info(f"Liquidity add {request.tx_hash} already recorded, ignoring retry")
+            return {
+                "success": True,
+                "pool_id": request.pool_id,
+                "token0_reserve": pool["token0_reserve"],
+                "token1_reserve": pool["token1_reserve"],
+                "tvl": pool.get("tvl", 0),
+                "tx_hash": request.tx_hash,
+                "duplicate": True
+            }
+        
+        # Add to the reserves atomically; tvl and apr are recomputed server-side
+        async with release_on_failure(tx_doc):
+            changed = await change_reserves(pool, request.amount0, request.amount1)
+            if not changed:
+                raise HTTPException(status_code=404, detail="Pool not found")
+        _, updated_pool = changed
+        new_reserve0 = updated_pool["token0_reserve"]
+        new_reserve1 = updated_pool["token1_reserve"]
+        new_tvl = updated_pool["tvl"]
         
         logger.info(f"Added liquidity to pool {request.pool_id}: +{request.amount0}/{request.amount1}, TVL: ${new_tvl:.2f}")
         
@@ -252,32 +286,49 @@ async def remove_liquidity(request: RemoveLiquidityRequest):
         amount0_to_remove = pool["token0_reserve"] * percent
         amount1_to_remove = pool["token1_reserve"] * percent
         
-        # Get token prices for TVL calculation
-        token0 = await db.tokens.find_one({"address": pool["token0_address"]})
-        token1 = await db.tokens.find_one({"address": pool["token1_address"]})
-        
-        token0_price = token0.get("price", 1) if token0 else 1
-        token1_price = token1.get("price", 1) if token1 else 1
-        
-        # Update reserves
-        new_reserve0 = pool["token0_reserve"] - amount0_to_remove
-        new_reserve1 = pool["token1_reserve"] - amount1_to_remove
-        new_tvl = (new_reserve0 * token0_price) + (new_reserve1 * token1_price)
-        
-        # Calculate APR based on TVL
-        base_apr = pool["fee"] * 100
-        new_apr = min(base_apr * (1 + (new_tvl / 1000000)), 100.0) if new_tvl > 0 else 0
-        
-        # Update pool
-        await db.pools.update_one(
-            {"id": request.pool_id},
-            {"$set": {
-                "token0_reserve": new_reserve0,
-                "token1_reserve": new_reserve1,
-                "tvl": new_tvl,
-                "apr": new_apr
-            }}
+        # Token symbols for the response
+        token0 = await token_registry.get(pool["token0_address"])
+        token1 = await token_registry.get(pool["token1_address"])
+        
+        # Claim the tx_hash first so a retried request changes nothing
+        tx = Transaction(
+            type="remove",
+            wallet_address=wallet_addr,
+            token0_address=pool["token0_address"],
+            token1_address=pool["token1_address"],
+            amount0=amount0_to_remove,
+            amount1=amount1_to_remove,
+            tx_hash=request.tx_hash
         )
+        tx_doc = tx.model_dump()
+        try:
+            await claim_transaction(tx_doc)
+        except AlreadyRecorded as e:
+            logger.info(f"Liquidity removal {request.tx_hash} already recorded, ignoring retry")
+            return {
+                "success": True,
+                "pool_id": request.pool_id,
+                "amount0_removed": e.transaction["amount0"],
+                "amount1_removed": e.transaction["amount1"],
+                "token0_symbol": token0["symbol"] if token0 else "Token0",
+                "token1_symbol": token1["symbol"] if token1 else "Token1",
+                "new_token0_reserve": pool["token0_reserve"],
+                "new_token1_reserve": pool["token1_reserve"],
+                "new_tvl": pool.get("tvl", 0),
+                "recipient": wallet_addr,
+                "tx_hash": request.tx_hash,
+                "duplicate": True
+            }
+        
+        # Take the amounts out atomically; tvl and apr are recomputed server-side
+        async with release_on_failure(tx_doc):
+            changed = await change_reserves(pool, -amount0_to_remove, -amount1_to_remove)
+            if not changed:
+                raise HTTPException(status_code=404, detail="Pool not found")
+        _, updated_pool = changed
+        new_reserve0 = updated_pool["token0_reserve"]
+        new_reserve1 = updated_pool["token1_reserve"]
+        new_tvl = updated_pool["tvl"]
         
         logger.info(f"Removed {percent*100}% liquidity from pool {request.pool_id}: -{amount0_to_remove:.4f}/{amount1_to_remove:.4f}")
         
@@ -314,8 +365,8 @@ async def register_pool(request: RegisterPoolRequest):
         logger.info(f"Registering pool: {token0_addr} / {token1_addr} at {pair_addr}")
         
         # Check if tokens exist
-        token0 = await db.tokens.find_one({"address": token0_addr})
-        token1 = await db.tokens.find_one({"address": token1_addr})
+        token0 = await token_registry.get(token0_addr)
+        token1 = await token_registry.get(token1_addr)
         
         if not token0:
             logger.error(f"Token0 not found: {token0_addr}")
@@ -327,8 +378,7 @@ async def register_pool(request: RegisterPoolRequest):
         # Check if pool already exists
         existing = await db.pools.find_one({
             "$or": [
-                {"token0_address": token0_addr, "token1_address": token1_addr},
-                {"token0_address": token1_addr, "token1_address": token0_addr},
+                {"pair_key": pair_key(token0_addr, token1_addr)},
                 {"pair_address": pair_addr}
             ]
         })
@@ -356,6 +406,8 @@ async def register_pool(request: RegisterPoolRequest):
         )
         
         await db.pools.insert_one(pool.model_dump())
+        await pool_graph.apply(pool.model_dump())
+        await protocol_stats.record_pool_created()
         
         logger.info(f"Pool registered: {token0['symbol']}/{token1['symbol']} at {pair_addr}")
         
@@ -2,10 +2,10 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 from models import Position, PositionCreate, PositionRemove, Transaction
 from database import db
+from idempotency import AlreadyRecorded, claim_transaction, release_on_failure, release_transaction, tx_hash_filter
+from liquidity import add_to_position, change_reserves, remove_from_position, restore_position, undo_position_add
 import logging
 import uuid
-from datetime import datetime
-import math
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/positions", tags=["positions"])
@@ -31,71 +31,13 @@ async def add_liquidity(position_data: PositionCreate):
         if not pool:
             raise HTTPException(status_code=404, detail="Pool not found")
         
-        # Calculate liquidity (simplified AMM formula)
-        liquidity = math.sqrt(position_data.token0_amount * position_data.token1_amount)
-        
         # Check if user already has a position in this pool
         existing = await db.positions.find_one({
             "pool_id": position_data.pool_id,
             "wallet_address": position_data.wallet_address.lower()
         })
         
-        if existing:
-            # Update existing position
-            new_token0 = existing["token0_amount"] + position_data.token0_amount
-            new_token1 = existing["token1_amount"] + position_data.token1_amount
-            new_liquidity = math.sqrt(new_token0 * new_token1)
-            
-            await db.positions.update_one(
-                {"id": existing["id"]},
-                {"$set": {
-                    "token0_amount": new_token0,
-                    "token1_amount": new_token1,
-                    "liquidity": new_liquidity,
-                    "min_price": position_data.min_price,
-                    "max_price": position_data.max_price,
-                    "updated_at": datetime.utcnow()
-                }}
-            )
-            position = await db.positions.find_one({"id": existing["id"]})
-        else:
-            # Create new position
-            position = Position(
-                id=str(uuid.uuid4()),
-                pool_id=position_data.pool_id,
-                wallet_address=position_data.wallet_address.lower(),
-                token0_amount=position_data.token0_amount,
-                token1_amount=position_data.token1_amount,
-                liquidity=liquidity,
-                min_price=position_data.min_price,
-                max_price=position_data.max_price,
-                in_range=True,
-                unclaimed_fees=0.0
-            )
-            await db.positions.insert_one(position.model_dump())
-            position = position.model_dump()
-        
-        # Update pool reserves and TVL
-        token0 = await db.tokens.find_one({"address": pool["token0_address"]})
-        token1 = await db.tokens.find_one({"address": pool["token1_address"]})
-        
-        new_reserve0 = pool["token0_reserve"] + position_data.token0_amount
-        new_reserve1 = pool["token1_reserve"] + position_data.token1_amount
-        
-        token0_price = token0.get("price", 1) if token0 else 1
-        token1_price = token1.get("price", 1) if token1 else 1
-        new_tvl = (new_reserve0 * token0_price) + (new_reserve1 * token1_price)
-        
-        await db.pools.update_one(
-            {"id": position_data.pool_id},
-            {"$set": {
-                "token0_reserve": new_reserve0,
-                "token1_reserve": new_reserve1,
-                "tvl": new_tvl
-            }}
-        )
-        
-        # Record transaction
+        # Claim the tx_hash first so a retried request changes nothing
         tx = Transaction(
             id=str(uuid.uuid4()),
             type="add",
@@ -104,9 +46,36 @@ async def add_liquidity(position_data: PositionCreate):
             token1_address=pool["token1_address"],
             amount0=position_data.token0_amount,
             amount1=position_data.token1_amount,
+            tx_hash=position_data.tx_hash,
             status="confirmed"
         )
-        await db.transactions.insert_one(tx.model_dump())
+        tx_doc = tx.model_dump()
+        try:
+            await claim_transaction(tx_doc)
+        except AlreadyRecorded:
+            logger.info(f"Position add {position_data.tx_hash} already recorded, ignoring retry")
+            if existing:
+                return Position(**existing)
+            raise HTTPException(status_code=409, detail="Transaction already recorded")
+        
+        # Grow the position and the pool reserves, each atomically
+        async with release_on_failure(tx_doc):
+            position = await add_to_position(
+                position_data.pool_id,
+                position_data.wallet_address.lower(),
+                position_data.token0_amount,
+                position_data.token1_amount,
+                position_data.min_price,
+                position_data.max_price
+            )
+        try:
+            await change_reserves(pool, position_data.token0_amount, position_data.token1_amount)
+        except BaseException:
+            # Undo the position write before releasing the claim, so the retry applies both once.
+            # If the undo fails, the claim stays and the retry is turned away.
+            if await undo_position_add(position["id"], position_data.token0_amount, position_data.token1_amount):
+                await release_transaction(tx_doc)
+            raise
         
         return Position(**position)
     except HTTPException:
@@ -127,6 +96,9 @@ async def remove_liquidity(remove_data: PositionRemove):
         })
         
         if not position:
+            # A retried full removal finds its position already deleted
+            if remove_data.tx_hash and await db.transactions.find_one(tx_hash_filter(remove_data.tx_hash), {"_id": 1}):
+                raise HTTPException(status_code=409, detail="Transaction already recorded")
             raise HTTPException(status_code=404, detail="Position not found")
         
         pool = await db.pools.find_one({"id": position["pool_id"]})
@@ -138,50 +110,7 @@ async def remove_liquidity(remove_data: PositionRemove):
         remove_token0 = position["token0_amount"] * percent
         remove_token1 = position["token1_amount"] * percent
         
-        if percent >= 1:
-            # Remove entire position
-            await db.positions.delete_one({"id": remove_data.position_id})
-            position["token0_amount"] = 0
-            position["token1_amount"] = 0
-            position["liquidity"] = 0
-        else:
-            # Partial removal
-            new_token0 = position["token0_amount"] - remove_token0
-            new_token1 = position["token1_amount"] - remove_token1
-            new_liquidity = math.sqrt(new_token0 * new_token1) if new_token0 > 0 and new_token1 > 0 else 0
-            
-            await db.positions.update_one(
-                {"id": remove_data.position_id},
-                {"$set": {
-                    "token0_amount": new_token0,
-                    "token1_amount": new_token1,
-                    "liquidity": new_liquidity,
-                    "updated_at": datetime.utcnow()
-                }}
-            )
-            position = await db.positions.find_one({"id": remove_data.position_id})
-        
-        # Update pool reserves
-        token0 = await db.tokens.find_one({"address": pool["token0_address"]})
-        token1 = await db.tokens.find_one({"address": pool["token1_address"]})
-        
-        new_reserve0 = max(0, pool["token0_reserve"] - remove_token0)
-        new_reserve1 = max(0, pool["token1_reserve"] - remove_token1)
-        
-        token0_price = token0.get("price", 1) if token0 else 1
-        token1_price = token1.get("price", 1) if token1 else 1
-        new_tvl = (new_reserve0 * token0_price) + (new_reserve1 * token1_price)
-        
-        await db.pools.update_one(
-            {"id": position["pool_id"]},
-            {"$set": {
-                "token0_reserve": new_reserve0,
-                "token1_reserve": new_reserve1,
-                "tvl": new_tvl
-            }}
-        )
-        
-        # Record transaction
+        # Claim the tx_hash first so a retried request changes nothing
         tx = Transaction(
             id=str(uuid.uuid4()),
             type="remove",
@@ -190,9 +119,43 @@ async def remove_liquidity(remove_data: PositionRemove):
             token1_address=pool["token1_address"],
             amount0=remove_token0,
             amount1=remove_token1,
+            tx_hash=remove_data.tx_hash,
             status="confirmed"
         )
-        await db.transactions.insert_one(tx.model_dump())
+        tx_doc = tx.model_dump()
+        try:
+            await claim_transaction(tx_doc)
+        except AlreadyRecorded:
+            logger.info(f"Position removal {remove_data.tx_hash} already recorded, ignoring retry")
+            return Position(**position)
+        
+        removed_from = dict(position)
+        async with release_on_failure(tx_doc):
+            if percent >= 1:
+                # Remove entire position; only one of two racing removals deletes it
+                deleted = await db.positions.delete_one({"id": remove_data.position_id})
+                if not deleted.deleted_count:
+                    raise HTTPException(status_code=404, detail="Position not found")
+                position["token0_amount"] = 0
+                position["token1_amount"] = 0
+                position["liquidity"] = 0
+            else:
+                updated = await remove_from_position(remove_data.position_id, remove_token0, remove_token1)
+                if updated is None:
+                    # Deleted or drained by a concurrent removal; the pool must not be debited again
+                    if await db.positions.find_one({"id": remove_data.position_id}, {"_id": 1}):
+                        raise HTTPException(status_code=409, detail="Position changed, please retry")
+                    raise HTTPException(status_code=404, detail="Position not found")
+                position = updated
+        
+        # Take the amounts out of the pool reserves atomically
+        try:
+            await change_reserves(pool, -remove_token0, -remove_token1)
+        except BaseException:
+            # Put the position back before releasing the claim, so the retry applies both once
+            await restore_position(removed_from, remove_token0, remove_token1)
+            await release_transaction(tx_doc)
+            raise
         
         return Position(**position) if position.get("liquidity", 0) > 0 else Position(
             id=remove_data.position_id,
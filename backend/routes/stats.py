@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from models import ProtocolStats
-from database import db
+from protocol_stats import get_protocol_stats, reconcile
+from volume_windows import volume_windows
+from unique_wallets import unique_wallets
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/stats", tags=["stats"])
@@ -10,35 +11,22 @@ router = APIRouter(prefix="/api/stats", tags=["stats"])
 
 @router.get("", response_model=ProtocolStats)
 async def get_stats():
-    """Get protocol statistics"""
+    """Get protocol statistics (maintained incrementally, one document read)"""
     try:
-        # Get or create stats
-        stats = await db.stats.find_one({})
+        stats = await get_protocol_stats()
         
         if not stats:
-            # Calculate stats from data
-            pools = await db.pools.find().to_list(1000)
-            transactions = await db.transactions.find().to_list(10000)
-            
-            total_tvl = sum(pool.get("tvl", 0) for pool in pools)
-            total_volume = sum(pool.get("volume_24h", 0) for pool in pools)
-            unique_wallets = set(tx.get("wallet_address") for tx in transactions)
-            
-            stats = ProtocolStats(
-                total_volume=total_volume * 10,  # Simulated historical volume
-                tvl=total_tvl,
-                total_swappers=len(unique_wallets),
-                volume_24h=total_volume,
-                transactions_24h=len(transactions),
-                active_pools=len(pools)
-            )
-            
-            await db.stats.insert_one(stats.model_dump())
-        else:
-            # Update pool count
-            pools_count = await db.pools.count_documents({})
-            stats["active_pools"] = pools_count
-            stats = ProtocolStats(**stats)
+            # First request on an empty deployment - build the counters once
+            stats = (await reconcile())["stats"]
+        
+        # Exact rolling 24h figures from the in-memory window
+        stats.volume_24h, stats.transactions_24h = await volume_windows.totals()
+        
+        # Approximate unique swappers from the HyperLogLog sketches
+        swappers = await unique_wallets.get()
+        stats.total_swappers = swappers["total_swappers"]
+        stats.swappers_24h = swappers["swappers_24h"]
+        stats.swappers_7d = swappers["swappers_7d"]
         
         return stats
     except Exception as e:
@@ -48,37 +36,10 @@ async def get_stats():
 
 @router.post("/refresh")
 async def refresh_stats():
-    """Refresh protocol statistics"""
+    """Reconcile protocol statistics against a full aggregation"""
     try:
-        pools = await db.pools.find().to_list(1000)
-        transactions = await db.transactions.find().to_list(10000)
-        
-        total_tvl = sum(pool.get("tvl", 0) for pool in pools)
-        total_volume_24h = sum(pool.get("volume_24h", 0) for pool in pools)
-        unique_wallets = set(tx.get("wallet_address") for tx in transactions)
-        
-        # Calculate total historical volume from transactions
-        total_volume = 0
-        for tx in transactions:
-            if tx.get("type") == "swap":
-                token = await db.tokens.find_one({"address": tx.get("token0_address")})
-                if token:
-                    total_volume += tx.get("amount0", 0) * token.get("price", 1)
-        
-        stats = ProtocolStats(
-            total_volume=total_volume if total_volume > 0 else total_volume_24h * 30,
-            tvl=total_tvl,
-            total_swappers=len(unique_wallets),
-            volume_24h=total_volume_24h,
-            transactions_24h=len([tx for tx in transactions]),
-            active_pools=len(pools),
-            updated_at=datetime.utcnow()
-        )
-        
-        await db.stats.delete_many({})
-        await db.stats.insert_one(stats.model_dump())
-        
-        return {"message": "Stats refreshed", "stats": stats}
+        result = await reconcile()
+        return {"message": "Stats refreshed", "stats": result["stats"], "drift": result["drift"]}
     except Exception as e:
         logger.error(f"Error refreshing stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh stats")
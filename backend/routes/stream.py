@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from events import broker
+from pairs import pair_key
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/{token0_address}/{token1_address}")
+async def stream_pair(token0_address: str, token1_address: str, request: Request):
+    """Server-sent events for a pair: trades, pool reserve changes and candle updates"""
+    topic = pair_key(token0_address, token1_address)
+    
+    async def events():
+        queue = broker.subscribe(topic)
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            broker.unsubscribe(topic, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws/{token0_address}/{token1_address}")
+async def stream_pair_ws(websocket: WebSocket, token0_address: str, token1_address: str):
+    """WebSocket variant of the pair stream; each message is {"type": ..., "data": ...}"""
+    topic = pair_key(token0_address, token1_address)
+    await websocket.accept()
+    queue = broker.subscribe(topic)
+    # Listen to the socket too, so a client leaving an idle pair is noticed right away
+    receive = asyncio.ensure_future(websocket.receive())
+    get = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receive, get}, return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                await websocket.send_text(json.dumps(get.result(), default=str))
+                get = asyncio.ensure_future(queue.get())
+            if receive in done:
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                # Clients have nothing to say; keep waiting for the disconnect
+                receive = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"WebSocket stream closed: {e}")
+    finally:
+        receive.cancel()
+        get.cancel()
+        broker.unsubscribe(topic, queue)
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import List, Optional
 from pydantic import BaseModel
-from models import SwapQuoteRequest, SwapQuoteResponse, SwapExecuteRequest, Transaction
+from models import (
+    SwapQuoteRequest, SwapQuoteResponse, SwapExecuteRequest, SwapSplit, Transaction,
+    SwapQuoteBatchRequest, SwapQuoteBatchResponse, SwapQuoteBatchResult
+)
 from database import db
+from token_registry import token_registry
+from pool_graph import pool_graph
+from routing import best_split, quote_route
+from batch_quotes import quote_many
+from candles import INTERVALS, get_candles
+import swap_recorder
+from idempotency import AlreadyRecorded
+from events import broker
+from pairs import pair_key
+from pagination import find_page
 import logging
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/swap", tags=["swap"])
 
+MAX_PAGE_SIZE = 500
+
 
 class TradeHistoryItem(BaseModel):
     id: str
@@ -25,26 +40,37 @@ class TradeHistoryItem(BaseModel):
 
 
 @router.get("/trades/{token0_address}/{token1_address}", response_model=List[TradeHistoryItem])
-async def get_trade_history(token0_address: str, token1_address: str, limit: int = 50):
-    """Get real trade history for a token pair"""
+async def get_trade_history(
+    token0_address: str,
+    token1_address: str,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Get real trade history for a token pair, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
         token0_addr = token0_address.lower()
         token1_addr = token1_address.lower()
         
         # Get token info for symbols
-        token0 = await db.tokens.find_one({"address": token0_addr})
-        token1 = await db.tokens.find_one({"address": token1_addr})
+        token0 = await token_registry.get(token0_addr)
+        token1 = await token_registry.get(token1_addr)
         
         if not token0 or not token1:
             return []
         
         # Find transactions for this pair (both directions)
-        transactions = await db.transactions.find({
-            "$or": [
-                {"token0_address": token0_addr, "token1_address": token1_addr},
-                {"token0_address": token1_addr, "token1_address": token0_addr}
-            ]
-        }).sort("timestamp", -1).limit(limit).to_list(limit)
+        try:
+            transactions, next_cursor = await find_page(
+                db.transactions, {"pair_key": pair_key(token0_addr, token1_addr)},
+                "timestamp", cursor, max(1, min(limit, MAX_PAGE_SIZE))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         trades = []
         for tx in transactions:
@@ -80,21 +106,26 @@ async def get_trade_history(token0_address: str, token1_address: str, limit: int
                 ))
         
         return trades
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching trade history: {e}")
         return []
 
 
 @router.get("/price-history/{token0_address}/{token1_address}")
-async def get_price_history(token0_address: str, token1_address: str, days: int = 30):
-    """Get price history for charting - derived from actual trades"""
+async def get_price_history(token0_address: str, token1_address: str, days: int = 30, interval: str = "1d"):
+    """Get OHLCV candles for charting from the pre-aggregated candle store"""
     try:
+        if interval not in INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}")
+        
         token0_addr = token0_address.lower()
         token1_addr = token1_address.lower()
         
         # Get token info
-        token0 = await db.tokens.find_one({"address": token0_addr})
-        token1 = await db.tokens.find_one({"address": token1_addr})
+        token0 = await token_registry.get(token0_addr)
+        token1 = await token_registry.get(token1_addr)
         
         if not token0 or not token1:
             return {"candles": [], "basePrice": 1}
@@ -102,57 +133,19 @@ async def get_price_history(token0_address: str, token1_address: str, days: int
         # Get current price ratio
         base_price = token0.get("price", 1) / token1.get("price", 1) if token1.get("price", 1) > 0 else 1
         
-        # Find transactions for this pair
-        transactions = await db.transactions.find({
-            "$or": [
-                {"token0_address": token0_addr, "token1_address": token1_addr},
-                {"token0_address": token1_addr, "token1_address": token0_addr}
-            ]
-        }).sort("timestamp", -1).limit(500).to_list(500)
-        
-        if not transactions:
-            # No real trades yet - return base price info
-            return {
-                "candles": [],
-                "basePrice": base_price,
-                "token0Symbol": token0["symbol"],
-                "token1Symbol": token1["symbol"],
-                "hasRealData": False
-            }
-        
-        # Group trades by day and create OHLC candles
-        from collections import defaultdict
-        daily_prices = defaultdict(list)
-        
-        for tx in transactions:
-            if tx["token0_address"] == token0_addr:
-                price = tx["amount1"] / tx["amount0"] if tx["amount0"] > 0 else base_price
-            else:
-                price = tx["amount0"] / tx["amount1"] if tx["amount1"] > 0 else base_price
-            
-            timestamp = tx.get("timestamp", datetime.now(timezone.utc))
-            day_key = timestamp.strftime("%Y-%m-%d")
-            daily_prices[day_key].append(price)
-        
-        # Create candles
-        candles = []
-        for day, prices in sorted(daily_prices.items()):
-            candles.append({
-                "time": day,
-                "open": prices[0],
-                "high": max(prices),
-                "low": min(prices),
-                "close": prices[-1],
-                "volume": len(prices)
-            })
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        candles = await get_candles(token0_addr, token1_addr, interval, start)
         
         return {
             "candles": candles,
             "basePrice": base_price,
             "token0Symbol": token0["symbol"],
             "token1Symbol": token1["symbol"],
+            "interval": interval,
             "hasRealData": len(candles) > 0
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching price history: {e}")
         return {"candles": [], "basePrice": 1, "hasRealData": False}
@@ -166,50 +159,81 @@ async def get_swap_quote(quote_request: SwapQuoteRequest):
         token_out_addr = quote_request.token_out.lower()
         
         # Get tokens
-        token_in = await db.tokens.find_one({"address": token_in_addr})
-        token_out = await db.tokens.find_one({"address": token_out_addr})
+        token_in = await token_registry.get(token_in_addr)
+        token_out = await token_registry.get(token_out_addr)
         
         if not token_in or not token_out:
             raise HTTPException(status_code=404, detail="One or both tokens not found")
         
-        # Find pool for this pair
-        pool = await db.pools.find_one({
-            "$or": [
-                {"token0_address": token_in_addr, "token1_address": token_out_addr},
-                {"token0_address": token_out_addr, "token1_address": token_in_addr}
-            ]
-        })
-        
-        # Calculate exchange rate based on token prices
-        token_in_price = token_in.get("price", 1)
-        token_out_price = token_out.get("price", 1)
-        
-        if token_out_price == 0:
-            raise HTTPException(status_code=400, detail="Invalid token price")
-        
-        exchange_rate = token_in_price / token_out_price
-        amount_out = quote_request.amount_in * exchange_rate
-        
-        # Calculate fee (use pool fee if exists, else default 0.3%)
-        fee_percent = pool["fee"] if pool else 0.3
-        fee = amount_out * (fee_percent / 100)
-        amount_out_after_fee = amount_out - fee
-        
-        # Calculate price impact (simplified)
-        price_impact = 0.1 if quote_request.amount_in < 1000 else 0.5 if quote_request.amount_in < 10000 else 1.0
+        # Best route through the cached pool graph (direct or multi-hop)
+        graph = await pool_graph.get()
+        best = graph.best_route(token_in_addr, token_out_addr, quote_request.amount_in, quote_request.max_hops)
+        
+        split = None
+        if best and quote_request.split:
+            split = best_split(graph, token_in_addr, token_out_addr, quote_request.amount_in, quote_request.max_hops)
+            if split and (len(split.legs) < 2 or split.amount_out <= best.amount_out):
+                split = None
+        
+        splits = []
+        if split:
+            # Trade split across parallel routes
+            exchange_rate = split.mid_price
+            amount_out_after_fee = split.amount_out
+            fee = split.amount_out_without_fee - split.amount_out
+            price_impact = (1 - split.amount_out_without_fee / (quote_request.amount_in * split.mid_price)) * 100
+            route = list(dict.fromkeys(pool_id for leg in split.legs for pool_id in leg.pools))
+            path = split.legs[0].path
+            splits = [SwapSplit(
+                route=leg.pools,
+                path=leg.path,
+                amount_in=round(leg.amount_in, 6),
+                amount_out=round(leg.amount_out, 6),
+                percent=round(leg.amount_in / quote_request.amount_in * 100, 2)
+            ) for leg in split.legs]
+        elif best:
+            # Constant-product quote against the pool reserves along the route
+            quote = quote_route(graph, best)
+            exchange_rate = quote.mid_price
+            amount_out_after_fee = quote.amount_out
+            fee = quote.fee
+            price_impact = quote.price_impact
+            route = best.pools
+            path = best.path
+        else:
+            # No liquidity yet - fall back to an indicative quote from token prices
+            pool = graph.direct_pool(token_in_addr, token_out_addr)
+            token_in_price = token_in.get("price", 1)
+            token_out_price = token_out.get("price", 1)
+            
+            if token_out_price == 0:
+                raise HTTPException(status_code=400, detail="Invalid token price")
+            
+            exchange_rate = token_in_price / token_out_price
+            amount_out = quote_request.amount_in * exchange_rate
+            
+            # Calculate fee (use pool fee if exists, else default 0.3%)
+            fee_percent = pool.fee if pool else 0.3
+            fee = amount_out * (fee_percent / 100)
+            amount_out_after_fee = amount_out - fee
+            
+            # Calculate price impact (simplified)
+            price_impact = 0.1 if quote_request.amount_in < 1000 else 0.5 if quote_request.amount_in < 10000 else 1.0
+            route = [pool.id] if pool else []
+            path = [token_in_addr, token_out_addr] if pool else []
         
         # Minimum received with default 0.5% slippage
         minimum_received = amount_out_after_fee * 0.995
         
-        route = [pool["id"]] if pool else []
-        
         return SwapQuoteResponse(
             amount_out=round(amount_out_after_fee, 6),
             price_impact=round(price_impact, 2),
             route=route,
+            path=path,
             exchange_rate=round(exchange_rate, 6),
             minimum_received=round(minimum_received, 6),
-            fee=round(fee, 6)
+            fee=round(fee, 6),
+            splits=splits
         )
     except HTTPException:
         raise
@@ -218,6 +242,43 @@ async def get_swap_quote(quote_request: SwapQuoteRequest):
         raise HTTPException(status_code=500, detail="Failed to get swap quote")
 
 
+@router.post("/quotes", response_model=SwapQuoteBatchResponse)
+async def get_swap_quotes(batch_request: SwapQuoteBatchRequest):
+    """Get many swap quotes in one request, priced in a single vectorized pass"""
+    try:
+        requests = [
+            (item.token_in.lower(), item.token_out.lower(), item.amount_in)
+            for item in batch_request.quotes
+        ]
+        tokens = await token_registry.get_many(
+            address for request in requests for address in request[:2]
+        )
+        prices = {address: token.get("price", 1) for address, token in tokens.items()}
+        graph = await pool_graph.get()
+        
+        quotes = quote_many(graph, requests, prices, batch_request.max_hops)
+        
+        return SwapQuoteBatchResponse(quotes=[
+            SwapQuoteBatchResult(
+                token_in=token_in,
+                token_out=token_out,
+                amount_in=amount_in,
+                amount_out=round(quote.amount_out, 6),
+                price_impact=round(quote.price_impact, 2),
+                route=quote.pools,
+                path=quote.path,
+                exchange_rate=round(quote.exchange_rate, 6),
+                minimum_received=round(quote.amount_out * 0.995, 6),
+                fee=round(quote.fee, 6),
+                error=quote.error
+            )
+            for (token_in, token_out, amount_in), quote in zip(requests, quotes)
+        ])
+    except Exception as e:
+        logger.error(f"Error getting swap quotes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get swap quotes")
+
+
 @router.post("/execute", response_model=Transaction)
 async def execute_swap(swap_request: SwapExecuteRequest):
     """Execute a swap (record transaction)"""
@@ -226,30 +287,16 @@ async def execute_swap(swap_request: SwapExecuteRequest):
         token_out_addr = swap_request.token_out.lower()
         
         # Verify tokens exist
-        token_in = await db.tokens.find_one({"address": token_in_addr})
-        token_out = await db.tokens.find_one({"address": token_out_addr})
+        tokens = await token_registry.get_many([token_in_addr, token_out_addr])
+        token_in = tokens.get(token_in_addr)
+        token_out = tokens.get(token_out_addr)
         
         if not token_in or not token_out:
             raise HTTPException(status_code=404, detail="One or both tokens not found")
         
-        # Find pool and update volume
-        pool = await db.pools.find_one({
-            "$or": [
-                {"token0_address": token_in_addr, "token1_address": token_out_addr},
-                {"token0_address": token_out_addr, "token1_address": token_in_addr}
-            ]
-        })
-        
-        if pool:
-            # Update pool volume
-            token_in_price = token_in.get("price", 1)
-            volume_usd = swap_request.amount_in * token_in_price
-            await db.pools.update_one(
-                {"id": pool["id"]},
-                {"$inc": {"volume_24h": volume_usd}}
-            )
+        token_in_price = token_in.get("price", 1)
+        volume_usd = swap_request.amount_in * token_in_price
         
-        # Create transaction record with timestamp
         tx = Transaction(
             id=str(uuid.uuid4()),
             type="swap",
@@ -261,24 +308,28 @@ async def execute_swap(swap_request: SwapExecuteRequest):
             tx_hash=swap_request.tx_hash,
             status="confirmed"
         )
-        
         tx_dict = tx.model_dump()
         tx_dict["timestamp"] = datetime.now(timezone.utc)
         
-        await db.transactions.insert_one(tx_dict)
-        
-        # Update stats
-        await db.stats.update_one(
-            {},
-            {
-                "$inc": {
-                    "total_volume": swap_request.amount_in * token_in.get("price", 1),
-                    "volume_24h": swap_request.amount_in * token_in.get("price", 1),
-                    "transactions_24h": 1
-                }
-            },
-            upsert=True
-        )
+        # Pool, transaction, stats and derived aggregates in two round trips
+        try:
+            await swap_recorder.record_swap(tx_dict, volume_usd, token_in_price, token_out.get("price", 1))
+        except AlreadyRecorded as e:
+            logger.info(f"Swap {swap_request.tx_hash} already recorded, ignoring retry")
+            return Transaction(**e.transaction)
+        
+        broker.publish(pair_key(token_in_addr, token_out_addr), "trade", {
+            "id": tx.id,
+            "wallet_address": tx.wallet_address,
+            "token_in_address": token_in_addr,
+            "token_in_symbol": token_in["symbol"],
+            "token_out_address": token_out_addr,
+            "token_out_symbol": token_out["symbol"],
+            "amount_in": swap_request.amount_in,
+            "amount_out": swap_request.amount_out,
+            "tx_hash": tx.tx_hash,
+            "timestamp": tx_dict["timestamp"]
+        })
         
         logger.info(f"Swap executed: {token_in['symbol']} -> {token_out['symbol']}, amount: {swap_request.amount_in}, tx: {swap_request.tx_hash}")
         
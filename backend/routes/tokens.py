@@ -2,6 +2,10 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 from models import Token, TokenCreate
 from database import db
+from token_registry import token_registry
+from token_discovery import is_address, token_discovery
+from rpc_client import RPCError
+import httpx
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,18 +16,38 @@ router = APIRouter(prefix="/api/tokens", tags=["tokens"])
 async def get_tokens():
     """Get all tokens"""
     try:
-        tokens = await db.tokens.find().to_list(1000)
+        tokens = await token_registry.all()
         return [Token(**token) for token in tokens]
     except Exception as e:
         logger.error(f"Error fetching tokens: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch tokens")
 
 
+@router.get("/discover/{address}", response_model=Token)
+async def discover_token(address: str):
+    """Get a token by address, reading its ERC-20 metadata from the chain if it isn't registered yet"""
+    try:
+        if not is_address(address):
+            raise HTTPException(status_code=400, detail="Invalid token address")
+        token = await token_discovery.discover(address)
+        if not token:
+            raise HTTPException(status_code=404, detail="Not an ERC-20 token on PIOGOLD")
+        return Token(**token)
+    except HTTPException:
+        raise
+    except (RPCError, httpx.HTTPError) as e:
+        logger.error(f"Error reading token {address} from chain: {e}")
+        raise HTTPException(status_code=502, detail="PIOGOLD RPC unavailable")
+    except Exception as e:
+        logger.error(f"Error discovering token: {e}")
+        raise HTTPException(status_code=500, detail="Failed to discover token")
+
+
 @router.get("/{address}", response_model=Token)
 async def get_token(address: str):
     """Get token by address"""
     try:
-        token = await db.tokens.find_one({"address": address.lower()})
+        token = await token_registry.get(address)
         if not token:
             raise HTTPException(status_code=404, detail="Token not found")
         return Token(**token)
@@ -39,7 +63,7 @@ async def create_token(token_data: TokenCreate):
     """Add a new token"""
     try:
         # Check if token already exists
-        existing = await db.tokens.find_one({"address": token_data.address.lower()})
+        existing = await token_registry.get(token_data.address)
         if existing:
             raise HTTPException(status_code=400, detail="Token already exists")
         
@@ -49,6 +73,7 @@ async def create_token(token_data: TokenCreate):
         
         token = Token(**token_dict)
         await db.tokens.insert_one(token.model_dump())
+        await token_registry.invalidate()
         return token
     except HTTPException:
         raise
@@ -1,72 +1,95 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models import Transaction, TransactionResponse, Token
+from fastapi import APIRouter, HTTPException, Response
+from typing import List, Optional
+from models import TransactionResponse, Token
 from database import db
+from token_registry import token_registry
+from pagination import find_page
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
+MAX_PAGE_SIZE = 500
+
+
+async def build_transaction_responses(transactions: List[dict]) -> List[TransactionResponse]:
+    """Join a page of transactions with their tokens using one batched lookup"""
+    addresses = set()
+    for tx in transactions:
+        addresses.add(tx["token0_address"])
+        addresses.add(tx["token1_address"])
+    tokens = await token_registry.get_many(addresses)
+    models = {address: Token(**token) for address, token in tokens.items()}
+    
+    result = []
+    for tx in transactions:
+        token0 = models.get(tx["token0_address"].lower())
+        token1 = models.get(tx["token1_address"].lower())
+        
+        if token0 and token1:
+            result.append(TransactionResponse(
+                id=tx["id"],
+                type=tx["type"],
+                wallet_address=tx["wallet_address"],
+                token0=token0,
+                token1=token1,
+                amount0=tx["amount0"],
+                amount1=tx["amount1"],
+                tx_hash=tx.get("tx_hash"),
+                timestamp=tx["timestamp"],
+                status=tx["status"]
+            ))
+    
+    return result
+
 
 @router.get("/{wallet_address}", response_model=List[TransactionResponse])
-async def get_transactions(wallet_address: str, limit: int = 50):
-    """Get user's transaction history"""
+async def get_transactions(
+    wallet_address: str,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Get user's transaction history, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        transactions = await db.transactions.find(
-            {"wallet_address": wallet_address.lower()}
-        ).sort("timestamp", -1).limit(limit).to_list(limit)
-        
-        result = []
-        for tx in transactions:
-            token0 = await db.tokens.find_one({"address": tx["token0_address"]})
-            token1 = await db.tokens.find_one({"address": tx["token1_address"]})
-            
-            if token0 and token1:
-                result.append(TransactionResponse(
-                    id=tx["id"],
-                    type=tx["type"],
-                    wallet_address=tx["wallet_address"],
-                    token0=Token(**token0),
-                    token1=Token(**token1),
-                    amount0=tx["amount0"],
-                    amount1=tx["amount1"],
-                    tx_hash=tx.get("tx_hash"),
-                    timestamp=tx["timestamp"],
-                    status=tx["status"]
-                ))
+        try:
+            transactions, next_cursor = await find_page(
+                db.transactions, {"wallet_address": wallet_address.lower()},
+                "timestamp", cursor, max(1, min(limit, MAX_PAGE_SIZE))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
-        return result
+        return await build_transaction_responses(transactions)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching transactions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch transactions")
 
 
 @router.get("", response_model=List[TransactionResponse])
-async def get_all_transactions(limit: int = 100):
-    """Get all recent transactions"""
+async def get_all_transactions(response: Response, limit: int = 100, cursor: Optional[str] = None):
+    """Get all transactions, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        transactions = await db.transactions.find().sort("timestamp", -1).limit(limit).to_list(limit)
-        
-        result = []
-        for tx in transactions:
-            token0 = await db.tokens.find_one({"address": tx["token0_address"]})
-            token1 = await db.tokens.find_one({"address": tx["token1_address"]})
-            
-            if token0 and token1:
-                result.append(TransactionResponse(
-                    id=tx["id"],
-                    type=tx["type"],
-                    wallet_address=tx["wallet_address"],
-                    token0=Token(**token0),
-                    token1=Token(**token1),
-                    amount0=tx["amount0"],
-                    amount1=tx["amount1"],
-                    tx_hash=tx.get("tx_hash"),
-                    timestamp=tx["timestamp"],
-                    status=tx["status"]
-                ))
+        try:
+            transactions, next_cursor = await find_page(
+                db.transactions, {}, "timestamp", cursor, max(1, min(limit, MAX_PAGE_SIZE))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
-        return result
+        return await build_transaction_responses(transactions)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching transactions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch transactions")
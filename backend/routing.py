@@ -0,0 +1,301 @@
+"""
+Multi-hop swap routing over an in-memory token/pool graph.
+
+Tokens are nodes and pools are edges carrying reserves and fee. The graph is
+pure data with no I/O; ``pool_graph.py`` keeps a process-wide instance in
+sync with Mongo.
+"""
+from amm import Quote, get_amount_out
+from typing import Dict, List, NamedTuple, Optional
+
+DEFAULT_MAX_HOPS = 3
+
+
+def _pair(token_a: str, token_b: str) -> tuple:
+    return (token_a, token_b) if token_a < token_b else (token_b, token_a)
+
+
+class PoolEdge:
+    """A pool as seen by the router"""
+    __slots__ = ("id", "token0", "token1", "reserve0", "reserve1", "fee")
+
+    def __init__(self, id: str, token0: str, token1: str, reserve0: float, reserve1: float, fee: float):
+        self.id = id
+        self.token0 = token0
+        self.token1 = token1
+        self.reserve0 = reserve0
+        self.reserve1 = reserve1
+        self.fee = fee
+
+    def other(self, token: str) -> str:
+        return self.token1 if token == self.token0 else self.token0
+
+    def reserves(self, token_in: str):
+        """(reserve_in, reserve_out) when swapping token_in through this pool"""
+        if token_in == self.token0:
+            return self.reserve0, self.reserve1
+        return self.reserve1, self.reserve0
+
+    def has_liquidity(self) -> bool:
+        return self.reserve0 > 0 and self.reserve1 > 0
+
+
+class Route(NamedTuple):
+    path: List[str]  # Token addresses from token_in to token_out
+    pools: List[str]  # Pool ids, one per hop
+    amounts: List[float]  # Amount held after each hop, starting with amount_in
+
+    @property
+    def amount_out(self) -> float:
+        return self.amounts[-1]
+
+
+class PoolGraph:
+    """Token-pair graph supporting incremental pool updates and best-path search"""
+
+    def __init__(self):
+        self.pools: Dict[str, PoolEdge] = {}
+        self.adjacency: Dict[str, Dict[str, PoolEdge]] = {}
+        self.pairs: Dict[tuple, PoolEdge] = {}
+
+    def __len__(self):
+        return len(self.pools)
+
+    def clear(self):
+        self.pools.clear()
+        self.adjacency.clear()
+        self.pairs.clear()
+
+    def upsert_pool(self, pool: dict):
+        """Add a pool document or refresh its reserves and fee"""
+        edge = self.pools.get(pool["id"])
+        if edge is None:
+            edge = PoolEdge(
+                pool["id"],
+                pool["token0_address"].lower(),
+                pool["token1_address"].lower(),
+                pool.get("token0_reserve", 0) or 0,
+                pool.get("token1_reserve", 0) or 0,
+                pool.get("fee", 0.3)
+            )
+            self.pools[edge.id] = edge
+            self.adjacency.setdefault(edge.token0, {})[edge.id] = edge
+            self.adjacency.setdefault(edge.token1, {})[edge.id] = edge
+            self.pairs[_pair(edge.token0, edge.token1)] = edge
+        else:
+            edge.reserve0 = pool.get("token0_reserve", edge.reserve0) or 0
+            edge.reserve1 = pool.get("token1_reserve", edge.reserve1) or 0
+            edge.fee = pool.get("fee", edge.fee)
+        return edge
+
+    def remove_pool(self, pool_id: str):
+        edge = self.pools.pop(pool_id, None)
+        if edge is None:
+            return
+        if self.pairs.get(_pair(edge.token0, edge.token1)) is edge:
+            del self.pairs[_pair(edge.token0, edge.token1)]
+        for token in (edge.token0, edge.token1):
+            neighbours = self.adjacency.get(token)
+            if neighbours is not None:
+                neighbours.pop(pool_id, None)
+                if not neighbours:
+                    del self.adjacency[token]
+
+    def pools_for(self, token: str) -> List[PoolEdge]:
+        """Pools that contain a token"""
+        return list(self.adjacency.get(token.lower(), {}).values())
+
+    def direct_pool(self, token_a: str, token_b: str) -> Optional[PoolEdge]:
+        """The pool pairing two tokens, if any"""
+        return self.pairs.get(_pair(token_a.lower(), token_b.lower()))
+
+    def best_route(
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: float,
+        max_hops: int = DEFAULT_MAX_HOPS
+    ) -> Optional[Route]:
+        """Route with the highest output for an exact input, using at most max_hops pools.
+
+        Runs a layered search that keeps the best amount reaching each token
+        per hop count, so the cost is O(max_hops * pools) rather than the
+        number of simple paths.
+        """
+        token_in = token_in.lower()
+        token_out = token_out.lower()
+        if token_in == token_out or amount_in <= 0 or token_in not in self.adjacency:
+            return None
+
+        # token -> (amount, path, pools, amounts) reached with exactly `hop` hops
+        frontier = {token_in: (amount_in, [token_in], [], [amount_in])}
+        best = None
+        for _ in range(max_hops):
+            next_frontier = {}
+            for token, (amount, path, pools, amounts) in frontier.items():
+                for edge in self.adjacency.get(token, {}).values():
+                    if edge.reserve0 <= 0 or edge.reserve1 <= 0:
+                        continue
+                    if token == edge.token0:
+                        nxt, reserve_in, reserve_out = edge.token1, edge.reserve0, edge.reserve1
+                    else:
+                        nxt, reserve_in, reserve_out = edge.token0, edge.reserve1, edge.reserve0
+                    if nxt in path:
+                        continue
+                    amount_in_with_fee = amount * (100 - edge.fee)
+                    out = amount_in_with_fee * reserve_out / (reserve_in * 100 + amount_in_with_fee)
+                    if nxt == token_out:
+                        if best is None or out > best.amount_out:
+                            best = Route(path + [nxt], pools + [edge.id], amounts + [out])
+                        continue
+                    current = next_frontier.get(nxt)
+                    if current is None or out > current[0]:
+                        next_frontier[nxt] = (out, path + [nxt], pools + [edge.id], amounts + [out])
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return best
+
+
+def quote_route(graph: PoolGraph, route: Route) -> Quote:
+    """Summarise a route as a Quote: fee and price impact are compounded over hops"""
+    amount_in = route.amounts[0]
+    mid_price = 1.0
+    amount_without_fee = amount_in
+    for token, pool_id in zip(route.path, route.pools):
+        reserve_in, reserve_out = graph.pools[pool_id].reserves(token)
+        mid_price *= reserve_out / reserve_in
+        amount_without_fee = amount_without_fee * reserve_out / (reserve_in + amount_without_fee)
+    return Quote(
+        route.amount_out,
+        amount_without_fee - route.amount_out,
+        (1 - amount_without_fee / (amount_in * mid_price)) * 100,
+        mid_price,
+        route.amount_out / amount_in
+    )
+
+
+class SplitLeg(NamedTuple):
+    path: List[str]
+    pools: List[str]
+    amount_in: float
+    amount_out: float
+
+
+class SplitQuote(NamedTuple):
+    amount_out: float
+    amount_out_without_fee: float
+    mid_price: float  # Input-weighted mid price over the legs used
+    legs: List[SplitLeg]
+
+
+def _simulate(graph: PoolGraph, path, pools, amount, overrides, fee_free=False):
+    """Push an amount along a path against overridden reserves; returns (out, new reserves)"""
+    updates = []
+    for token, pool_id in zip(path, pools):
+        edge = graph.pools[pool_id]
+        reserve0, reserve1 = overrides.get(pool_id) or (edge.reserve0, edge.reserve1)
+        if token == edge.token0:
+            out = get_amount_out(amount, reserve0, reserve1, 0 if fee_free else edge.fee)
+            updates.append((pool_id, (reserve0 + amount, reserve1 - out)))
+        else:
+            out = get_amount_out(amount, reserve1, reserve0, 0 if fee_free else edge.fee)
+            updates.append((pool_id, (reserve0 - out, reserve1 + amount)))
+        amount = out
+    return amount, updates
+
+
+def candidate_paths(graph: PoolGraph, token_in: str, token_out: str, max_hops: int, limit: int = 5000):
+    """Enumerate simple paths as (tokens, pool ids), stopping after `limit` paths"""
+    # Pools into token_out, keyed by the other token, so the last hop is a lookup
+    into_out = {}
+    for edge in graph.adjacency.get(token_out, {}).values():
+        if edge.reserve0 > 0 and edge.reserve1 > 0:
+            into_out.setdefault(edge.other(token_out), []).append(edge.id)
+
+    results = []
+    stack = [(token_in, [token_in], [])]
+    while stack and len(results) < limit:
+        token, path, pools = stack.pop()
+        for pool_id in into_out.get(token, ()):
+            results.append((path + [token_out], pools + [pool_id]))
+        if len(pools) + 2 > max_hops:
+            continue
+        for edge in graph.adjacency.get(token, {}).values():
+            if edge.reserve0 <= 0 or edge.reserve1 <= 0:
+                continue
+            nxt = edge.token1 if token == edge.token0 else edge.token0
+            if nxt == token_out or nxt in path:
+                continue
+            if nxt in into_out or len(pools) + 3 <= max_hops:
+                stack.append((nxt, path + [nxt], pools + [edge.id]))
+    return results
+
+
+def best_split(
+    graph: PoolGraph,
+    token_in: str,
+    token_out: str,
+    amount_in: float,
+    max_hops: int = DEFAULT_MAX_HOPS,
+    step_percent: float = 5.0,
+    max_legs: int = 8
+) -> Optional[SplitQuote]:
+    """Split an exact input across parallel routes to maximise total output.
+
+    The input is cut into ``step_percent`` chunks and each chunk is sent
+    greedily down the candidate route with the best marginal output, with
+    reserves updated after every chunk so routes sharing a pool see each
+    other's impact. Only the ``max_legs`` routes that are best for a single
+    chunk are considered.
+    """
+    token_in = token_in.lower()
+    token_out = token_out.lower()
+    if token_in == token_out or amount_in <= 0 or token_in not in graph.adjacency:
+        return None
+
+    steps = max(1, int(round(100 / step_percent)))
+    chunk = amount_in / steps
+
+    paths = candidate_paths(graph, token_in, token_out, max_hops)
+    if not paths:
+        return None
+    scored = sorted(paths, key=lambda p: _simulate(graph, p[0], p[1], chunk, {})[0], reverse=True)
+    candidates = scored[:max_legs]
+
+    overrides = {}
+    allocated = [0] * len(candidates)
+    received = [0.0] * len(candidates)
+    for _ in range(steps):
+        best_index, best_out, best_updates = -1, 0.0, None
+        for index, (path, pools) in enumerate(candidates):
+            out, updates = _simulate(graph, path, pools, chunk, overrides)
+            if out > best_out:
+                best_index, best_out, best_updates = index, out, updates
+        if best_index < 0:
+            break
+        allocated[best_index] += 1
+        received[best_index] += best_out
+        overrides.update(best_updates)
+
+    # Replay the same allocation without fees to report the fee and price impact
+    fee_free_overrides = {}
+    amount_out_without_fee = 0.0
+    mid_price = 0.0
+    legs = []
+    for index, (path, pools) in enumerate(candidates):
+        if not allocated[index]:
+            continue
+        for _ in range(allocated[index]):
+            out, updates = _simulate(graph, path, pools, chunk, fee_free_overrides, fee_free=True)
+            amount_out_without_fee += out
+            fee_free_overrides.update(updates)
+        leg_mid = 1.0
+        for token, pool_id in zip(path, pools):
+            reserve_in, reserve_out = graph.pools[pool_id].reserves(token)
+            leg_mid *= reserve_out / reserve_in
+        mid_price += leg_mid * allocated[index] / steps
+        legs.append(SplitLeg(path, pools, chunk * allocated[index], received[index]))
+
+    legs.sort(key=lambda leg: leg.amount_in, reverse=True)
+    return SplitQuote(sum(received), amount_out_without_fee, mid_price, legs)
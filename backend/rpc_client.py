@@ -0,0 +1,152 @@
+"""
+Async JSON-RPC client for the PIOGOLD chain.
+
+One ``RPCClient`` wraps one ``httpx.AsyncClient`` with a bounded pool of
+keep-alive connections, so calls reuse warm connections instead of paying
+a TCP/TLS handshake each. ``batch()`` sends many calls as JSON-RPC batch
+requests (one HTTP round trip per ``batch_size`` calls, chunks in
+parallel over the pool), and ``call_many()`` uses it to aggregate
+``eth_call``s. Quantities are exchanged as hex strings on the wire and
+converted to ints here.
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+import asyncio
+import itertools
+import os
+
+import httpx
+
+RPC_URL = os.environ.get('PIOGOLD_RPC_URL', 'https://datasheed.pioscan.com')
+RPC_TIMEOUT = float(os.environ.get('PIOGOLD_RPC_TIMEOUT', '10'))
+RPC_MAX_CONNECTIONS = int(os.environ.get('PIOGOLD_RPC_MAX_CONNECTIONS', '10'))
+RPC_BATCH_SIZE = int(os.environ.get('PIOGOLD_RPC_BATCH_SIZE', '100'))
+
+
+class RPCError(Exception):
+    """An error object returned by the node"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+    @property
+    def reverted(self) -> bool:
+        """The call itself ran and reverted, as opposed to the node failing to run it"""
+        return self.code == 3 or "revert" in self.message.lower()
+
+
+def to_hex(value: int) -> str:
+    return hex(value)
+
+
+def from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+def _error(reply: dict) -> RPCError:
+    error = reply["error"]
+    return RPCError(error.get("code", 0), error.get("message", ""), error.get("data"))
+
+
+class RPCClient:
+    def __init__(self, url: str = RPC_URL, timeout: float = RPC_TIMEOUT,
+                 max_connections: int = RPC_MAX_CONNECTIONS, batch_size: int = RPC_BATCH_SIZE):
+        self.url = url
+        self.batch_size = batch_size
+        self._http = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        ))
+        self._ids = itertools.count(1)
+
+    async def close(self):
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        """Send one request and return its result, raising RPCError on an error reply"""
+        response = await self._http.post(self.url, json={
+            "jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []
+        })
+        response.raise_for_status()
+        reply = response.json()
+        if reply.get("error"):
+            raise _error(reply)
+        return reply.get("result")
+
+    async def _send_batch(self, calls: Sequence[Tuple[str, list]]) -> List[Any]:
+        ids = [next(self._ids) for _ in calls]
+        response = await self._http.post(self.url, json=[
+            {"jsonrpc": "2.0", "id": id_, "method": method, "params": params}
+            for id_, (method, params) in zip(ids, calls)
+        ])
+        response.raise_for_status()
+        replies = response.json()
+        if isinstance(replies, dict):
+            # The whole batch was rejected
+            raise _error(replies)
+        # Replies may come back in any order
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for id_ in ids:
+            reply = by_id.get(id_)
+            if reply is None:
+                results.append(RPCError(0, "No reply for request in batch"))
+            elif reply.get("error"):
+                results.append(_error(reply))
+            else:
+                results.append(reply.get("result"))
+        return results
+
+    async def batch(self, calls: Sequence[Tuple[str, list]]) -> List[Any]:
+        """Send (method, params) calls as JSON-RPC batches and return their results in order.
+        A call the node rejected has its RPCError in place of a result rather than raising.
+        """
+        chunks = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        replies = await asyncio.gather(*(self._send_batch(chunk) for chunk in chunks))
+        return [result for chunk in replies for result in chunk]
+
+    async def call_many(self, calls: Sequence[Tuple[str, str]], block: str = "latest") -> List[Any]:
+        """Aggregate eth_calls of (contract, calldata); returns the return data of each, None if it reverted.
+        A call the node failed to run (rate limit, internal error) keeps its RPCError in place.
+        """
+        results = await self.batch([("eth_call", [{"to": to, "data": data}, block]) for to, data in calls])
+        return [None if isinstance(result, RPCError) and result.reverted else result for result in results]
+
+    async def block_number(self) -> int:
+        return from_hex(await self.call("eth_blockNumber"))
+
+    async def get_block(self, number: int) -> Optional[dict]:
+        """Block header without transaction bodies"""
+        return await self.call("eth_getBlockByNumber", [to_hex(number), False])
+
+    async def get_blocks(self, numbers: Sequence[int]) -> List[Optional[dict]]:
+        """Block headers for several blocks in one batch"""
+        results = await self.batch([("eth_getBlockByNumber", [to_hex(n), False]) for n in numbers])
+        for result in results:
+            if isinstance(result, RPCError):
+                raise result
+        return results
+
+    async def get_transactions(self, hashes: Sequence[str]) -> List[Optional[dict]]:
+        """Transaction bodies for several hashes in one batch"""
+        results = await self.batch([("eth_getTransactionByHash", [h]) for h in hashes])
+        for result in results:
+            if isinstance(result, RPCError):
+                raise result
+        return results
+
+    async def get_logs(self, from_block: int, to_block: int, address: Optional[List[str]] = None,
+                       topics: Optional[list] = None) -> List[dict]:
+        log_filter = {"fromBlock": to_hex(from_block), "toBlock": to_hex(to_block)}
+        if address:
+            log_filter["address"] = address
+        if topics:
+            log_filter["topics"] = topics
+        return await self.call("eth_getLogs", [log_filter])
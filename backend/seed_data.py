@@ -1,4 +1,7 @@
 from database import db
+from token_registry import token_registry
+from pool_graph import pool_graph
+from pairs import pair_key
 import asyncio
 import logging
 
@@ -55,6 +58,7 @@ INITIAL_POOLS = [
         "id": "pool1",
         "token0_address": "0x9da12b8cf8b94f2e0eedd9841e268631af03adb1",  # WPIO
         "token1_address": "0x75c681d7d00b6cda3778535bba87e433ca369c96",  # USDT
+        "pair_key": pair_key("0x9da12b8cf8b94f2e0eedd9841e268631af03adb1", "0x75c681d7d00b6cda3778535bba87e433ca369c96"),
         "fee": 0.3,
         "tvl": 0,
         "volume_24h": 0,
@@ -88,26 +92,18 @@ async def seed_database():
         
         # Insert tokens
         await db.tokens.insert_many(INITIAL_TOKENS)
+        await token_registry.invalidate()
         logger.info(f"Inserted {len(INITIAL_TOKENS)} tokens")
         
         # Insert pools
         await db.pools.insert_many(INITIAL_POOLS)
+        await pool_graph.invalidate()
         logger.info(f"Inserted {len(INITIAL_POOLS)} pools")
         
         # Insert stats
         await db.stats.insert_one(INITIAL_STATS)
         logger.info("Inserted initial stats")
         
-        # Create indexes
-        await db.tokens.create_index("address", unique=True)
-        await db.tokens.create_index("symbol")
-        await db.pools.create_index("id", unique=True)
-        await db.pools.create_index([("token0_address", 1), ("token1_address", 1)])
-        await db.positions.create_index("wallet_address")
-        await db.positions.create_index("pool_id")
-        await db.transactions.create_index("wallet_address")
-        await db.transactions.create_index("timestamp")
-        
         logger.info("Database seeding complete!")
         
     except Exception as e:
@@ -127,9 +123,11 @@ async def reset_and_seed():
         
         # Insert new data
         await db.tokens.insert_many(INITIAL_TOKENS)
+        await token_registry.invalidate()
         logger.info(f"Inserted {len(INITIAL_TOKENS)} tokens with real addresses")
         
         await db.pools.insert_many(INITIAL_POOLS)
+        await pool_graph.invalidate()
         logger.info(f"Inserted {len(INITIAL_POOLS)} pools")
         
         await db.stats.insert_one(INITIAL_STATS)
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
@@ -11,8 +12,18 @@ import uuid
 from datetime import datetime, timezone
 
 # Import route modules
-from routes import tokens, pools, positions, swap, transactions, stats
+from routes import tokens, pools, positions, swap, transactions, stats, stream
 from seed_data import seed_database
+from indexes import ensure_indexes, verify_required_indexes
+from idempotency import dedupe_transactions
+from liquidity import merge_duplicate_positions
+from migrate_pair_keys import migrate_pair_keys
+from migrate_wallet_sketches import backfill_in_background
+import protocol_stats
+from volume_windows import volume_windows
+from token_discovery import token_discovery
+from reserve_sync import reserve_reconciler
+from price_oracle import price_oracle
 
 
 ROOT_DIR = Path(__file__).parent
@@ -75,6 +86,7 @@ app.include_router(positions.router)
 app.include_router(swap.router)
 app.include_router(transactions.router)
 app.include_router(stats.router)
+app.include_router(stream.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -82,6 +94,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -91,16 +104,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background tasks started on startup and cancelled on shutdown
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
     """Seed database on startup"""
     logger.info("Starting PioSwap DEX API...")
     try:
         await seed_database()
+        await migrate_pair_keys()
+        # Duplicates left from before tx_hash idempotency would block its unique index
+        await dedupe_transactions()
+        # Likewise duplicate positions would block the (pool_id, wallet_address) index
+        await merge_duplicate_positions()
+        await ensure_indexes()
         logger.info("Database initialization complete")
     except Exception as e:
         logger.error(f"Error during startup: {e}")
+    # Without the tx_hash index retries would be applied twice, and without the
+    # position key index concurrent adds could open duplicate positions; refuse to serve
+    await verify_required_indexes()
+    
+    # One worker folds historical swaps into the wallet sketches; the others skip it
+    background_tasks.append(asyncio.create_task(backfill_in_background()))
+    reconcile_seconds = float(os.environ.get('STATS_RECONCILE_SECONDS', '900'))
+    background_tasks.append(asyncio.create_task(protocol_stats.reconcile_periodically(reconcile_seconds)))
+    volume_flush_seconds = float(os.environ.get('VOLUME_FLUSH_SECONDS', '60'))
+    background_tasks.append(asyncio.create_task(volume_windows.flush_periodically(volume_flush_seconds)))
+    # Started in every worker; only the holder of the price_oracle lease prices
+    price_update_seconds = float(os.environ.get('PRICE_UPDATE_SECONDS', '10'))
+    background_tasks.append(asyncio.create_task(price_oracle.run_periodically(price_update_seconds)))
+    reserve_sync_seconds = float(os.environ.get('RESERVE_SYNC_SECONDS', '60'))
+    if reserve_sync_seconds > 0:
+        background_tasks.append(asyncio.create_task(reserve_reconciler.run_periodically(reserve_sync_seconds)))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await token_discovery.close()
+    await reserve_reconciler.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Swap recording in two database round trips.
+
+1. The pool is updated with one ``find_one_and_update`` whose update
+   pipeline checks the reserves, moves them server-side and refreshes tvl
+   and apr, so there is no separate read and concurrent swaps can't act on
+   stale reserves. The pool comes back as it was before the update;
+   ``apply_swap`` mirrors the pipeline to derive the updated pool and the
+   exact TVL change, as liquidity.apply_reserve_change does.
+2. Everything else is written concurrently: the transaction, the protocol
+   stats and TVL, candles, volume windows, wallet sketches and the pool
+   graph version.
+
+Swaps with a tx_hash first claim it by inserting the transaction record
+(see idempotency.py), which costs one extra round trip but turns a retried
+submission into a no-op that raises AlreadyRecorded.
+
+When the deployment supports multi-document transactions (replica set or
+sharded cluster), the pool update, transaction insert and stats ``$inc``
+commit together, so a failure can't leave the counters half-applied. The
+derived aggregates are written after the commit; if one of those writes
+fails it is repaired by the candle backfill and stats reconciliation.
+"""
+from database import client, db
+from candles import record_trade
+from pool_graph import pool_graph
+from volume_windows import volume_windows
+from unique_wallets import record_wallet
+from idempotency import claim_transaction, release_on_failure
+from liquidity import _valuation_stages, pool_apr
+from pymongo import ReturnDocument
+from typing import Optional
+import protocol_stats
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_supports_transactions: Optional[bool] = None
+
+
+async def supports_transactions() -> bool:
+    """Whether the connected deployment can run multi-document transactions (checked once)"""
+    global _supports_transactions
+    if _supports_transactions is None:
+        hello = await client.admin.command("hello")
+        _supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        logger.info(f"Multi-document transactions {'enabled' if _supports_transactions else 'unavailable'} for swaps")
+    return _supports_transactions
+
+
+def swap_pool_update(token_in: str, amount_in: float, amount_out: float, volume_usd: float,
+                     price_in: float = 1.0, price_out: float = 1.0) -> list:
+    """Update pipeline adding volume, moving reserves the way the pair contract does and
+    refreshing tvl and apr. Reserves only move if the input reserve is funded and the
+    output fits in the pool.
+    """
+    in_is_token0 = {"$eq": ["$token0_address", token_in]}
+    reserve0 = {"$ifNull": ["$token0_reserve", 0]}
+    reserve1 = {"$ifNull": ["$token1_reserve", 0]}
+    reserve_in = {"$cond": [in_is_token0, reserve0, reserve1]}
+    reserve_out = {"$cond": [in_is_token0, reserve1, reserve0]}
+    moves = {"$and": [
+        {"$gt": [reserve_in, 0]},
+        {"$gt": [amount_out, 0]},
+        {"$lt": [amount_out, reserve_out]}
+    ]}
+    return [
+        {"$set": {
+            "volume_24h": {"$add": [{"$ifNull": ["$volume_24h", 0]}, volume_usd]},
+            "token0_reserve": {"$cond": [
+                moves, {"$add": [reserve0, {"$cond": [in_is_token0, amount_in, -amount_out]}]}, reserve0
+            ]},
+            "token1_reserve": {"$cond": [
+                moves, {"$add": [reserve1, {"$cond": [in_is_token0, -amount_out, amount_in]}]}, reserve1
+            ]}
+        }},
+        *_valuation_stages(
+            {"$cond": [in_is_token0, price_in, price_out]}, {"$cond": [in_is_token0, price_out, price_in]}
+        )
+    ]
+
+
+def apply_swap(pool: dict, token_in: str, amount_in: float, amount_out: float, volume_usd: float,
+               price_in: float = 1.0, price_out: float = 1.0) -> dict:
+    """The pool document swap_pool_update() produces from `pool`"""
+    in_is_token0 = pool["token0_address"] == token_in
+    reserve0, reserve1 = pool.get("token0_reserve") or 0, pool.get("token1_reserve") or 0
+    reserve_in, reserve_out = (reserve0, reserve1) if in_is_token0 else (reserve1, reserve0)
+    if reserve_in > 0 and 0 < amount_out < reserve_out:
+        reserve0 += amount_in if in_is_token0 else -amount_out
+        reserve1 += -amount_out if in_is_token0 else amount_in
+    price0, price1 = (price_in, price_out) if in_is_token0 else (price_out, price_in)
+    tvl = reserve0 * price0 + reserve1 * price1
+    return {
+        **pool,
+        "volume_24h": (pool.get("volume_24h") or 0) + volume_usd,
+        "token0_reserve": reserve0,
+        "token1_reserve": reserve1,
+        "tvl": tvl,
+        "apr": pool_apr(pool["fee"], tvl)
+    }
+
+
+async def record_swap(tx: dict, volume_usd: float, price_in: float = 1.0, price_out: float = 1.0) -> Optional[dict]:
+    """Record a swap transaction document and everything derived from it.
+    `price_in` and `price_out` value the moved reserves. Returns the updated
+    pool, or None if the pair has no pool. Raises AlreadyRecorded, without
+    writing anything, if the tx_hash was seen before.
+    """
+    token_in, token_out = tx["token0_address"], tx["token1_address"]
+    amount_in, amount_out = tx["amount0"], tx["amount1"]
+    update = swap_pool_update(token_in, amount_in, amount_out, volume_usd, price_in, price_out)
+
+    async def update_pool(session=None):
+        return await db.pools.find_one_and_update(
+            {"pair_key": tx["pair_key"]}, update,
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+
+    ledger = []
+    if await supports_transactions():
+        async def apply(session):
+            await claim_transaction(tx, session)
+            pool = await update_pool(session)
+            await protocol_stats.record_swap(volume_usd, session)
+            return pool
+
+        async with await client.start_session() as session:
+            pool = await session.with_transaction(apply)
+    elif tx.get("tx_hash"):
+        await claim_transaction(tx)
+        async with release_on_failure(tx):
+            pool = await update_pool()
+        ledger = [protocol_stats.record_swap(volume_usd)]
+    else:
+        pool = await update_pool()
+        ledger = [db.transactions.insert_one(tx), protocol_stats.record_swap(volume_usd)]
+
+    if pool:
+        before = pool
+        pool = apply_swap(before, token_in, amount_in, amount_out, volume_usd, price_in, price_out)
+        ledger.append(protocol_stats.record_tvl_change(pool["tvl"] - (before.get("tvl") or 0)))
+    pool_id = pool["id"] if pool else None
+    await asyncio.gather(
+        *ledger,
+        record_trade(token_in, token_out, amount_in, amount_out, tx["timestamp"]),
+        volume_windows.record(pool_id, volume_usd, tx["timestamp"]),
+        record_wallet(tx["wallet_address"], pool_id, tx["timestamp"]),
+        pool_graph.apply(pool)
+    )
+    return pool
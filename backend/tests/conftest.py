@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make backend modules importable when running pytest from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """Patch a fresh in-memory database into the given modules and return it"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import cache_versions
+    db = mongomock_motor.AsyncMongoMockClient()["pioswap_test"]
+
+    def patch(*modules):
+        for module in (cache_versions, *modules):
+            monkeypatch.setattr(module, "db", db)
+        return db
+    return patch
@@ -0,0 +1,142 @@
+"""
+A local JSON-RPC node for tests: serves blocks and logs from memory over HTTP.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+
+
+def word(value: int) -> str:
+    return format(value, "064x")
+
+
+def address_topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def encode_string(text: str) -> str:
+    """ABI encoding of a `string` return value"""
+    raw = text.encode()
+    padded = raw.hex().ljust(-(-len(raw) // 32) * 64, "0")
+    return "0x" + word(32) + word(len(raw)) + padded
+
+
+def encode_words(*values: int) -> str:
+    return "0x" + "".join(word(v) for v in values)
+
+
+def make_log(topic0: str, address: str, block: int, tx_hash: str, log_index: int,
+             indexed=(), words=()) -> dict:
+    """An eth_getLogs entry with indexed address arguments and ABI-encoded data words"""
+    return {
+        "address": address,
+        "topics": [topic0] + [address_topic(a) for a in indexed],
+        "data": "0x" + "".join(word(w) for w in words),
+        "blockNumber": hex(block),
+        "transactionHash": tx_hash,
+        "logIndex": hex(log_index),
+        "removed": False
+    }
+
+
+class MockRPCServer:
+    """Answers eth_blockNumber, eth_getBlockByNumber and eth_getLogs from `logs`,
+    eth_call from `contracts` ({address: {selector: return data}}) and
+    eth_getTransactionByHash from `senders` ({tx hash: from address})
+    """
+
+    def __init__(self, head: int = 0, logs=None, block_time: int = 1_700_000_000, contracts=None, senders=None):
+        self.head = head
+        self.logs = list(logs or [])
+        self.block_time = block_time
+        self.contracts = {address.lower(): calls for address, calls in (contracts or {}).items()}
+        self.senders = dict(senders or {})
+        self.requests = []  # (method, params) of every call served
+        self.posts = 0  # HTTP round trips, one per single or batch request
+        self.max_logs = None  # reply with an error when a getLogs result would be larger
+        self.call_error = None  # (code, message) to fail every eth_call with, e.g. a rate limit
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.posts += 1
+                reply = [server.handle(r) for r in body] if isinstance(body, list) else server.handle(body)
+                payload = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def handle(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        self.requests.append((method, params))
+        try:
+            if not method.startswith("eth_") or not hasattr(self, method):
+                raise RPCFailure(-32601, f"the method {method} does not exist")
+            result = getattr(self, method)(*params)
+        except RPCFailure as e:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": e.code, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def eth_blockNumber(self):
+        return hex(self.head)
+
+    def eth_getBlockByNumber(self, number, full):
+        number = int(number, 16)
+        return {"number": hex(number), "timestamp": hex(self.block_time + number)}
+
+    def eth_call(self, call, block):
+        if self.call_error is not None:
+            raise RPCFailure(*self.call_error)
+        contract = self.contracts.get(call["to"].lower())
+        if contract is None:
+            # Calling an account without code succeeds with no return data
+            return "0x"
+        if call["data"][:10] not in contract:
+            raise RPCFailure(3, "execution reverted")
+        return contract[call["data"][:10]]
+
+    def eth_getTransactionByHash(self, tx_hash):
+        if tx_hash not in self.senders:
+            return None
+        return {"hash": tx_hash, "from": self.senders[tx_hash]}
+
+    def eth_getLogs(self, log_filter):
+        from_block, to_block = int(log_filter["fromBlock"], 16), int(log_filter["toBlock"], 16)
+        topic0s = (log_filter.get("topics") or [None])[0]
+        if isinstance(topic0s, str):
+            topic0s = [topic0s]
+        addresses = log_filter.get("address")
+        logs = [
+            log for log in self.logs
+            if from_block <= int(log["blockNumber"], 16) <= to_block
+            and (topic0s is None or log["topics"][0] in topic0s)
+            and (addresses is None or log["address"] in addresses)
+        ]
+        if self.max_logs is not None and len(logs) > self.max_logs:
+            raise RPCFailure(-32005, "query returned more than the allowed number of results")
+        return logs
+
+
+class RPCFailure(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
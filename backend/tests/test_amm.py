@@ -0,0 +1,69 @@
+"""
+Unit tests for the constant-product quote engine (no server required)
+"""
+import pytest
+
+from amm import (
+    get_amount_in,
+    get_amount_out,
+    get_amounts_out,
+    get_amounts_out_batch,
+    price_impact,
+    quote_exact_in,
+)
+
+
+class TestAmountMath:
+    """Test getAmountOut / getAmountIn against Uniswap V2 semantics"""
+    
+    def test_amount_out_matches_formula(self):
+        # 0.3% fee: 997 * 10 * 2000 / (1000 * 1000 + 997 * 10)
+        amount_out = get_amount_out(10, 1000, 2000, fee=0.3)
+        assert amount_out == pytest.approx(997 * 10 * 2000 / (1000 * 1000 + 997 * 10))
+    
+    def test_amount_out_without_fee_preserves_invariant(self):
+        amount_out = get_amount_out(50, 1000, 2000, fee=0)
+        assert (1000 + 50) * (2000 - amount_out) == pytest.approx(1000 * 2000)
+    
+    def test_amount_in_inverts_amount_out(self):
+        amount_out = get_amount_out(25, 5000, 800, fee=0.3)
+        assert get_amount_in(amount_out, 5000, 800, fee=0.3) == pytest.approx(25)
+    
+    def test_rejects_empty_reserves_and_amounts(self):
+        with pytest.raises(ValueError):
+            get_amount_out(1, 0, 100)
+        with pytest.raises(ValueError):
+            get_amount_out(0, 100, 100)
+        with pytest.raises(ValueError):
+            get_amount_in(100, 100, 100)
+
+
+class TestQuotes:
+    """Test price impact, multi-hop and batch helpers"""
+    
+    def test_price_impact_grows_with_size(self):
+        small = price_impact(1, 10000)
+        large = price_impact(1000, 10000)
+        assert 0 < small < large < 100
+    
+    def test_quote_fee_in_output_token(self):
+        quote = quote_exact_in(100, 10000, 10000, fee=0.3)
+        no_fee = get_amount_out(100, 10000, 10000, fee=0)
+        assert quote.amount_out + quote.fee == pytest.approx(no_fee)
+        assert quote.mid_price == pytest.approx(1.0)
+        assert quote.execution_price < quote.mid_price
+    
+    def test_multi_hop_chains_outputs(self):
+        amounts = get_amounts_out(10, [(1000, 2000, 0.3), (3000, 1500, 0.3)])
+        assert amounts[1] == pytest.approx(get_amount_out(10, 1000, 2000))
+        assert amounts[2] == pytest.approx(get_amount_out(amounts[1], 3000, 1500))
+    
+    def test_batch_matches_scalar(self):
+        amounts = [1, 10, 0, 5]
+        reserves_in = [100, 1000, 100, 0]
+        reserves_out = [200, 500, 100, 100]
+        fees = [0.3, 1.0, 0.3, 0.3]
+        result = get_amounts_out_batch(amounts, reserves_in, reserves_out, fees)
+        assert result[0] == pytest.approx(get_amount_out(1, 100, 200, 0.3))
+        assert result[1] == pytest.approx(get_amount_out(10, 1000, 500, 1.0))
+        assert result[2:] == [0.0, 0.0]
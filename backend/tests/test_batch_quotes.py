@@ -0,0 +1,83 @@
+"""
+Unit tests for vectorized batch quoting (no server required)
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch_quotes import quote_many  # noqa: E402
+from routing import PoolGraph, quote_route  # noqa: E402
+
+X = "0x000000000000000000000000000000000000000a"
+WPIO = "0x9da12b8cf8b94f2e0eedd9841e268631af03adb1"
+USDT = "0x75c681d7d00b6cda3778535bba87e433ca369c96"
+Y = "0x000000000000000000000000000000000000000b"
+PRICES = {X: 1.2, WPIO: 2.45, USDT: 1.0, Y: 3.0}
+
+
+@pytest.fixture
+def graph():
+    graph = PoolGraph()
+    for pool_id, token0, token1, reserve0, reserve1 in [
+        ("x-wpio", X, WPIO, 10_000, 5_000),
+        ("wpio-usdt", WPIO, USDT, 100_000, 245_000),
+    ]:
+        graph.upsert_pool({
+            "id": pool_id,
+            "token0_address": token0,
+            "token1_address": token1,
+            "token0_reserve": reserve0,
+            "token1_reserve": reserve1,
+            "fee": 0.3,
+        })
+    return graph
+
+
+def test_matches_scalar_router(graph):
+    requests = [(WPIO, USDT, 10.0), (X, USDT, 50.0), (USDT, WPIO, 1000.0)]
+    quotes = quote_many(graph, requests, PRICES)
+    for (token_in, token_out, amount_in), quote in zip(requests, quotes):
+        expected = quote_route(graph, graph.best_route(token_in, token_out, amount_in))
+        assert quote.error is None
+        assert quote.amount_out == pytest.approx(expected.amount_out)
+        assert quote.fee == pytest.approx(expected.fee)
+        assert quote.price_impact == pytest.approx(expected.price_impact)
+        assert quote.exchange_rate == pytest.approx(expected.mid_price)
+
+
+def test_errors_and_price_fallback(graph):
+    quotes = quote_many(graph, [
+        ("0xunknown", USDT, 1.0),
+        (WPIO, USDT, 0.0),
+        (X, Y, 10.0),
+    ], PRICES)
+    assert quotes[0].error == "Token not found"
+    assert quotes[1].error == "Insufficient input amount"
+    assert quotes[2].error is None
+    assert quotes[2].pools == []
+    assert quotes[2].amount_out == pytest.approx(10 * 1.2 / 3.0 * 0.997)
+
+
+def test_each_amount_bucket_gets_its_own_route(graph):
+    # The direct pool wins small trades, a much deeper route through X wins large ones
+    graph.upsert_pool({"id": "x-usdt", "token0_address": X, "token1_address": USDT,
+                       "token0_reserve": 10_000_000, "token1_reserve": 12_000_000, "fee": 0.3})
+    graph.upsert_pool({"id": "x-wpio", "token0_address": X, "token1_address": WPIO,
+                       "token0_reserve": 10_000_000, "token1_reserve": 4_900_000, "fee": 0.3})
+    small, large = 1.0, 50_000.0
+    assert graph.best_route(WPIO, USDT, small).pools != graph.best_route(WPIO, USDT, large).pools
+
+    quotes = quote_many(graph, [(WPIO, USDT, small), (WPIO, USDT, large)], PRICES)
+    for amount_in, quote in zip((small, large), quotes):
+        expected = graph.best_route(WPIO, USDT, amount_in)
+        assert quote.pools == expected.pools
+        assert quote.amount_out == pytest.approx(expected.amount_out)
+
+
+def test_indicative_quote_uses_the_direct_pool_fee(graph):
+    graph.upsert_pool({"id": "x-y", "token0_address": X, "token1_address": Y,
+                       "token0_reserve": 0, "token1_reserve": 0, "fee": 1.0})
+    [quote] = quote_many(graph, [(X, Y, 10.0)], PRICES)
+    assert quote.amount_out == pytest.approx(10 * 1.2 / 3.0 * 0.99)
+    assert quote.fee == pytest.approx(10 * 1.2 / 3.0 * 0.01)
+    assert (quote.pools, quote.path) == (["x-y"], [X, Y])
@@ -0,0 +1,61 @@
+"""
+Unit tests for candle buckets, out-of-order trade folding and pair orientation
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import candles as candles_module
+from backfill_candles import candle_pipeline
+from candles import bucket_start, get_candles, record_trade
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"  # Base of the canonical pair (lower address)
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+HOUR = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def test_bucket_start_aligns_to_interval_and_accepts_naive_utc():
+    timestamp = datetime(2026, 3, 1, 12, 34, 56, 789, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, 60) == datetime(2026, 3, 1, 12, 34, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, 300) == datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, 86400) == datetime(2026, 3, 1, tzinfo=timezone.utc)
+    assert bucket_start(timestamp.replace(tzinfo=None), 3600) == HOUR
+
+
+def test_out_of_order_trades_keep_open_and_close_by_time(mock_db):
+    mock_db(candles_module)
+
+    async def run():
+        # Recorded as 12:30, 12:10, 12:50 at A-prices 2, 1, 3 (B per A)
+        await record_trade(TOKEN_A, TOKEN_B, 1.0, 2.0, HOUR + timedelta(minutes=30))
+        await record_trade(TOKEN_A, TOKEN_B, 2.0, 2.0, HOUR + timedelta(minutes=10))
+        await record_trade(TOKEN_B, TOKEN_A, 3.0, 1.0, HOUR + timedelta(minutes=50))
+        return await get_candles(TOKEN_A, TOKEN_B, "1h", HOUR)
+
+    [candle] = asyncio.run(run())
+    assert (candle["open"], candle["high"], candle["low"], candle["close"]) == (1.0, 3.0, 1.0, 3.0)
+    assert candle["volume"] == 4.0 and candle["trades"] == 3
+    assert candle["time"] == HOUR.isoformat()
+
+
+def test_inverted_pair_reads_reciprocal_prices_and_quote_volume(mock_db):
+    mock_db(candles_module)
+
+    async def run():
+        await record_trade(TOKEN_A, TOKEN_B, 1.0, 2.0, HOUR + timedelta(minutes=5))
+        await record_trade(TOKEN_A, TOKEN_B, 1.0, 4.0, HOUR + timedelta(minutes=15))
+        return await get_candles(TOKEN_B, TOKEN_A, "1h", HOUR)
+
+    [candle] = asyncio.run(run())
+    # A-prices 2 then 4 read as B-prices 0.5 then 0.25: high and low swap sides
+    assert (candle["open"], candle["high"], candle["low"], candle["close"]) == (0.5, 0.5, 0.25, 0.25)
+    assert candle["volume"] == 6.0
+
+
+def test_backfill_resume_filters_trades_before_grouping():
+    after = {"bucket": HOUR, "pair_key": f"{TOKEN_A}_{TOKEN_B}"}
+    pipeline = candle_pipeline(3600, after)
+    group_at = next(i for i, stage in enumerate(pipeline) if "$group" in stage)
+    assert pipeline[0]["$match"]["timestamp"] == {"$gte": HOUR}
+    assert all("$match" not in stage or i == 0 or i > group_at for i, stage in enumerate(pipeline))
+    assert pipeline[-1] == {"$sort": {"_id.bucket": 1, "_id.pair_key": 1}}
+    assert "timestamp" not in candle_pipeline(3600)[0]["$match"]
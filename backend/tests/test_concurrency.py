@@ -0,0 +1,144 @@
+"""
+Concurrency tests for PioSwap DEX write endpoints
+Fires parallel requests at a running server and checks that the recorded
+totals match the sum of the individual writes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+WPIO_ADDRESS = "0x9da12b8cf8b94f2e0eedd9841e268631af03adb1"
+USDT_ADDRESS = "0x75c681d7d00b6cda3778535bba87e433ca369c96"
+TEST_WALLET = "0x1234567890123456789012345678901234567890"
+
+PARALLEL_SWAPS = 50
+PARALLEL_LIQUIDITY_OPS = 300
+AMOUNT_IN = 0.01
+AMOUNT_OUT = 0.0001
+
+pytestmark = pytest.mark.skipif(not BASE_URL, reason="REACT_APP_BACKEND_URL is not set")
+
+
+def find_pool(token0, token1):
+    pools = requests.get(f"{BASE_URL}/api/pools", params={"token": token0}).json()
+    for pool in pools:
+        if {pool["token0"]["address"], pool["token1"]["address"]} == {token0, token1}:
+            return pool
+    return None
+
+
+def execute_swap(i, tx_hash=None):
+    return requests.post(f"{BASE_URL}/api/swap/execute", json={
+        "wallet_address": TEST_WALLET,
+        "token_in": WPIO_ADDRESS,
+        "token_out": USDT_ADDRESS,
+        "amount_in": AMOUNT_IN,
+        "amount_out": AMOUNT_OUT,
+        "tx_hash": tx_hash
+    })
+
+
+class TestConcurrentSwaps:
+    """Parallel swaps must not lose volume, reserve or stats updates"""
+
+    def test_parallel_swaps_keep_totals_consistent(self):
+        pool_before = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+        if not pool_before:
+            pytest.skip("No WPIO/USDT pool to swap against")
+        price = requests.get(f"{BASE_URL}/api/tokens/{WPIO_ADDRESS}").json().get("price", 1)
+        stats_before = requests.get(f"{BASE_URL}/api/stats").json()
+
+        with ThreadPoolExecutor(max_workers=PARALLEL_SWAPS) as pool:
+            responses = list(pool.map(execute_swap, range(PARALLEL_SWAPS)))
+        assert all(r.status_code == 200 for r in responses)
+
+        pool_after = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+        stats_after = requests.get(f"{BASE_URL}/api/stats").json()
+        volume = PARALLEL_SWAPS * AMOUNT_IN * price
+
+        assert pool_after["volume_24h"] - pool_before["volume_24h"] == pytest.approx(volume)
+        assert stats_after["total_volume"] - stats_before["total_volume"] == pytest.approx(volume)
+        assert stats_after["transactions_24h"] - stats_before["transactions_24h"] == PARALLEL_SWAPS
+
+        # Reserves move only for funded pools; when they do, every swap must land
+        wpio_is_token0 = pool_before["token0"]["address"] == WPIO_ADDRESS
+        reserve_in = "token0_reserve" if wpio_is_token0 else "token1_reserve"
+        reserve_out = "token1_reserve" if wpio_is_token0 else "token0_reserve"
+        if pool_before[reserve_in] > 0 and pool_before[reserve_out] > PARALLEL_SWAPS * AMOUNT_OUT:
+            assert pool_after[reserve_in] - pool_before[reserve_in] == pytest.approx(PARALLEL_SWAPS * AMOUNT_IN)
+            assert pool_before[reserve_out] - pool_after[reserve_out] == pytest.approx(PARALLEL_SWAPS * AMOUNT_OUT)
+
+    def test_parallel_retries_with_same_tx_hash_record_once(self):
+        pool_before = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+        if not pool_before:
+            pytest.skip("No WPIO/USDT pool to swap against")
+        stats_before = requests.get(f"{BASE_URL}/api/stats").json()
+        tx_hash = f"0x{uuid.uuid4().hex}"
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(lambda i: execute_swap(i, tx_hash), range(10)))
+        assert all(r.status_code == 200 for r in responses)
+        assert len({r.json()["id"] for r in responses}) == 1
+
+        stats_after = requests.get(f"{BASE_URL}/api/stats").json()
+        assert stats_after["transactions_24h"] - stats_before["transactions_24h"] == 1
+
+
+
+class TestConcurrentLiquidity:
+    """Parallel liquidity changes must all land in the pool reserves"""
+
+    def test_parallel_adds_and_removes_keep_reserves_exact(self):
+        pool = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+        if not pool:
+            pytest.skip("No WPIO/USDT pool to add liquidity to")
+        if pool.get("creator_address") and pool["creator_address"].lower() != TEST_WALLET:
+            pytest.skip("Pool liquidity is restricted to its creator")
+
+        # A fresh position for the removals to draw from
+        wallet = f"0x{uuid.uuid4().hex:0>40}"
+        seeded = requests.post(f"{BASE_URL}/api/positions/add", json={
+            "pool_id": pool["id"], "wallet_address": wallet,
+            "token0_amount": 100.0, "token1_amount": 100.0, "max_price": 1e18
+        })
+        assert seeded.status_code == 200
+        position_id = seeded.json()["id"]
+        before = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+
+        def operation(i):
+            if i % 3 == 0:
+                return requests.post(f"{BASE_URL}/api/pools/add-liquidity", json={
+                    "pool_id": pool["id"], "wallet_address": TEST_WALLET, "amount0": 1.0, "amount1": 2.0
+                })
+            if i % 3 == 1:
+                return requests.post(f"{BASE_URL}/api/positions/add", json={
+                    "pool_id": pool["id"], "wallet_address": wallet,
+                    "token0_amount": 0.5, "token1_amount": 0.25, "max_price": 1e18
+                })
+            return requests.post(f"{BASE_URL}/api/positions/remove", json={
+                "position_id": position_id, "wallet_address": wallet, "percent": 1.0
+            })
+
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            responses = list(executor.map(operation, range(PARALLEL_LIQUIDITY_OPS)))
+        assert all(r.status_code == 200 for r in responses)
+
+        after = find_pool(WPIO_ADDRESS, USDT_ADDRESS)
+        position = next(p for p in requests.get(f"{BASE_URL}/api/positions/{wallet}").json() if p["id"] == position_id)
+        pool_adds = len(range(0, PARALLEL_LIQUIDITY_OPS, 3))
+
+        # Whatever the position gained or lost went through the reserves too
+        assert after["token0_reserve"] - before["token0_reserve"] == pytest.approx(
+            pool_adds * 1.0 + position["token0_amount"] - 100.0
+        )
+        assert after["token1_reserve"] - before["token1_reserve"] == pytest.approx(
+            pool_adds * 2.0 + position["token1_amount"] - 100.0
+        )
+        assert after["tvl"] == pytest.approx(
+            after["token0_reserve"] * after["token0"]["price"] + after["token1_reserve"] * after["token1"]["price"]
+        )
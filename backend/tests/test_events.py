@@ -0,0 +1,81 @@
+"""
+Unit tests for the in-process event broker (no server required)
+"""
+import asyncio
+
+from events import EventBroker
+
+
+def test_publish_reaches_every_subscriber_of_topic():
+    async def run():
+        broker = EventBroker()
+        a = broker.subscribe("x_y")
+        b = broker.subscribe("x_y")
+        other = broker.subscribe("x_z")
+        broker.publish("x_y", "trade", {"amount_in": 1})
+        assert a.get_nowait() == {"type": "trade", "data": {"amount_in": 1}}
+        assert b.get_nowait()["type"] == "trade"
+        assert other.empty()
+    asyncio.run(run())
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def run():
+        broker = EventBroker(queue_size=2)
+        queue = broker.subscribe("x_y")
+        for i in range(5):
+            broker.publish("x_y", "candle", {"i": i})
+        assert [queue.get_nowait()["data"]["i"] for _ in range(2)] == [3, 4]
+    asyncio.run(run())
+
+
+def test_unsubscribe_removes_empty_topics():
+    broker = EventBroker()
+    queue = broker.subscribe("x_y")
+    assert broker.subscriber_count("x_y") == 1
+    broker.unsubscribe("x_y", queue)
+    assert broker.subscriber_count("x_y") == 0
+    broker.publish("x_y", "trade", {})
+
+
+
+class FakeWebSocket:
+    """Just enough of a WebSocket: the client sends one message, then leaves"""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+def test_websocket_disconnect_on_idle_pair_unsubscribes():
+    from pairs import pair_key
+    from routes import stream
+
+    token0 = "0x1000000000000000000000000000000000000001"
+    token1 = "0x2000000000000000000000000000000000000002"
+    topic = pair_key(token0, token1)
+
+    async def run():
+        websocket = FakeWebSocket()
+        handler = asyncio.ensure_future(stream.stream_pair_ws(websocket, token0, token1))
+        await asyncio.sleep(0)
+        stream.broker.publish(topic, "trade", {"amount_in": 1})
+        websocket.incoming.put_nowait({"type": "websocket.receive", "text": "ping"})
+        await asyncio.sleep(0.01)
+        assert stream.broker.subscriber_count(topic) == 1
+        # No further events arrive on the pair; the disconnect alone must end the handler
+        websocket.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(handler, timeout=1)
+        return websocket.sent
+
+    assert asyncio.run(run()) == ['{"type": "trade", "data": {"amount_in": 1}}']
+    assert stream.broker.subscriber_count(topic) == 0
@@ -0,0 +1,46 @@
+"""
+Unit tests for the HyperLogLog sketch (no server required)
+"""
+import pytest
+
+from hyperloglog import HyperLogLog, register_update
+
+
+def wallets(start, stop):
+    return [f"0x{i:040x}" for i in range(start, stop)]
+
+
+def test_small_counts_are_exact_enough():
+    sketch = HyperLogLog()
+    sketch.update(wallets(0, 100))
+    sketch.update(wallets(0, 100))  # Duplicates do not count
+    assert sketch.count() == pytest.approx(100, abs=2)
+
+
+def test_large_count_within_error():
+    sketch = HyperLogLog()
+    sketch.update(wallets(0, 50_000))
+    assert sketch.count() == pytest.approx(50_000, rel=0.05)
+
+
+def test_merge_is_union():
+    a = HyperLogLog()
+    a.update(wallets(0, 6_000))
+    b = HyperLogLog()
+    b.update(wallets(4_000, 10_000))
+    assert a.merge(b).count() == pytest.approx(10_000, rel=0.05)
+
+
+def test_sparse_round_trip_matches_register_updates():
+    sparse = {}
+    for wallet in wallets(0, 1_000):
+        index, rank = register_update(wallet)
+        sparse[str(index)] = max(sparse.get(str(index), 0), rank)
+    direct = HyperLogLog()
+    direct.update(wallets(0, 1_000))
+    assert HyperLogLog.from_sparse(sparse).registers == direct.registers
+
+
+def test_merge_rejects_mismatched_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
@@ -0,0 +1,72 @@
+"""
+Unit tests for releasing failed claims and deduplicating records before the tx_hash index
+"""
+import asyncio
+
+import pytest
+
+import idempotency
+import indexes
+from idempotency import AlreadyRecorded, claim_transaction, dedupe_transactions, release_on_failure
+from indexes import verify_required_indexes
+
+TX_HASH = "0x" + "ab" * 32
+
+
+def record(record_id, tx_hash=TX_HASH, **fields):
+    return {"id": record_id, "type": "add", "tx_hash": tx_hash, "timestamp": record_id, **fields}
+
+
+def test_failed_apply_releases_the_claim_for_a_retry(mock_db):
+    db = mock_db(idempotency)
+
+    async def run():
+        tx = record(1)
+        await claim_transaction(tx)
+        with pytest.raises(TimeoutError):
+            async with release_on_failure(tx):
+                raise TimeoutError("change_reserves timed out")
+        assert await db.transactions.count_documents({}) == 0
+
+        # The retry claims again and, succeeding, keeps its record
+        await claim_transaction(record(1))
+        async with release_on_failure(tx):
+            pass
+        return await db.transactions.count_documents({})
+
+    assert asyncio.run(run()) == 1
+
+
+def test_client_report_of_an_indexed_tx_is_already_recorded(mock_db):
+    db = mock_db(idempotency)
+
+    async def run():
+        # The indexer stored the transaction's events with their log indexes
+        await db.transactions.insert_many([record(1, log_index=0), record(2, log_index=1)])
+        with pytest.raises(AlreadyRecorded) as raised:
+            await claim_transaction(record(3, log_index=None))
+        return raised.value.transaction["id"], await db.transactions.count_documents({})
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_dedupe_keeps_the_first_record_per_event(mock_db):
+    db = mock_db(idempotency)
+
+    async def run():
+        await db.transactions.insert_many([
+            record(3), record(1), record(2, log_index=None),  # A missing and a null log_index collide
+            record(4, log_index=0), record(5, log_index=0), record(6, log_index=1),
+            record(7, tx_hash=None), record(8, tx_hash=None),  # Not deduplicated
+        ])
+        deleted = await dedupe_transactions()
+        remaining = await db.transactions.find({}, {"_id": 0, "id": 1}).sort("id", 1).to_list(None)
+        return deleted, [doc["id"] for doc in remaining]
+
+    assert asyncio.run(run()) == (3, [1, 4, 6, 7, 8])
+
+
+def test_startup_refuses_to_run_without_the_tx_hash_index(mock_db):
+    mock_db(indexes)
+    with pytest.raises(RuntimeError, match="transactions"):
+        asyncio.run(verify_required_indexes())
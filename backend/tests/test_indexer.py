@@ -0,0 +1,118 @@
+"""
+Unit tests for pair event decoding and log fetching against a mock RPC node
+"""
+import asyncio
+from datetime import datetime, timezone
+
+from chain_events import BURN, MINT, PAIR_CREATED, SWAP, SYNC, decode_log
+from indexer import PairIndexer, event_transaction, latest_reserves
+from mock_rpc import MockRPCServer, make_log
+from rpc_client import RPCClient
+from unique_wallets import UniqueWalletCounts
+import candles
+import idempotency
+import indexer
+import protocol_stats
+import unique_wallets
+import volume_windows
+
+FACTORY = "0x3ee7ad0fd1c17a4d62a1a214d88dcf2c04ae43e5"
+PAIR = "0x00000000000000000000000000000000000000aa"
+TOKEN_A = "0x1000000000000000000000000000000000000001"  # pair token0 (lower address)
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+TRADER = "0x3000000000000000000000000000000000000003"
+ROUTER = "0x4000000000000000000000000000000000000004"
+PROVIDER = "0x5000000000000000000000000000000000000005"
+NEXT_PAIR = "0x00000000000000000000000000000000000000bb"
+E18 = 10 ** 18
+
+# A pool stored with its tokens in the opposite order to the pair contract
+POOL = {"id": "pool-1", "token0_address": TOKEN_B, "token1_address": TOKEN_A, "pair_address": PAIR}
+DECIMALS = {TOKEN_A: 18, TOKEN_B: 6}
+
+
+def swap_log(block, log_index, amount0_in=0, amount1_in=0, amount0_out=0, amount1_out=0):
+    return make_log(SWAP, PAIR, block, f"0x{block:064x}", log_index, indexed=[ROUTER, TRADER],
+                    words=[amount0_in, amount1_in, amount0_out, amount1_out])
+
+
+def sync_log(block, log_index, reserve0, reserve1):
+    return make_log(SYNC, PAIR, block, f"0x{block:064x}", log_index, words=[reserve0, reserve1])
+
+
+def test_decode_swap_and_pair_created():
+    swap = decode_log(swap_log(7, 3, amount0_in=5, amount1_out=9))
+    assert swap["event"] == "Swap" and swap["address"] == PAIR
+    assert (swap["block_number"], swap["log_index"]) == (7, 3)
+    assert (swap["sender"], swap["to"]) == (ROUTER, TRADER)
+    assert (swap["amount0_in"], swap["amount1_in"], swap["amount0_out"], swap["amount1_out"]) == (5, 0, 0, 9)
+
+    created = decode_log(make_log(PAIR_CREATED, FACTORY, 1, "0x01", 0,
+                                  indexed=[TOKEN_A, TOKEN_B], words=[int(PAIR, 16), 1]))
+    assert (created["token0"], created["token1"], created["pair"]) == (TOKEN_A, TOKEN_B, PAIR)
+
+
+def test_decode_skips_unknown_removed_and_malformed_logs():
+    assert decode_log(make_log("0x" + "ab" * 32, PAIR, 1, "0x01", 0)) is None
+    assert decode_log({**sync_log(1, 0, 1, 2), "removed": True}) is None
+    # A known topic0 with too little data is some other contract's event
+    assert decode_log(make_log(BURN, PAIR, 1, "0x01", 0, indexed=[ROUTER, TRADER], words=[1])) is None
+
+
+def test_swap_amounts_follow_pair_token_order():
+    event = decode_log(swap_log(1, 0, amount1_in=2 * 10 ** 6, amount0_out=3 * E18))
+    tx = event_transaction(event, POOL, DECIMALS, datetime(2026, 1, 1, tzinfo=timezone.utc))
+    assert tx["type"] == "swap" and tx["wallet_address"] == TRADER
+    assert (tx["token0_address"], tx["amount0"]) == (TOKEN_B, 2.0)
+    assert (tx["token1_address"], tx["amount1"]) == (TOKEN_A, 3.0)
+    assert (tx["tx_hash"], tx["log_index"]) == (event["tx_hash"], 0)
+
+
+def test_last_sync_sets_reserves_in_pool_token_order():
+    events = [decode_log(sync_log(1, 0, 1 * E18, 5 * 10 ** 6)), decode_log(sync_log(2, 1, 4 * E18, 8 * 10 ** 6))]
+    assert latest_reserves(events, {PAIR: POOL}, DECIMALS) == {"pool-1": (8.0, 4.0)}
+
+
+def test_fetch_events_filters_by_topic_and_orders_by_position():
+    logs = [
+        sync_log(12, 1, 1, 2),
+        swap_log(12, 0, amount0_in=1, amount1_out=1),
+        sync_log(5, 4, 3, 4),
+        make_log("0x" + "cd" * 32, PAIR, 6, "0x06", 0),
+        sync_log(30, 0, 5, 6)
+    ]
+
+    async def run(url):
+        async with RPCClient(url) as rpc:
+            return await PairIndexer(rpc, factory=FACTORY).fetch_events(1, 20)
+
+    with MockRPCServer(head=40, logs=logs) as node:
+        events = asyncio.run(run(node.url))
+    assert [(e["block_number"], e["log_index"], e["event"]) for e in events] == [
+        (5, 4, "Sync"), (12, 0, "Swap"), (12, 1, "Sync")
+    ]
+
+
+def test_mints_are_attributed_to_the_tx_sender_and_hops_are_not_wallets(mock_db):
+    mock_db(indexer, idempotency, unique_wallets, protocol_stats, candles, volume_windows)
+    next_pool = {"id": "pool-2", "token0_address": TOKEN_A, "token1_address": TOKEN_B, "pair_address": NEXT_PAIR}
+    logs = [
+        make_log(MINT, PAIR, 3, "0x03", 0, indexed=[ROUTER], words=[E18, 10 ** 6]),
+        # Two hops in one transaction: the first pays the next pair, the second the trader
+        make_log(SWAP, PAIR, 4, "0x04", 0, indexed=[ROUTER, NEXT_PAIR], words=[E18, 0, 0, 10 ** 6]),
+        make_log(SWAP, NEXT_PAIR, 4, "0x04", 1, indexed=[ROUTER, TRADER], words=[0, 10 ** 6, E18, 0])
+    ]
+
+    async def run(url):
+        async with RPCClient(url) as rpc:
+            pair_indexer = PairIndexer(rpc, factory=FACTORY)
+            pair_indexer.pools = {PAIR: POOL, NEXT_PAIR: next_pool}
+            events = await pair_indexer.fetch_events(1, 10)
+            await pair_indexer.write_transactions(events, DECIMALS, {})
+        txs = await indexer.db.transactions.find({}, {"_id": 0}).sort("log_index", 1).to_list(None)
+        return txs, await UniqueWalletCounts().compute()
+
+    with MockRPCServer(head=10, logs=logs, senders={"0x03": PROVIDER.upper().replace("0X", "0x")}) as node:
+        txs, counts = asyncio.run(run(node.url))
+    assert [(tx["type"], tx["wallet_address"]) for tx in txs if tx["type"] == "add"] == [("add", PROVIDER)]
+    assert counts["total_swappers"] == 1
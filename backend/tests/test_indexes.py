@@ -0,0 +1,82 @@
+"""
+Unit tests for reconciling indexes with the declared plan
+"""
+import asyncio
+import logging
+
+import pytest
+
+import indexes
+import liquidity
+from indexes import INDEX_PLAN, ensure_indexes, verify_required_indexes
+
+POOL = "pool-1"
+WALLET = "0x" + "77" * 20
+
+
+@pytest.fixture
+def positions_required(monkeypatch):
+    # mongomock drops partialFilterExpression, so the partial tx_hash index never matches the plan
+    monkeypatch.setattr(indexes, "REQUIRED_INDEXES", {"positions": indexes.REQUIRED_INDEXES["positions"]})
+
+
+def test_ensure_indexes_creates_the_plan_once(mock_db, positions_required):
+    mock_db(indexes)
+
+    async def run():
+        return await ensure_indexes(), await ensure_indexes()
+
+    first, second = asyncio.run(run())
+    assert len(first) == sum(len(models) for models in INDEX_PLAN.values())
+    assert "positions.pool_id_1_wallet_address_1" in first
+    assert second == []
+    asyncio.run(verify_required_indexes())
+
+
+def test_index_differing_from_the_plan_is_reported_not_replaced(mock_db, positions_required, caplog):
+    db = mock_db(indexes)
+
+    async def run():
+        # Built before the key was made unique
+        await db.positions.create_index([("pool_id", 1), ("wallet_address", 1)])
+        created = await ensure_indexes()
+        with pytest.raises(RuntimeError, match="positions.pool_id_1_wallet_address_1"):
+            await verify_required_indexes()
+        return created
+
+    with caplog.at_level(logging.WARNING, logger="indexes"):
+        created = asyncio.run(run())
+    assert "positions.pool_id_1_wallet_address_1" not in created
+    assert any("differs from the plan on 'unique'" in record.message for record in caplog.records)
+
+
+def test_startup_is_refused_without_a_required_index(mock_db):
+    mock_db(indexes)
+    with pytest.raises(RuntimeError, match="transactions.tx_hash_1_log_index_1"):
+        asyncio.run(verify_required_indexes())
+
+
+def test_duplicate_positions_are_merged_before_the_unique_index_is_built(mock_db, positions_required):
+    db = mock_db(indexes, liquidity)
+
+    async def run():
+        await db.positions.insert_many([
+            {"id": "old", "pool_id": POOL, "wallet_address": WALLET, "token0_amount": 1.0, "token1_amount": 4.0,
+             "unclaimed_fees": 0.5, "created_at": 1},
+            {"id": "new", "pool_id": POOL, "wallet_address": WALLET, "token0_amount": 3.0, "token1_amount": 5.0,
+             "unclaimed_fees": 0.25, "created_at": 2},
+            {"id": "other", "pool_id": "pool-2", "wallet_address": WALLET, "token0_amount": 1.0, "token1_amount": 1.0,
+             "unclaimed_fees": 0.0, "created_at": 1},
+        ])
+        merged = await liquidity.merge_duplicate_positions()
+        await ensure_indexes()
+        await verify_required_indexes()
+        positions = await db.positions.find({"pool_id": POOL}, {"_id": 0}).to_list(None)
+        return merged, positions, await liquidity.merge_duplicate_positions()
+
+    merged, positions, again = asyncio.run(run())
+    assert merged == 1 and again == 0
+    [position] = positions
+    assert position["id"] == "old"
+    assert (position["token0_amount"], position["token1_amount"], position["unclaimed_fees"]) == (4.0, 9.0, 0.75)
+    assert position["liquidity"] == pytest.approx(6.0)
@@ -0,0 +1,31 @@
+"""
+Unit tests for taking, renewing and handing over background job leases
+"""
+import asyncio
+
+import leases
+from leases import acquire, held
+
+
+def test_a_lease_has_one_holder_until_it_expires(mock_db):
+    mock_db(leases)
+
+    async def run():
+        taken = [await acquire("job", 60, "a"), await acquire("job", 60, "b"), await acquire("job", 60, "a")]
+        # A holder that stops renewing loses the lease once it expires
+        await acquire("job", 0, "a")
+        return taken + [await acquire("job", 60, "b"), await acquire("job", 60, "a")]
+
+    assert asyncio.run(run()) == [True, False, True, True, False]
+
+
+def test_held_lease_is_released_on_exit(mock_db):
+    mock_db(leases)
+
+    async def run():
+        async with held("backfill", 60, "a") as leader:
+            async with held("backfill", 60, "b") as other:
+                during = (leader, other)
+        return during, await acquire("backfill", 60, "b")
+
+    assert asyncio.run(run()) == ((True, False), True)
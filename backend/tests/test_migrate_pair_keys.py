@@ -0,0 +1,49 @@
+"""
+Unit tests for the server-side pair_key backfill
+"""
+import asyncio
+
+import pytest
+
+import migrate_pair_keys as migration
+from pairs import pair_key
+
+# Checksummed addresses whose order flips once lowercased ('B' < 'a' but 'a' < 'b')
+CHECKSUMMED = "0xBbBb000000000000000000000000000000000001"
+LOWER = "0xaaaa000000000000000000000000000000000002"
+PAIRS = [
+    (CHECKSUMMED, LOWER),
+    (LOWER, CHECKSUMMED),
+    (CHECKSUMMED.lower(), LOWER.upper().replace("0X", "0x")),
+    (LOWER, LOWER.upper().replace("0X", "0x")),
+]
+
+
+@pytest.mark.parametrize("collection", migration.COLLECTIONS)
+def test_backfilled_key_matches_python_pair_key(mock_db, collection):
+    db = mock_db(migration)
+
+    async def run():
+        await db[collection].insert_many([
+            {"id": f"doc-{i}", "token0_address": token0, "token1_address": token1}
+            for i, (token0, token1) in enumerate(PAIRS)
+        ])
+        await migration.migrate_pair_keys()
+        return await db[collection].find({}, {"_id": 0}).sort("id", 1).to_list(None)
+
+    docs = asyncio.run(run())
+    assert [doc["pair_key"] for doc in docs] == [pair_key(token0, token1) for token0, token1 in PAIRS]
+    assert docs[0]["pair_key"] == docs[1]["pair_key"] == docs[2]["pair_key"]
+
+
+def test_completed_migration_is_skipped(mock_db):
+    db = mock_db(migration)
+
+    async def run():
+        await migration.migrate_pair_keys()
+        await db.pools.insert_one({"id": "late", "token0_address": LOWER, "token1_address": CHECKSUMMED})
+        skipped = await migration.migrate_pair_keys()
+        forced = await migration.migrate_pair_keys(force=True)
+        return skipped, forced
+
+    assert asyncio.run(run()) == (0, 1)
@@ -0,0 +1,35 @@
+"""
+Unit tests for keyset cursors (no server required)
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, keyset_filter, page_query
+
+
+def test_cursor_round_trips_datetimes():
+    ts = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(ts, "tx-1")) == (ts, "tx-1")
+    assert decode_cursor(encode_cursor(12.5, "pool1")) == (12.5, "pool1")
+
+
+def test_malformed_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    assert keyset_filter("timestamp", 5, "b") == {"$or": [
+        {"timestamp": {"$lt": 5}},
+        {"timestamp": 5, "id": {"$lt": "b"}}
+    ]}
+
+
+def test_page_query_keeps_base_query():
+    cursor = encode_cursor(5, "b")
+    assert page_query({"wallet_address": "0xabc"}, "timestamp", None) == {"wallet_address": "0xabc"}
+    assert page_query({"wallet_address": "0xabc"}, "timestamp", cursor, descending=False) == {"$and": [
+        {"wallet_address": "0xabc"},
+        {"$or": [{"timestamp": {"$gt": 5}}, {"timestamp": 5, "id": {"$gt": "b"}}]}
+    ]}
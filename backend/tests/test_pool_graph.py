@@ -0,0 +1,100 @@
+"""
+Unit tests for keeping several workers' pool graphs in sync through the change log
+"""
+import asyncio
+
+import pool_graph as pool_graph_module
+from events import broker
+from pairs import pair_key
+from pool_graph import PoolGraphCache
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+TOKEN_C = "0x3000000000000000000000000000000000000003"
+
+
+def pool(pool_id, token0, token1, reserve0, reserve1):
+    return {"id": pool_id, "token0_address": token0, "token1_address": token1,
+            "token0_reserve": reserve0, "token1_reserve": reserve1, "fee": 0.3}
+
+
+class Worker(PoolGraphCache):
+    """A pool graph cache that counts full rebuilds and records listener calls"""
+
+    def __init__(self):
+        super().__init__(check_interval=0.0)
+        self.reloads = 0
+        self.notified = []
+        self.listeners.append(lambda pools: self.notified.extend(p["id"] for p in pools))
+
+    async def reload(self, version=None):
+        self.reloads += 1
+        await super().reload(version)
+
+    async def write(self, db, *pools):
+        for doc in pools:
+            await db.pools.replace_one({"id": doc["id"]}, doc, upsert=True)
+        await self.apply_many(list(pools))
+
+
+def test_other_workers_writes_are_caught_up_without_a_rebuild(mock_db):
+    db = mock_db(pool_graph_module)
+
+    async def run():
+        await db.pools.insert_one(pool("ab", TOKEN_A, TOKEN_B, 10.0, 20.0))
+        first, second = Worker(), Worker()
+        await first.get()
+        await second.get()
+
+        # Interleaved writes: each worker's own bump is followed by the other's
+        await first.write(db, pool("ab", TOKEN_A, TOKEN_B, 11.0, 19.0))
+        await second.write(db, pool("bc", TOKEN_B, TOKEN_C, 5.0, 5.0))
+        await first.write(db, pool("ab", TOKEN_A, TOKEN_B, 12.0, 18.0))
+
+        for worker in (first, second):
+            graph = await worker.get()
+            assert graph.pools["ab"].reserve0 == 12.0
+            assert graph.pools["bc"].reserve1 == 5.0
+            assert worker.reloads == 1
+        assert "bc" in first.notified and "ab" in second.notified
+
+    asyncio.run(run())
+
+
+def test_a_gap_in_the_change_log_rebuilds(mock_db):
+    db = mock_db(pool_graph_module)
+
+    async def run():
+        await db.pools.insert_one(pool("ab", TOKEN_A, TOKEN_B, 10.0, 20.0))
+        worker = Worker()
+        await worker.get()
+
+        # A bulk write outside the graph invalidates without logging the pools it touched
+        await db.pools.update_one({"id": "ab"}, {"$set": {"token0_reserve": 1.0}})
+        await PoolGraphCache().invalidate()
+        graph = await worker.get()
+        assert graph.pools["ab"].reserve0 == 1.0
+        assert worker.reloads == 2
+
+    asyncio.run(run())
+
+
+def test_caught_up_pools_are_published_to_stream_subscribers(mock_db):
+    db = mock_db(pool_graph_module)
+
+    async def run():
+        await db.pools.insert_one(pool("ab", TOKEN_A, TOKEN_B, 10.0, 20.0))
+        writer, reader = Worker(), Worker()
+        await reader.get()
+        await writer.write(db, {**pool("ab", TOKEN_A, TOKEN_B, 11.0, 19.0), "tvl": 30.0})
+
+        topic = pair_key(TOKEN_A, TOKEN_B)
+        queue = broker.subscribe(topic)
+        try:
+            await reader.get()
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+        finally:
+            broker.unsubscribe(topic, queue)
+
+    events = asyncio.run(run())
+    assert [(e["type"], e["data"]["token0_reserve"], e["data"]["tvl"]) for e in events] == [("pool", 11.0, 30.0)]
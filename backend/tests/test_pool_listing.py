@@ -0,0 +1,75 @@
+"""
+Unit tests for the pool listing's sort validation, token filter and cursors
+"""
+import asyncio
+
+import pytest
+
+import pool_listing
+import token_registry as registry_module
+from pool_listing import list_pools
+from token_registry import TokenRegistry
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+TOKEN_C = "0x3000000000000000000000000000000000000003"
+
+
+def pool(pool_id, token0, token1, tvl, apr=10.0):
+    return {"id": pool_id, "token0_address": token0, "token1_address": token1, "fee": 0.3, "tvl": tvl,
+            "volume_24h": 0.0, "apr": apr, "token0_reserve": 1.0, "token1_reserve": 1.0}
+
+
+@pytest.fixture
+def listing_db(mock_db, monkeypatch):
+    # A fresh registry so no tokens are cached from another test's database
+    monkeypatch.setattr(pool_listing, "token_registry", TokenRegistry())
+    db = mock_db(pool_listing, registry_module)
+    asyncio.run(db.tokens.insert_many([
+        {"address": address, "symbol": symbol, "name": symbol}
+        for address, symbol in ((TOKEN_A, "AAA"), (TOKEN_B, "BBB"), (TOKEN_C, "CCC"))
+    ]))
+    return db
+
+
+def all_pages(**kwargs):
+    """Follow cursors to the last page, returning the pool ids of each page"""
+    async def run():
+        pages, cursor = [], None
+        while True:
+            pools, cursor = await list_pools(cursor=cursor, **kwargs)
+            pages.append([p.id for p in pools])
+            if cursor is None:
+                return pages
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("sort_by,order", [("fee", "desc"), ("tvl; drop", "desc"), ("tvl", "up")])
+def test_unsupported_sort_is_rejected(listing_db, sort_by, order):
+    with pytest.raises(ValueError):
+        asyncio.run(list_pools(sort_by=sort_by, order=order))
+
+
+def test_ties_across_page_boundaries_are_neither_skipped_nor_repeated(listing_db):
+    asyncio.run(listing_db.pools.insert_many(
+        [pool(f"pool-{i}", TOKEN_A, TOKEN_B, tvl=100.0) for i in range(5)] + [pool("pool-top", TOKEN_A, TOKEN_C, 500.0)]
+    ))
+
+    pages = all_pages(sort_by="tvl", order="desc", limit=2)
+    assert pages == [["pool-top", "pool-4"], ["pool-3", "pool-2"], ["pool-1", "pool-0"]]
+    ascending = all_pages(sort_by="tvl", order="asc", limit=4)
+    assert ascending == [["pool-0", "pool-1", "pool-2", "pool-3"], ["pool-4", "pool-top"]]
+
+
+def test_cursor_keeps_the_token_filter(listing_db):
+    asyncio.run(listing_db.pools.insert_many([
+        pool("ab-1", TOKEN_A, TOKEN_B, 300.0),
+        pool("bc-1", TOKEN_B, TOKEN_C, 250.0),
+        pool("ac-1", TOKEN_C, TOKEN_A, 200.0),
+        pool("bc-2", TOKEN_C, TOKEN_B, 150.0),
+        pool("ab-2", TOKEN_B, TOKEN_A, 100.0),
+    ]))
+
+    # Mixed-case filter, matched on either side of the pair
+    pages = all_pages(sort_by="tvl", order="desc", token=TOKEN_A.upper().replace("0X", "0x"), limit=2)
+    assert pages == [["ab-1", "ac-1"], ["ab-2"]]
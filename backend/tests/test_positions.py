@@ -0,0 +1,108 @@
+"""
+Unit tests for position removal racing another removal, and for undoing the
+position write when the pool update fails
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import idempotency
+import liquidity
+import pool_graph
+import protocol_stats
+import token_registry
+from models import PositionCreate, PositionRemove
+from routes import positions
+
+WALLET = "0x3000000000000000000000000000000000000003"
+POOL = {"id": "pool1", "token0_address": "0x1000000000000000000000000000000000000001",
+        "token1_address": "0x2000000000000000000000000000000000000002",
+        "token0_reserve": 100.0, "token1_reserve": 100.0, "fee": 0.3, "tvl": 200.0}
+POSITION = {"id": "pos1", "pool_id": "pool1", "wallet_address": WALLET, "token0_amount": 10.0,
+            "token1_amount": 10.0, "liquidity": 10.0, "min_price": 0.0, "max_price": 0.0}
+
+
+@pytest.fixture
+def db(mock_db):
+    return mock_db(positions, liquidity, idempotency, pool_graph, protocol_stats, token_registry)
+
+
+def remove_racing(db, monkeypatch, concurrent_update):
+    """Remove half of the position while another removal lands just before ours"""
+    remove_from_position = positions.remove_from_position
+
+    async def racing(*args):
+        await concurrent_update()
+        return await remove_from_position(*args)
+
+    monkeypatch.setattr(positions, "remove_from_position", racing)
+
+    async def run():
+        await db.pools.insert_one(dict(POOL))
+        await db.positions.insert_one(dict(POSITION))
+        with pytest.raises(HTTPException) as error:
+            await positions.remove_liquidity(
+                PositionRemove(position_id="pos1", wallet_address=WALLET, percent=50, tx_hash="0x" + "ab" * 32)
+            )
+        pool = await db.pools.find_one({"id": "pool1"})
+        return error.value.status_code, pool["token0_reserve"], await db.transactions.count_documents({})
+
+    return asyncio.run(run())
+
+
+def test_drained_position_is_not_debited_from_the_pool_again(db, monkeypatch):
+    async def drain():
+        await db.positions.update_one({"id": "pos1"}, {"$set": {"token0_amount": 2.0, "token1_amount": 2.0}})
+
+    # 409 so the client retries; the reserves are untouched and the claim is released
+    assert remove_racing(db, monkeypatch, drain) == (409, 100.0, 0)
+
+
+def test_deleted_position_returns_404_without_touching_the_pool(db, monkeypatch):
+    async def delete():
+        await db.positions.delete_one({"id": "pos1"})
+
+    assert remove_racing(db, monkeypatch, delete) == (404, 100.0, 0)
+
+
+def fail_reserves(monkeypatch):
+    async def change_reserves(*args):
+        raise TimeoutError("pool update timed out")
+    monkeypatch.setattr(positions, "change_reserves", change_reserves)
+
+
+def test_failed_pool_update_undoes_the_add_before_releasing(db, monkeypatch):
+    fail_reserves(monkeypatch)
+
+    async def run():
+        await db.pools.insert_one(dict(POOL))
+        await db.positions.insert_one(dict(POSITION))
+        with pytest.raises(HTTPException):
+            await positions.add_liquidity(PositionCreate(
+                pool_id="pool1", wallet_address=WALLET, token0_amount=5.0, token1_amount=5.0,
+                min_price=0.0, max_price=0.0, tx_hash="0x" + "cd" * 32
+            ))
+        position = await db.positions.find_one({"id": "pos1"})
+        return position["token0_amount"], await db.transactions.count_documents({})
+
+    assert asyncio.run(run()) == (10.0, 0)
+
+
+def test_failed_pool_update_restores_a_removed_position(db, monkeypatch):
+    fail_reserves(monkeypatch)
+
+    async def run():
+        await db.pools.insert_one(dict(POOL))
+        await db.positions.insert_one(dict(POSITION))
+        with pytest.raises(HTTPException):
+            await positions.remove_liquidity(
+                PositionRemove(position_id="pos1", wallet_address=WALLET, percent=100, tx_hash="0x" + "ef" * 32)
+            )
+        position = await db.positions.find_one({"id": "pos1"}, {"_id": 0})
+        return position, await db.transactions.count_documents({})
+
+    position, claims = asyncio.run(run())
+    assert (position["pool_id"], position["wallet_address"]) == ("pool1", WALLET)
+    assert (position["token0_amount"], position["token1_amount"], position["liquidity"]) == (10.0, 10.0, 10.0)
+    assert claims == 0
@@ -0,0 +1,95 @@
+"""
+Unit tests for the price oracle's hourly snapshots, 24h baseline and price aliases
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import price_oracle as oracle_module
+import token_registry as registry_module
+from price_oracle import ANCHOR_TOKEN, PRICE_ALIASES, PriceOracle
+from routing import PoolGraph
+
+NATIVE, WPIO = next(iter(PRICE_ALIASES.items()))
+NOW = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+HOUR = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def oracle(monkeypatch):
+    # Keep test instances off the process-wide graph's listeners
+    monkeypatch.setattr(oracle_module.pool_graph, "listeners", [])
+    return PriceOracle(min_liquidity=0)
+
+
+def wpio_pool(wpio_reserve, usdt_reserve):
+    graph = PoolGraph()
+    graph.upsert_pool({"id": "wpio-usdt", "token0_address": WPIO, "token1_address": ANCHOR_TOKEN,
+                       "token0_reserve": wpio_reserve, "token1_reserve": usdt_reserve, "fee": 0.3})
+    return graph
+
+
+def test_native_token_is_priced_as_wpio(oracle):
+    oracle.engine.recompute(wpio_pool(1000, 2500))
+    prices = oracle.prices()
+    assert prices[NATIVE] == prices[WPIO] == pytest.approx(2.5)
+    assert prices[ANCHOR_TOKEN] == 1.0
+
+
+def test_snapshot_rolls_once_an_hour_and_loads_the_baseline(oracle, mock_db):
+    db = mock_db(oracle_module)
+    oracle.engine.recompute(wpio_pool(1000, 2500))
+
+    async def run():
+        # Another worker already snapshotted this hour; the 24h-old snapshot is the baseline
+        await db.price_snapshots.insert_many([
+            {"address": WPIO, "hour": HOUR, "price": 2.4},
+            {"address": WPIO, "hour": HOUR - timedelta(hours=24), "price": 2.0}
+        ])
+        rolled = [await oracle._roll_hour(NOW), await oracle._roll_hour(NOW + timedelta(minutes=20))]
+        snapshots = await db.price_snapshots.find({"hour": HOUR}, {"_id": 0}).to_list(None)
+        return rolled, {doc["address"]: doc["price"] for doc in snapshots}
+
+    rolled, snapshot = asyncio.run(run())
+    assert rolled == [True, False]
+    assert snapshot == {WPIO: 2.4, NATIVE: pytest.approx(2.5), ANCHOR_TOKEN: 1.0}
+    assert oracle._baseline == {WPIO: 2.0}
+
+
+def test_rolled_tick_rewrites_every_price_with_its_24h_change(oracle, mock_db, monkeypatch):
+    db = mock_db(oracle_module, registry_module)
+    graph = wpio_pool(1000, 2500)
+    revalued = []
+
+    async def get():
+        return graph
+
+    async def revalue_pools(graph, changed, prices):
+        revalued.append(changed)
+    monkeypatch.setattr(oracle_module.pool_graph, "get", get)
+    monkeypatch.setattr(oracle_module, "revalue_pools", revalue_pools)
+
+    async def run():
+        await db.tokens.insert_many([{"address": address, "price": 0} for address in (WPIO, NATIVE, ANCHOR_TOKEN)])
+        await db.price_snapshots.insert_one({"address": WPIO, "hour": HOUR - timedelta(hours=24), "price": 2.0})
+        first = await oracle.update()
+        tokens = {token["address"]: token for token in await db.tokens.find({}, {"_id": 0}).to_list(None)}
+        # Same hour, nothing moved: nothing is rewritten
+        await db.tokens.update_one({"address": WPIO}, {"$set": {"price_change_24h": None}})
+        second = await oracle.update()
+        return first, second, tokens, await db.tokens.find_one({"address": WPIO}, {"_id": 0})
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return NOW
+    monkeypatch.setattr(oracle_module, "datetime", Clock)
+
+    first, second, tokens, wpio_after = asyncio.run(run())
+    assert set(first) == {WPIO, NATIVE, ANCHOR_TOKEN} and second == {}
+    assert tokens[WPIO]["price"] == pytest.approx(2.5)
+    assert tokens[WPIO]["price_change_24h"] == pytest.approx(25.0)
+    assert "price_change_24h" not in tokens[ANCHOR_TOKEN]  # No baseline yet
+    assert wpio_after["price_change_24h"] is None
+    assert len(revalued) == 1
@@ -0,0 +1,70 @@
+"""
+Unit tests for reserve-derived token prices (pure, no database)
+"""
+import random
+
+import pytest
+
+from pricing import PriceEngine
+from routing import PoolGraph
+
+USDT, WPIO, GOLD, DUST, LONELY = "usdt", "wpio", "gold", "dust", "lonely"
+
+
+def pool(pool_id, token0, token1, reserve0, reserve1):
+    return {"id": pool_id, "token0_address": token0, "token1_address": token1,
+            "token0_reserve": reserve0, "token1_reserve": reserve1, "fee": 0.3}
+
+
+def build(*pools):
+    graph = PoolGraph()
+    for p in pools:
+        graph.upsert_pool(p)
+    return graph
+
+
+def test_prices_walk_out_from_the_anchor():
+    graph = build(
+        pool("a", WPIO, USDT, 1000, 2450),
+        pool("b", GOLD, WPIO, 10, 500),
+        pool("c", LONELY, DUST, 5, 5)
+    )
+    prices = PriceEngine(USDT).recompute(graph)
+    assert prices[USDT] == 1.0
+    assert prices[WPIO] == pytest.approx(2.45)
+    assert prices[GOLD] == pytest.approx(50 * 2.45)
+    assert LONELY not in prices and DUST not in prices
+
+
+def test_quotes_are_weighted_by_liquidity_and_dust_pools_ignored():
+    graph = build(
+        pool("deep", WPIO, USDT, 3000, 6000),  # $2.00 with $6000 on the USDT side
+        pool("thin", WPIO, USDT, 10, 50),      # $5.00 with only $50
+    )
+    assert PriceEngine(USDT, min_liquidity=100).recompute(graph)[WPIO] == pytest.approx(2.0)
+    assert PriceEngine(USDT, min_liquidity=0).recompute(graph)[WPIO] == pytest.approx((2 * 6000 + 5 * 50) / 6050)
+
+
+def test_incremental_updates_match_a_full_recompute():
+    rng = random.Random(7)
+    tokens = [USDT] + [f"t{i}" for i in range(60)]
+    pools = []
+    for i in range(150):
+        a, b = rng.sample(tokens[:i // 3 + 2], 2) if i < 40 else rng.sample(tokens, 2)
+        pools.append(pool(f"p{i}", a, b, rng.uniform(50, 5000), rng.uniform(50, 5000)))
+    graph = build(*pools)
+    engine = PriceEngine(USDT, min_liquidity=100)
+    engine.recompute(graph)
+
+    for _ in range(200):
+        changed = rng.sample(pools, 3)
+        for p in changed:
+            p["token0_reserve"] *= rng.uniform(0.5, 1.5)
+            p["token1_reserve"] *= rng.uniform(0.5, 1.5)
+            graph.upsert_pool(p)
+        moved = engine.update_pools(graph, [p["id"] for p in changed])
+        expected = PriceEngine(USDT, min_liquidity=100).recompute(graph)
+        assert engine.prices.keys() == expected.keys()
+        for token, price in expected.items():
+            assert engine.prices[token] == pytest.approx(price, rel=1e-9)
+        assert set(moved) <= set(expected)
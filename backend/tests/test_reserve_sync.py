@@ -0,0 +1,86 @@
+"""
+Unit tests for picking the pools whose stored reserves drifted from the chain,
+and for which pairs a reconcile run reads from a mock RPC node
+"""
+import asyncio
+
+import reserve_sync
+from chain_events import SYNC
+from chain_reads import GET_RESERVES
+from mock_rpc import MockRPCServer, encode_words, make_log
+from reserve_sync import ReserveReconciler, changed_reserves
+from rpc_client import RPCClient
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"  # pair token0 (lower address)
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+DECIMALS = {TOKEN_A: 18, TOKEN_B: 6}
+
+
+def pool(pool_id, pair, reserve_b, reserve_a):
+    # Stored with the tokens in the opposite order to the pair contract
+    return {"id": pool_id, "pair_address": pair, "token0_address": TOKEN_B, "token1_address": TOKEN_A,
+            "token0_reserve": reserve_b, "token1_reserve": reserve_a}
+
+
+def test_only_drifted_pools_are_returned_in_pool_token_order():
+    pools = [pool("same", "0xaa", 7.0, 5.0), pool("drifted", "0xbb", 7.0, 5.0), pool("unreadable", "0xcc", 1.0, 1.0)]
+    onchain = {
+        "0xaa": (5 * 10 ** 18, 7 * 10 ** 6),
+        "0xbb": (6 * 10 ** 18, 7 * 10 ** 6),
+        "0xcc": None
+    }
+    assert changed_reserves(pools, onchain, DECIMALS) == {"drifted": (7.0, 6.0)}
+
+
+def test_float_rounding_is_not_drift():
+    pools = [pool("p", "0xaa", 0.1 + 0.2, 1.0)]
+    onchain = {"0xaa": (10 ** 18, 300_000)}
+    assert changed_reserves(pools, onchain, DECIMALS) == {}
+
+
+PAIRS = ["0x00000000000000000000000000000000000000aa", "0x00000000000000000000000000000000000000bb",
+         "0x00000000000000000000000000000000000000cc"]
+
+
+def test_reconcile_reads_synced_pairs_between_full_sweeps(mock_db, monkeypatch):
+    db = mock_db(reserve_sync)
+    written = []
+
+    async def set_reserves_many(reserves):
+        written.append(reserves)
+        return len(reserves)
+
+    async def get_many(addresses):
+        return {}
+    monkeypatch.setattr(reserve_sync, "set_reserves_many", set_reserves_many)
+    monkeypatch.setattr(reserve_sync.token_registry, "get_many", get_many)
+
+    # On chain every pair holds 2/3 of 18-decimal tokens; "pool-bb" is stored stale
+    contracts = {pair: {GET_RESERVES: encode_words(2 * 10 ** 18, 3 * 10 ** 18, 0)} for pair in PAIRS}
+    pools = [{"id": f"pool-{pair[-2:]}", "pair_address": pair, "token0_address": TOKEN_A, "token1_address": TOKEN_B,
+              "token0_reserve": 1.0 if pair == PAIRS[1] else 2.0, "token1_reserve": 3.0} for pair in PAIRS]
+
+    with MockRPCServer(head=100, contracts=contracts) as node:
+        def pairs_read(reconciler, head, full=False):
+            node.head = head
+            node.requests.clear()
+            asyncio.run(reconciler.reconcile(full))
+            return sorted({params[0]["to"] for method, params in node.requests if method == "eth_call"})
+
+        async def setup():
+            await db.pools.insert_many([dict(pool) for pool in pools])
+        asyncio.run(setup())
+
+        reconciler = ReserveReconciler(RPCClient(node.url), full_sweep_every=3, max_log_range=50)
+        assert pairs_read(reconciler, 100) == PAIRS  # First run
+        assert written == [{"pool-bb": (2.0, 3.0)}]
+
+        node.logs = [make_log(SYNC, PAIRS[2], 105, "0x05", 0, words=[2 * 10 ** 18, 3 * 10 ** 18])]
+        assert pairs_read(reconciler, 110) == [PAIRS[2]]
+        assert pairs_read(reconciler, 120) == []
+        assert pairs_read(reconciler, 130) == PAIRS  # Every third run
+        assert pairs_read(reconciler, 200) == PAIRS  # Longer gap than getLogs is asked to cover
+        assert pairs_read(reconciler, 210) == []
+
+        never = ReserveReconciler(RPCClient(node.url), full_sweep_every=0, max_log_range=50)
+        assert [len(pairs_read(never, head)) for head in (300, 310, 320, 330)] == [3, 0, 0, 0]
@@ -0,0 +1,74 @@
+"""
+Unit tests for finding and revaluing the pools affected by price moves
+"""
+import asyncio
+import random
+
+import numpy as np
+
+import revaluation
+from liquidity import pool_apr
+from revaluation import pools_for_tokens, revalue_pools, valuations
+from routing import PoolGraph
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+TOKEN_C = "0x3000000000000000000000000000000000000003"
+
+
+def test_pools_are_found_through_either_token():
+    graph = PoolGraph()
+    for pool_id, token0, token1 in [("ab", TOKEN_A, TOKEN_B), ("bc", TOKEN_B, TOKEN_C), ("ca", TOKEN_C, TOKEN_A)]:
+        graph.upsert_pool({"id": pool_id, "token0_address": token0, "token1_address": token1,
+                           "token0_reserve": 1.0, "token1_reserve": 1.0, "fee": 0.3})
+    assert pools_for_tokens(graph, [TOKEN_A.upper().replace("0X", "0x")]) == {"ab", "ca"}
+    assert pools_for_tokens(graph, [TOKEN_B, TOKEN_C]) == {"ab", "bc", "ca"}
+    assert pools_for_tokens(graph, ["0x" + "9" * 40]) == set()
+
+
+def test_vectorized_valuation_matches_pool_apr():
+    rng = random.Random(7)
+    n = 500
+    reserve0 = np.array([rng.choice([0.0, rng.uniform(0, 1e6)]) for _ in range(n)])
+    reserve1 = np.array([rng.uniform(0, 1e6) for _ in range(n)])
+    price0 = np.array([rng.uniform(0, 10) for _ in range(n)])
+    price1 = np.array([rng.choice([0.0, rng.uniform(0, 10)]) for _ in range(n)])
+    fee = np.array([rng.choice([0.05, 0.3, 1.0]) for _ in range(n)])
+
+    tvl, apr = valuations(reserve0, reserve1, price0, price1, fee)
+    for i in range(n):
+        expected = reserve0[i] * price0[i] + reserve1[i] * price1[i]
+        assert tvl[i] == expected
+        assert apr[i] == pool_apr(fee[i], expected)
+
+
+def test_pools_changed_concurrently_are_skipped_and_not_counted(mock_db, monkeypatch):
+    db = mock_db(revaluation)
+    tvl_changes = []
+    pools = [{"id": pool_id, "token0_address": TOKEN_A, "token1_address": TOKEN_B, "token0_reserve": 10.0,
+              "token1_reserve": 10.0, "fee": 0.3, "tvl": 20.0} for pool_id in ("kept", "raced")]
+
+    async def get_many(addresses):
+        # Another writer moves "raced" after its reserves were read
+        await db.pools.update_one({"id": "raced"}, {"$set": {"token0_reserve": 11.0, "tvl": 21.0}})
+        return {}
+
+    async def record_tvl_change(delta):
+        tvl_changes.append(delta)
+    monkeypatch.setattr(revaluation.token_registry, "get_many", get_many)
+    monkeypatch.setattr(revaluation.protocol_stats, "record_tvl_change", record_tvl_change)
+
+    graph = PoolGraph()
+    for pool in pools:
+        graph.upsert_pool(pool)
+
+    async def run():
+        await db.pools.insert_many([dict(pool) for pool in pools])
+        written = await revalue_pools(graph, {TOKEN_A: 2.0}, {TOKEN_A: 2.0})
+        stored = await db.pools.find({}, {"_id": 0, "id": 1, "tvl": 1}).to_list(None)
+        return written, {pool["id"]: pool["tvl"] for pool in stored}
+
+    written, tvl = asyncio.run(run())
+    assert written == 1
+    assert tvl == {"kept": 30.0, "raced": 21.0}
+    assert tvl_changes == [10.0]
@@ -0,0 +1,39 @@
+"""
+Unit tests for the rolling-window ring buffer (no server required)
+"""
+import pytest
+
+from rolling_window import RollingWindow, bucket_epoch
+
+
+def test_bucket_epoch():
+    assert bucket_epoch(0) == 0
+    assert bucket_epoch(299) == 0
+    assert bucket_epoch(300) == 1
+
+
+def test_totals_cover_exactly_the_window():
+    window = RollingWindow(size=4)
+    window.add(10, 1.0)
+    window.add(11, 2.0)
+    window.add(11, 3.0)
+    window.add(13, 4.0)
+    assert window.totals(13) == (pytest.approx(10.0), 4)
+    # Bucket 10 drops out once the window ends at 14
+    assert window.totals(14) == (pytest.approx(9.0), 3)
+    assert window.totals(20) == (0.0, 0)
+
+
+def test_slot_reuse_resets_old_bucket():
+    window = RollingWindow(size=4)
+    window.add(1, 5.0)
+    window.add(5, 1.0)  # Same slot as bucket 1
+    assert window.totals(5) == (pytest.approx(1.0), 1)
+
+
+def test_late_data_for_expired_bucket_is_ignored():
+    window = RollingWindow(size=4)
+    window.add(5, 1.0)
+    window.add(1, 7.0)
+    window.set(1, 7.0, 1)
+    assert window.totals(5) == (pytest.approx(1.0), 1)
@@ -0,0 +1,100 @@
+"""
+Unit tests for the multi-hop router (no server required)
+"""
+import pytest
+
+from amm import get_amount_out
+from routing import PoolGraph, best_split, candidate_paths, quote_route
+
+X = "0x000000000000000000000000000000000000000a"
+WPIO = "0x9da12b8cf8b94f2e0eedd9841e268631af03adb1"
+USDT = "0x75c681d7d00b6cda3778535bba87e433ca369c96"
+Y = "0x000000000000000000000000000000000000000b"
+
+
+def make_pool(pool_id, token0, token1, reserve0, reserve1, fee=0.3):
+    return {
+        "id": pool_id,
+        "token0_address": token0,
+        "token1_address": token1,
+        "token0_reserve": reserve0,
+        "token1_reserve": reserve1,
+        "fee": fee,
+    }
+
+
+@pytest.fixture
+def graph():
+    graph = PoolGraph()
+    graph.upsert_pool(make_pool("x-wpio", X, WPIO, 10_000, 5_000))
+    graph.upsert_pool(make_pool("wpio-usdt", WPIO, USDT, 100_000, 245_000))
+    graph.upsert_pool(make_pool("x-usdt", X, USDT, 100, 120))  # Shallow direct pool
+    return graph
+
+
+class TestBestRoute:
+    """Test path search over the pool graph"""
+    
+    def test_prefers_deeper_two_hop_route(self, graph):
+        route = graph.best_route(X, USDT, 50)
+        assert route.pools == ["x-wpio", "wpio-usdt"]
+        assert route.path == [X, WPIO, USDT]
+        hop1 = get_amount_out(50, 10_000, 5_000)
+        assert route.amount_out == pytest.approx(get_amount_out(hop1, 100_000, 245_000))
+    
+    def test_direct_route_when_hops_limited(self, graph):
+        route = graph.best_route(X, USDT, 50, max_hops=1)
+        assert route.pools == ["x-usdt"]
+    
+    def test_no_route_for_unknown_token(self, graph):
+        assert graph.best_route(X, Y, 10) is None
+    
+    def test_skips_empty_pools(self, graph):
+        graph.upsert_pool(make_pool("x-y", X, Y, 0, 0))
+        assert graph.best_route(X, Y, 10) is None
+    
+    def test_quote_route_compounds_hops(self, graph):
+        route = graph.best_route(X, USDT, 50)
+        quote = quote_route(graph, route)
+        assert quote.amount_out == route.amount_out
+        assert quote.mid_price == pytest.approx(0.5 * 2.45)
+        assert quote.fee > 0
+        assert 0 < quote.price_impact < 100
+
+
+class TestIncrementalUpdates:
+    """Test that upserts and removals keep the adjacency consistent"""
+    
+    def test_upsert_updates_reserves_in_place(self, graph):
+        before = graph.best_route(WPIO, USDT, 10).amount_out
+        graph.upsert_pool(make_pool("wpio-usdt", WPIO, USDT, 100_000, 490_000))
+        assert graph.best_route(WPIO, USDT, 10).amount_out > before
+        assert len(graph) == 3
+    
+    def test_remove_pool(self, graph):
+        graph.remove_pool("x-wpio")
+        assert graph.best_route(X, USDT, 50).pools == ["x-usdt"]
+        assert [edge.id for edge in graph.pools_for(WPIO)] == ["wpio-usdt"]
+
+
+class TestSplitRouting:
+    """Test splitting large trades across parallel routes"""
+    
+    def test_large_trade_splits_and_beats_single_route(self, graph):
+        graph.upsert_pool(make_pool("x-usdt", X, USDT, 10_000, 12_000))
+        single = graph.best_route(X, USDT, 3_000)
+        split = best_split(graph, X, USDT, 3_000)
+        assert len(split.legs) == 2
+        assert split.amount_out > single.amount_out
+        assert sum(leg.amount_in for leg in split.legs) == pytest.approx(3_000)
+        assert sum(leg.amount_out for leg in split.legs) == pytest.approx(split.amount_out)
+        assert split.amount_out_without_fee > split.amount_out
+    
+    def test_small_trade_uses_one_leg(self, graph):
+        split = best_split(graph, X, USDT, 1)
+        assert len(split.legs) == 1
+        assert split.legs[0].pools == ["x-wpio", "wpio-usdt"]
+    
+    def test_candidate_paths_respect_hop_limit(self, graph):
+        paths = candidate_paths(graph, X, USDT, max_hops=1)
+        assert [pools for _, pools in paths] == [["x-usdt"]]
@@ -0,0 +1,77 @@
+"""
+Unit tests for the batched JSON-RPC client against a mock RPC node
+"""
+import asyncio
+
+import pytest
+
+from chain_reads import DECIMALS, GET_RESERVES, NAME, SYMBOL, pair_reserves_many, token_metadata_many
+from mock_rpc import MockRPCServer, encode_string, encode_words
+from rpc_client import RPCClient, RPCError
+
+TOKEN = "0x1000000000000000000000000000000000000001"
+BYTES32_TOKEN = "0x2000000000000000000000000000000000000002"
+WALLET = "0x3000000000000000000000000000000000000003"
+PAIR = "0x4000000000000000000000000000000000000004"
+
+CONTRACTS = {
+    TOKEN: {NAME: encode_string("Wrapped PIO"), SYMBOL: encode_string("WPIO"), DECIMALS: encode_words(18)},
+    BYTES32_TOKEN: {NAME: "0x" + b"Maker".hex().ljust(64, "0"), SYMBOL: "0x" + b"MKR".hex().ljust(64, "0"),
+                    DECIMALS: encode_words(18)},
+    PAIR: {GET_RESERVES: encode_words(5 * 10 ** 18, 7 * 10 ** 6, 1_700_000_000)}
+}
+
+
+def run(node, coro_fn, **kwargs):
+    async def go():
+        async with RPCClient(node.url, **kwargs) as rpc:
+            return await coro_fn(rpc)
+    return asyncio.run(go())
+
+
+def test_batch_keeps_order_and_returns_errors_in_place():
+    with MockRPCServer(head=42) as node:
+        results = run(node, lambda rpc: rpc.batch([
+            ("eth_blockNumber", []),
+            ("eth_nonexistent", []),
+            ("eth_getBlockByNumber", ["0x2", False])
+        ]))
+    assert results[0] == "0x2a"
+    assert isinstance(results[1], Exception)
+    assert results[2]["number"] == "0x2"
+
+
+def test_single_call_raises_rpc_errors():
+    with MockRPCServer(contracts=CONTRACTS) as node:
+        with pytest.raises(RPCError):
+            run(node, lambda rpc: rpc.call("eth_call", [{"to": TOKEN, "data": GET_RESERVES}, "latest"]))
+
+
+def test_hundreds_of_calls_take_a_few_round_trips():
+    pairs = [f"0x{i:040x}" for i in range(1, 301)]
+    contracts = {pair: {GET_RESERVES: encode_words(i, 2 * i, 0)} for i, pair in enumerate(pairs, 1)}
+    with MockRPCServer(contracts=contracts) as node:
+        reserves = run(node, lambda rpc: pair_reserves_many(rpc, pairs), batch_size=100)
+        assert node.posts == 3
+    assert reserves[pairs[0]] == (1, 2) and reserves[pairs[-1]] == (300, 600)
+
+
+def test_token_metadata_and_reserves_in_one_aggregate():
+    with MockRPCServer(contracts=CONTRACTS) as node:
+        metadata = run(node, lambda rpc: token_metadata_many(rpc, [TOKEN, BYTES32_TOKEN, WALLET, PAIR]))
+        reserves = run(node, lambda rpc: pair_reserves_many(rpc, [PAIR, TOKEN]))
+        assert node.posts == 2
+    assert metadata[TOKEN] == {"name": "Wrapped PIO", "symbol": "WPIO", "decimals": 18}
+    assert metadata[BYTES32_TOKEN] == {"name": "Maker", "symbol": "MKR", "decimals": 18}
+    # No code, or a contract without the ERC-20 views
+    assert metadata[WALLET] is None and metadata[PAIR] is None
+    assert reserves == {PAIR: (5 * 10 ** 18, 7 * 10 ** 6), TOKEN: None}
+
+
+def test_call_many_tells_reverts_from_node_failures():
+    with MockRPCServer(contracts=CONTRACTS) as node:
+        reverted = run(node, lambda rpc: rpc.call_many([(PAIR, NAME), (TOKEN, SYMBOL)]))
+        node.call_error = (-32603, "internal error")
+        failed = run(node, lambda rpc: rpc.call_many([(PAIR, NAME)]))
+    assert reverted == [None, encode_string("WPIO")]
+    assert isinstance(failed[0], RPCError) and not failed[0].reverted
@@ -0,0 +1,66 @@
+"""
+Unit tests for recording a swap's pool update, valuation and protocol TVL
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import candles
+import idempotency
+import pool_graph
+import protocol_stats
+import swap_recorder
+import unique_wallets
+import volume_windows
+from pairs import pair_key
+from swap_recorder import apply_swap, record_swap
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"
+TOKEN_B = "0x2000000000000000000000000000000000000002"
+POOL = {"id": "pool-1", "token0_address": TOKEN_B, "token1_address": TOKEN_A, "pair_key": pair_key(TOKEN_A, TOKEN_B),
+        "token0_reserve": 1000.0, "token1_reserve": 500.0, "fee": 0.3, "tvl": 1500.0, "apr": 0.3}
+
+
+def swap(token_in, token_out, amount_in, amount_out):
+    return {"id": f"swap-{amount_in}", "type": "swap", "wallet_address": "0x" + "77" * 20,
+            "token0_address": token_in, "token1_address": token_out, "amount0": amount_in, "amount1": amount_out,
+            "pair_key": pair_key(token_in, token_out), "timestamp": datetime(2026, 3, 1, tzinfo=timezone.utc)}
+
+
+@pytest.fixture
+def recorder_db(mock_db, monkeypatch):
+    monkeypatch.setattr(swap_recorder, "_supports_transactions", False)
+    monkeypatch.setattr(pool_graph.pool_graph, "listeners", [])
+    return mock_db(swap_recorder, protocol_stats, candles, volume_windows, unique_wallets, pool_graph, idempotency)
+
+
+def test_swap_moves_reserves_and_revalues_the_pool(recorder_db):
+    db = recorder_db
+
+    async def run():
+        await db.pools.insert_one(dict(POOL))
+        await db.stats.insert_one({"tvl": 1500.0})
+        returned = await record_swap(swap(TOKEN_A, TOKEN_B, 10.0, 19.0), 20.0, price_in=2.0, price_out=1.0)
+        stored = await db.pools.find_one({"id": "pool-1"}, {"_id": 0})
+        return returned, stored, await db.stats.find_one({}, {"_id": 0})
+
+    returned, stored, stats = asyncio.run(run())
+    assert (stored["token0_reserve"], stored["token1_reserve"]) == (981.0, 510.0)
+    assert stored["tvl"] == pytest.approx(981.0 * 1.0 + 510.0 * 2.0)
+    assert returned == stored
+    assert stats["tvl"] == pytest.approx(stored["tvl"])
+
+
+def test_mirror_matches_the_pipeline_when_reserves_cannot_move(recorder_db):
+    db = recorder_db
+    unfunded = {**POOL, "token0_reserve": 0.0, "tvl": 500.0}
+
+    async def run():
+        await db.pools.insert_one(dict(unfunded))
+        await record_swap(swap(TOKEN_B, TOKEN_A, 10.0, 5.0), 10.0, price_in=1.0, price_out=3.0)
+        return await db.pools.find_one({"id": "pool-1"}, {"_id": 0})
+
+    stored = asyncio.run(run())
+    assert stored == apply_swap(unfunded, TOKEN_B, 10.0, 5.0, 10.0, price_in=1.0, price_out=3.0)
+    assert (stored["token0_reserve"], stored["token1_reserve"], stored["tvl"]) == (0.0, 500.0, 1500.0)
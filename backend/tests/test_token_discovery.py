@@ -0,0 +1,72 @@
+"""
+Unit tests for token discovery coalescing and negative caching against a mock RPC node
+"""
+import asyncio
+
+import pytest
+
+from mock_rpc import MockRPCServer
+from rpc_client import RPCClient, RPCError
+from token_discovery import TokenDiscovery, is_address
+import token_discovery as discovery_module
+
+WALLET = "0x3000000000000000000000000000000000000003"
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    async def get(address):
+        return None
+    monkeypatch.setattr(discovery_module.token_registry, "get", get)
+
+
+def discover_concurrently(discovery, address, n):
+    async def run():
+        return await asyncio.gather(*(discovery.discover(address) for _ in range(n)))
+    return asyncio.run(run())
+
+
+def make_discovery(url, negative_ttl=600):
+    discovery = TokenDiscovery(negative_ttl=negative_ttl)
+    discovery._rpc = RPCClient(url)
+    return discovery
+
+
+def test_address_validation():
+    assert is_address("0x9Da12b8CF8B94f2E0eedD9841E268631aF03aDb1")
+    assert not is_address("0x1234")
+    assert not is_address("9da12b8cf8b94f2e0eedd9841e268631af03adb1")
+
+
+def test_concurrent_lookups_share_one_rpc_round_trip():
+    with MockRPCServer() as node:
+        discovery = make_discovery(node.url)
+        assert discover_concurrently(discovery, WALLET, 20) == [None] * 20
+        assert node.posts == 1
+
+
+def test_non_tokens_are_cached_until_ttl_expires():
+    with MockRPCServer() as node:
+        discovery = make_discovery(node.url)
+        discover_concurrently(discovery, WALLET, 1)
+        discover_concurrently(discovery, WALLET.upper().replace("0X", "0x"), 1)
+        assert node.posts == 1
+
+        expiring = make_discovery(node.url, negative_ttl=0)
+        discover_concurrently(expiring, WALLET, 1)
+        discover_concurrently(expiring, WALLET, 1)
+        assert node.posts == 3
+
+
+def test_node_failures_are_not_cached_as_non_tokens():
+    with MockRPCServer() as node:
+        discovery = make_discovery(node.url)
+        node.call_error = (-32005, "request rate exceeded")
+        with pytest.raises(RPCError):
+            discover_concurrently(discovery, WALLET, 1)
+
+        # The next request asks the node again and caches the real answer
+        node.call_error = None
+        assert discover_concurrently(discovery, WALLET, 1) == [None]
+        discover_concurrently(discovery, WALLET, 1)
+        assert node.posts == 2
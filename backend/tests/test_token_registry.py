@@ -0,0 +1,124 @@
+"""
+Unit tests for the token registry's version checks, refreshes and miss caching
+"""
+import asyncio
+from types import SimpleNamespace
+
+import token_registry as registry_module
+from token_registry import TokenRegistry
+
+TOKEN_A = "0x1000000000000000000000000000000000000001"
+UNKNOWN = "0x9000000000000000000000000000000000000009"
+
+
+class CountingCollection:
+    """Wraps a collection, counting find and find_one calls"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.counts = {"find": 0, "find_one": 0}
+
+    def find(self, *args, **kwargs):
+        self.counts["find"] += 1
+        return self.collection.find(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        self.counts["find_one"] += 1
+        return self.collection.find_one(*args, **kwargs)
+
+
+def counting_queries(db, monkeypatch):
+    """Count the queries the registry sends to the tokens collection"""
+    tokens = CountingCollection(db.tokens)
+    monkeypatch.setattr(registry_module, "db", SimpleNamespace(tokens=tokens))
+    return tokens.counts
+
+
+def test_version_bump_reloads_after_check_interval(mock_db, monkeypatch):
+    db = mock_db(registry_module)
+    clock = [100.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: clock[0])
+
+    async def run():
+        registry = TokenRegistry(check_interval=5.0, max_age=300.0)
+        await db.tokens.insert_one({"address": TOKEN_A, "symbol": "A", "price": 1.0})
+        assert (await registry.get(TOKEN_A))["price"] == 1.0
+
+        # Another worker edits the token and bumps the version
+        await db.tokens.update_one({"address": TOKEN_A}, {"$set": {"price": 2.0}})
+        await TokenRegistry().invalidate()
+        assert (await registry.get(TOKEN_A))["price"] == 1.0  # Not checked yet
+        clock[0] += 5.0
+        assert (await registry.get(TOKEN_A))["price"] == 2.0
+
+    asyncio.run(run())
+
+
+def test_max_age_reloads_without_a_version_bump(mock_db, monkeypatch):
+    db = mock_db(registry_module)
+    clock = [100.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: clock[0])
+
+    async def run():
+        registry = TokenRegistry(check_interval=5.0, max_age=60.0)
+        await db.tokens.insert_one({"address": TOKEN_A, "symbol": "A", "price": 1.0})
+        await registry.get(TOKEN_A)
+        await db.tokens.update_one({"address": TOKEN_A}, {"$set": {"price": 3.0}})
+        clock[0] += 30.0
+        assert (await registry.get(TOKEN_A))["price"] == 1.0
+        clock[0] += 30.0
+        assert (await registry.get(TOKEN_A))["price"] == 3.0
+
+    asyncio.run(run())
+
+
+def test_misses_are_cached_until_ttl_or_invalidate(mock_db, monkeypatch):
+    db = mock_db(registry_module)
+    clock = [100.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: clock[0])
+    queries = counting_queries(db, monkeypatch)
+
+    async def run():
+        registry = TokenRegistry(check_interval=300.0, max_age=600.0, miss_ttl=30.0)
+        for _ in range(5):
+            assert await registry.get(UNKNOWN) is None
+            assert await registry.get_many([UNKNOWN]) == {}
+        assert queries == {"find": 1, "find_one": 1}  # The initial load and the first miss
+
+        clock[0] += 30.0
+        assert await registry.get(UNKNOWN) is None
+        assert queries["find_one"] == 2
+
+        await db.tokens.insert_one({"address": UNKNOWN, "symbol": "U"})
+        await registry.invalidate()
+        assert (await registry.get(UNKNOWN))["symbol"] == "U"
+
+    asyncio.run(run())
+
+
+def test_other_workers_price_updates_are_caught_up_without_a_reload(mock_db, monkeypatch):
+    db = mock_db(registry_module)
+    clock = [100.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: clock[0])
+
+    class Worker(TokenRegistry):
+        reloads = 0
+
+        async def reload(self, version=None):
+            self.reloads += 1
+            await super().reload(version)
+
+    async def run():
+        await db.tokens.insert_many([{"address": TOKEN_A, "symbol": "A", "price": 1.0},
+                                     {"address": UNKNOWN, "symbol": "U", "price": 5.0}])
+        writer, reader = Worker(check_interval=5.0), Worker(check_interval=5.0)
+        await reader.get(TOKEN_A)
+
+        await db.tokens.update_one({"address": TOKEN_A}, {"$set": {"price": 2.0}})
+        await writer.apply_updates({TOKEN_A: {"price": 2.0}})
+        assert (await writer.get(TOKEN_A))["price"] == 2.0
+        clock[0] += 5.0
+        prices = {address: token["price"] for address, token in (await reader.get_many([TOKEN_A, UNKNOWN])).items()}
+        return prices, writer.reloads, reader.reloads
+
+    assert asyncio.run(run()) == ({TOKEN_A: 2.0, UNKNOWN: 5.0}, 1, 1)
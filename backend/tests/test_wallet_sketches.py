@@ -0,0 +1,88 @@
+"""
+Unit tests for backfilling the unique-wallet sketches from historical swaps
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import leases
+import migrate_wallet_sketches
+import unique_wallets
+from migrate_wallet_sketches import CHECKPOINT_ID, backfill_in_background, backfill_wallet_sketches
+from unique_wallets import UniqueWalletCounts, count_pools, record_wallet
+
+PAIR_KEY = "0x1000000000000000000000000000000000000001_0x2000000000000000000000000000000000000002"
+
+
+def wallet(n):
+    return f"0x{n:040x}"
+
+
+def swap(n, wallet_address, age):
+    return {"id": f"tx{n:04d}", "type": "swap", "wallet_address": wallet_address, "pair_key": PAIR_KEY,
+            "timestamp": datetime.utcnow() - age}
+
+
+def test_historical_swaps_fill_total_pool_and_recent_sketches(mock_db):
+    db = mock_db(migrate_wallet_sketches, unique_wallets)
+
+    async def run():
+        await db.pools.insert_one({"id": "pool1", "pair_key": PAIR_KEY})
+        await db.transactions.insert_many(
+            [swap(i, wallet(i), timedelta(days=30)) for i in range(40)]  # Long before the 24h/7d windows
+            + [swap(100 + i, wallet(i).upper().replace("0X", "0x"), timedelta(hours=2)) for i in range(10)]
+            + [{"id": "add1", "type": "add", "wallet_address": wallet(999), "timestamp": datetime.utcnow()}]
+        )
+        assert await backfill_wallet_sketches(batch_size=7) == 50
+        counts = await UniqueWalletCounts().compute()
+        traders = await count_pools(["pool1"])
+
+        # Completed: later startups skip it, and live counting of the same wallets adds nothing
+        assert await backfill_wallet_sketches() == 0
+        await record_wallet(wallet(3), "pool1")
+        return counts, traders, await UniqueWalletCounts().compute()
+
+    counts, traders, after_live = asyncio.run(run())
+    assert counts == {"total_swappers": 40, "swappers_24h": 10, "swappers_7d": 10}
+    assert traders == 40
+    assert after_live["total_swappers"] == 40
+
+
+def test_interrupted_backfill_resumes_after_checkpoint(mock_db):
+    db = mock_db(migrate_wallet_sketches, unique_wallets)
+
+    async def run():
+        txs = [swap(i, wallet(i), timedelta(days=30, minutes=-i)) for i in range(20)]
+        await db.transactions.insert_many(txs)
+        await db.backfill_checkpoints.insert_one({
+            "_id": CHECKPOINT_ID, "completed": False, "after": {"timestamp": txs[11]["timestamp"], "id": txs[11]["id"]}
+        })
+        return await backfill_wallet_sketches()
+
+    assert asyncio.run(run()) == 8
+
+
+def test_only_one_worker_runs_the_background_backfill(mock_db, monkeypatch):
+    db = mock_db(migrate_wallet_sketches, unique_wallets, leases)
+    runs = []
+    backfill = migrate_wallet_sketches.backfill_wallet_sketches
+
+    async def counted(*args, **kwargs):
+        await asyncio.sleep(0.01)  # Still running when the other workers start
+        runs.append(await backfill(*args, **kwargs))
+        return runs[-1]
+    monkeypatch.setattr(migrate_wallet_sketches, "backfill_wallet_sketches", counted)
+    # Each call stands for a different worker process
+    workers = iter(range(100))
+    monkeypatch.setattr(migrate_wallet_sketches, "leases", SimpleNamespace(
+        held=lambda name, ttl: leases.held(name, ttl, f"worker-{next(workers)}")
+    ))
+
+    async def run():
+        await db.transactions.insert_many([swap(i, wallet(i), timedelta(days=30)) for i in range(5)])
+        # Every worker starts the task; the lease lets one of them scan
+        await asyncio.gather(*(backfill_in_background() for _ in range(4)))
+        await backfill_in_background()  # A later start finds it completed
+
+    asyncio.run(run())
+    assert runs == [5]
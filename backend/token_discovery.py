@@ -0,0 +1,109 @@
+"""
+ERC-20 token discovery from the chain.
+
+``discover()`` resolves an address in this order:
+
+1. The token registry: known tokens cost nothing.
+2. A negative cache of addresses that recently turned out not to be ERC-20
+   tokens (no code, or missing symbol/decimals). Entries expire after
+   ``negative_ttl`` so a token deployed later at a pasted address is found.
+3. The chain, through one aggregated name/symbol/decimals read. Concurrent
+   requests for the same address share a single in-flight lookup, so a
+   popular pasted address costs one RPC round trip however many users paste
+   it at once. Found tokens are upserted into the tokens collection.
+
+RPC failures are not cached; the next request tries again.
+"""
+from database import db
+from rpc_client import RPCClient
+from chain_reads import token_metadata_many
+from token_registry import token_registry
+from models import Token
+from collections import OrderedDict
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-f]{40}$")
+NEGATIVE_TTL = float(os.environ.get('TOKEN_DISCOVERY_NEGATIVE_TTL', '600'))
+
+
+def is_address(address: str) -> bool:
+    return bool(ADDRESS_PATTERN.match(address.lower()))
+
+
+def default_logo(symbol: str) -> str:
+    return f"https://api.dicebear.com/7.x/shapes/svg?seed={symbol}&backgroundColor=6366f1"
+
+
+class TokenDiscovery:
+    def __init__(self, negative_ttl: float = NEGATIVE_TTL, max_misses: int = 10_000):
+        self.negative_ttl = negative_ttl
+        self.max_misses = max_misses
+        self._misses: "OrderedDict[str, float]" = OrderedDict()  # address -> expiry (monotonic)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._rpc: Optional[RPCClient] = None
+
+    @property
+    def rpc(self) -> RPCClient:
+        if self._rpc is None:
+            self._rpc = RPCClient()
+        return self._rpc
+
+    async def close(self):
+        if self._rpc is not None:
+            await self._rpc.close()
+            self._rpc = None
+
+    def _is_known_miss(self, address: str) -> bool:
+        expires = self._misses.get(address)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._misses[address]
+            return False
+        return True
+
+    def _remember_miss(self, address: str):
+        self._misses[address] = time.monotonic() + self.negative_ttl
+        self._misses.move_to_end(address)
+        while len(self._misses) > self.max_misses:
+            self._misses.popitem(last=False)
+
+    async def discover(self, address: str) -> Optional[dict]:
+        """The token at `address`, or None if it isn't an ERC-20 token"""
+        address = address.lower()
+        token = await token_registry.get(address)
+        if token or self._is_known_miss(address):
+            return token
+
+        # The lookup runs as its own task so a caller that disconnects doesn't cancel it for the others
+        lookup = self._inflight.get(address)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._resolve(address))
+            self._inflight[address] = lookup
+            lookup.add_done_callback(lambda _: self._inflight.pop(address, None))
+        return await asyncio.shield(lookup)
+
+    async def _resolve(self, address: str) -> Optional[dict]:
+        # Raises if the node failed any of the reads, before anything is remembered
+        metadata = (await token_metadata_many(self.rpc, [address]))[address]
+        if metadata is None:
+            self._remember_miss(address)
+            logger.info(f"Token discovery: {address} is not an ERC-20 token")
+            return None
+
+        token = Token(address=address, logo=default_logo(metadata["symbol"]), **metadata).model_dump()
+        # Another worker may have discovered it first; keep whichever landed
+        await db.tokens.update_one({"address": address}, {"$setOnInsert": token}, upsert=True)
+        await token_registry.invalidate()
+        logger.info(f"Token discovery: registered {metadata['symbol']} at {address}")
+        return await token_registry.get(address)
+
+
+token_discovery = TokenDiscovery()
@@ -0,0 +1,170 @@
+"""In-process token registry shared by every router"""
+from database import db
+from cache_versions import get_version, bump_version
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKENS_VERSION_KEY = "tokens"
+CHANGE_LOG_TTL_SECONDS = 3600
+
+
+class TokenRegistry:
+    """Keeps the tokens collection in memory, keyed by lowercase address.
+
+    Writers call ``invalidate()`` which bumps the shared ``tokens`` version, so
+    every worker reloads on its next version check. Writers that only change
+    a few tokens' fields call ``apply_updates()`` instead: it patches the
+    local cache and logs the changed addresses under the new version in
+    ``token_changes``, and other workers re-read just those tokens (a gap in
+    the log falls back to a reload, as in pool_graph). Version checks are
+    throttled to one round-trip per ``check_interval`` seconds, and a full
+    reload happens at least every ``max_age`` seconds to pick up edits made
+    directly in Mongo. Addresses that aren't registered are remembered for
+    ``miss_ttl`` seconds (until the next reload at the latest), so unknown
+    addresses don't cost a query per request.
+    """
+
+    def __init__(self, check_interval: float = 5.0, max_age: float = 300.0, miss_ttl: float = 30.0,
+                 max_misses: int = 10_000):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self._tokens: Dict[str, dict] = {}
+        self._misses: Dict[str, float] = {}  # address -> expiry (monotonic)
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    async def reload(self, version: Optional[int] = None):
+        """Load every token from Mongo"""
+        if version is None:
+            version = await get_version(TOKENS_VERSION_KEY)
+        tokens = await db.tokens.find({}, {"_id": 0}).to_list(None)
+        self._tokens = {token["address"].lower(): token for token in tokens}
+        self._misses.clear()
+        self._version = version
+        self._loaded_at = self._checked_at = time.monotonic()
+        logger.info(f"Token registry loaded {len(self._tokens)} tokens (version {version})")
+
+    async def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._version is not None and now - self._checked_at < self.check_interval:
+                return
+            version = await get_version(TOKENS_VERSION_KEY)
+            if now - self._loaded_at >= self.max_age or self._version is None or version < self._version:
+                await self.reload(version)
+            elif version == self._version or await self._catch_up(version):
+                self._checked_at = now
+            else:
+                await self.reload(version)
+
+    async def _catch_up(self, version: int) -> bool:
+        """Re-read the tokens logged between our version and `version`; False if the log has a gap"""
+        changes = await db.token_changes.find(
+            {"version": {"$gt": self._version, "$lte": version}}, {"_id": 0, "addresses": 1}
+        ).to_list(None)
+        if len(changes) != version - self._version:
+            return False
+        addresses = list({address for change in changes for address in change["addresses"]})
+        for token in await db.tokens.find({"address": {"$in": addresses}}, {"_id": 0}).to_list(None):
+            self._tokens[token["address"].lower()] = token
+        self._version = version
+        return True
+
+    def _is_known_miss(self, address: str, now: float) -> bool:
+        expires = self._misses.get(address)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self._misses[address]
+            return False
+        return True
+
+    def _remember_misses(self, addresses: Iterable[str]):
+        if len(self._misses) >= self.max_misses:
+            self._misses.clear()
+        expires = time.monotonic() + self.miss_ttl
+        for address in addresses:
+            self._misses[address] = expires
+
+    async def get(self, address: str) -> Optional[dict]:
+        """Get a token by address, or None if it is not registered"""
+        await self._ensure_fresh()
+        addr = address.lower()
+        token = self._tokens.get(addr)
+        if token is None and not self._is_known_miss(addr, time.monotonic()):
+            # Tokens inserted without an invalidation are picked up lazily
+            token = await db.tokens.find_one({"address": addr}, {"_id": 0})
+            if token:
+                self._tokens[addr] = token
+            else:
+                self._remember_misses([addr])
+        return token
+
+    async def get_many(self, addresses: Iterable[str]) -> Dict[str, dict]:
+        """Get several tokens at once; misses are resolved with a single query"""
+        await self._ensure_fresh()
+        result = {}
+        missing = []
+        now = time.monotonic()
+        for address in set(addr.lower() for addr in addresses):
+            token = self._tokens.get(address)
+            if token is not None:
+                result[address] = token
+            elif not self._is_known_miss(address, now):
+                missing.append(address)
+        if missing:
+            tokens = await db.tokens.find({"address": {"$in": missing}}, {"_id": 0}).to_list(None)
+            for token in tokens:
+                self._tokens[token["address"]] = token
+                result[token["address"]] = token
+            self._remember_misses(address for address in missing if address not in result)
+        return result
+
+    async def all(self) -> list:
+        """Get every registered token"""
+        await self._ensure_fresh()
+        return list(self._tokens.values())
+
+    async def apply_updates(self, updates: Dict[str, dict]):
+        """Patch fields of tokens just written to Mongo (address -> fields) here and in every other worker"""
+        if not updates:
+            return
+        await self._ensure_fresh()
+        for address, fields in updates.items():
+            token = self._tokens.get(address.lower())
+            if token is not None:
+                self._tokens[address.lower()] = {**token, **fields}
+        version = await bump_version(TOKENS_VERSION_KEY)
+        await db.token_changes.insert_one({
+            "version": version, "addresses": [address.lower() for address in updates], "created_at": datetime.utcnow()
+        })
+        if version == self._version + 1:
+            self._version = version
+        else:
+            # Someone else wrote in between; catch up from the change log on the next read
+            self._checked_at = 0.0
+
+    async def invalidate(self):
+        """Drop cached tokens here and in every other worker after a write"""
+        await bump_version(TOKENS_VERSION_KEY)
+        self._version = None
+        self._misses.clear()
+
+
+token_registry = TokenRegistry()
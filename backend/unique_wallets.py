@@ -0,0 +1,103 @@
+"""
+Unique-wallet counts backed by HyperLogLog sketches stored in Mongo.
+
+Each swap sets one register in the all-time sketch, the current hourly and
+daily sketches and its pool's sketch with a single bulk ``$max`` write, so
+memory and storage stay constant no matter how many wallets trade. Hourly
+and daily sketches carry an ``expires_at`` field for a TTL index.
+"""
+from database import db
+from hyperloglog import DEFAULT_PRECISION, HyperLogLog, register_update
+from pymongo import UpdateOne
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TOTAL_SKETCH = "swappers:total"
+HOURLY_RETENTION = timedelta(hours=26)
+DAILY_RETENTION = timedelta(days=8)
+
+
+def hour_sketch(ts: datetime) -> str:
+    return f"swappers:hour:{ts:%Y%m%d%H}"
+
+
+def day_sketch(ts: datetime) -> str:
+    return f"swappers:day:{ts:%Y%m%d}"
+
+
+def pool_sketch(pool_id: str) -> str:
+    return f"swappers:pool:{pool_id}"
+
+
+async def record_wallet(wallet_address: str, pool_id: Optional[str] = None, timestamp: Optional[datetime] = None):
+    """Count a wallet in the total, hourly, daily and pool sketches"""
+    ts = timestamp or datetime.now(timezone.utc)
+    index, rank = register_update(wallet_address.lower())
+    register = {f"registers.{index}": rank}
+    
+    sketches = [
+        (TOTAL_SKETCH, None),
+        (hour_sketch(ts), ts + HOURLY_RETENTION),
+        (day_sketch(ts), ts + DAILY_RETENTION),
+    ]
+    if pool_id:
+        sketches.append((pool_sketch(pool_id), None))
+    
+    operations = []
+    for sketch_id, expires_at in sketches:
+        on_insert = {"precision": DEFAULT_PRECISION}
+        if expires_at:
+            on_insert["expires_at"] = expires_at
+        operations.append(UpdateOne(
+            {"_id": sketch_id},
+            {"$max": register, "$setOnInsert": on_insert},
+            upsert=True
+        ))
+    await db.sketches.bulk_write(operations, ordered=False)
+
+
+async def load_merged(sketch_ids: Iterable[str]) -> HyperLogLog:
+    """Union of the stored sketches (missing ones count as empty)"""
+    merged = HyperLogLog(DEFAULT_PRECISION)
+    async for doc in db.sketches.find({"_id": {"$in": list(sketch_ids)}}):
+        merged.merge(HyperLogLog.from_sparse(doc.get("registers", {}), doc.get("precision", DEFAULT_PRECISION)))
+    return merged
+
+
+async def count_pools(pool_ids: Iterable[str]) -> int:
+    """Approximate unique traders across one or more pools"""
+    return (await load_merged(pool_sketch(pool_id) for pool_id in pool_ids)).count()
+
+
+class UniqueWalletCounts:
+    """Total, 24h and 7d unique swappers, cached for ``ttl`` seconds"""
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._counts: Optional[Dict[str, int]] = None
+        self._computed_at = 0.0
+
+    async def compute(self) -> Dict[str, int]:
+        now = datetime.now(timezone.utc)
+        total = await load_merged([TOTAL_SKETCH])
+        last_24h = await load_merged(hour_sketch(now - timedelta(hours=h)) for h in range(24))
+        last_7d = await load_merged(day_sketch(now - timedelta(days=d)) for d in range(7))
+        self._counts = {
+            "total_swappers": total.count(),
+            "swappers_24h": last_24h.count(),
+            "swappers_7d": last_7d.count(),
+        }
+        self._computed_at = time.monotonic()
+        return self._counts
+
+    async def get(self) -> Dict[str, int]:
+        if self._counts is None or time.monotonic() - self._computed_at >= self.ttl:
+            return await self.compute()
+        return self._counts
+
+
+unique_wallets = UniqueWalletCounts()
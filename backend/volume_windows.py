@@ -0,0 +1,116 @@
+"""
+Exact rolling 24h volume and transaction counts.
+
+Every swap increments one 5-minute bucket for the protocol ("global") and
+one for its pool in the volume_buckets collection; a TTL index expires
+buckets once they leave the window. Each worker keeps RollingWindow ring
+buffers hydrated from those buckets, and a periodic flush writes the exact
+24h figures back onto pools and the stats document so that listing pools
+and reading stats stay single-query.
+"""
+from database import db
+from rolling_window import BUCKET_SECONDS, WINDOW_BUCKETS, RollingWindow, bucket_epoch
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "global"
+BUCKET_TTL_SECONDS = BUCKET_SECONDS * (WINDOW_BUCKETS + 1)
+
+
+def pool_key(pool_id: str) -> str:
+    return f"pool:{pool_id}"
+
+
+class VolumeWindows:
+    """Ring buffers per key, refreshed from Mongo at most every ``refresh_interval`` seconds"""
+
+    def __init__(self, refresh_interval: float = 60.0):
+        self.refresh_interval = refresh_interval
+        self._windows: Dict[str, RollingWindow] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    async def record(self, pool_id: Optional[str], volume: float, timestamp: Optional[datetime] = None):
+        """Count one swap of `volume` USD in the global window and its pool's window"""
+        ts = (timestamp or datetime.now(timezone.utc)).timestamp()
+        epoch = bucket_epoch(ts)
+        bucket = datetime.fromtimestamp(epoch * BUCKET_SECONDS, tz=timezone.utc)
+        keys = [GLOBAL_KEY] + ([pool_key(pool_id)] if pool_id else [])
+        
+        for key in keys:
+            window = self._windows.get(key)
+            if window is not None:
+                window.add(epoch, volume)
+        
+        await db.volume_buckets.bulk_write([
+            UpdateOne(
+                {"key": key, "epoch": epoch},
+                {"$inc": {"volume": volume, "count": 1}, "$setOnInsert": {"bucket": bucket}},
+                upsert=True
+            )
+            for key in keys
+        ], ordered=False)
+
+    async def _hydrate(self, key: str) -> RollingWindow:
+        now_epoch = bucket_epoch(time.time())
+        buckets = await db.volume_buckets.find(
+            {"key": key, "epoch": {"$gt": now_epoch - WINDOW_BUCKETS}},
+            {"_id": 0, "epoch": 1, "volume": 1, "count": 1}
+        ).to_list(None)
+        window = RollingWindow()
+        for bucket in buckets:
+            window.set(bucket["epoch"], bucket["volume"], bucket["count"])
+        self._windows[key] = window
+        self._loaded_at[key] = time.monotonic()
+        return window
+
+    async def totals(self, key: str = GLOBAL_KEY) -> Tuple[float, int]:
+        """Exact (volume, count) over the last 24h for a key"""
+        window = self._windows.get(key)
+        if window is None or time.monotonic() - self._loaded_at[key] >= self.refresh_interval:
+            window = await self._hydrate(key)
+        return window.totals(bucket_epoch(time.time()))
+
+    async def flush(self) -> int:
+        """Write exact 24h figures onto pools and stats; returns the number of pools changed"""
+        now_epoch = bucket_epoch(time.time())
+        rows = await db.volume_buckets.aggregate([
+            {"$match": {"epoch": {"$gt": now_epoch - WINDOW_BUCKETS, "$lte": now_epoch}}},
+            {"$group": {"_id": "$key", "volume": {"$sum": "$volume"}, "count": {"$sum": "$count"}}}
+        ]).to_list(None)
+        totals = {row["_id"]: row for row in rows}
+        
+        pools = await db.pools.find({}, {"_id": 0, "id": 1, "volume_24h": 1}).to_list(None)
+        updates = []
+        for pool in pools:
+            volume = totals.get(pool_key(pool["id"]), {}).get("volume", 0.0)
+            if abs((pool.get("volume_24h") or 0) - volume) > 1e-9:
+                updates.append(UpdateOne({"id": pool["id"]}, {"$set": {"volume_24h": volume}}))
+        if updates:
+            await db.pools.bulk_write(updates, ordered=False)
+        
+        protocol = totals.get(GLOBAL_KEY, {})
+        await db.stats.update_one({}, {"$set": {
+            "volume_24h": protocol.get("volume", 0.0),
+            "transactions_24h": protocol.get("count", 0)
+        }}, upsert=True)
+        return len(updates)
+
+    async def flush_periodically(self, interval_seconds: float):
+        """Background task running flush() forever"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                changed = await self.flush()
+                if changed:
+                    logger.info(f"Rolling 24h volume updated for {changed} pools")
+            except Exception as e:
+                logger.error(f"Error flushing rolling volume windows: {e}")
+
+
+volume_windows = VolumeWindows()
@@ -1,6 +1,6 @@
 import React, { useState, useMemo, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getTokens, getPools, createToken } from '../services/api';
+import { getTokens, getPools, discoverToken } from '../services/api';
 import { web3Service } from '../services/web3';
 import { useWallet } from '../context/WalletContextV2';
 import { toast } from 'sonner';
@@ -77,47 +77,22 @@ const TokenSelector = ({ open, onOpenChange, onSelect, selectedToken, excludeTok
         return;
       }
 
-      // Try to fetch token info from blockchain
-      const tokenInfo = await web3Service.getTokenInfo(address);
+      // Resolve the address on the backend, which reads the chain once and saves the token
+      const tokenInfo = await discoverToken(address);
       
       if (tokenInfo) {
-        // Generate logo and add additional fields
-        const customToken = {
-          id: `token_${address.slice(0, 8).toLowerCase()}`,
-          ...tokenInfo,
-          logo: `https://api.dicebear.com/7.x/shapes/svg?seed=${tokenInfo.symbol}&backgroundColor=6366f1`,
-          price: 0,
-          priceChange: 0,
-          isCustom: true
-        };
+        const customToken = { ...tokenInfo, isCustom: true };
 
-        // Save the token to the backend database for persistence
-        try {
-          const savedToken = await createToken({
-            id: customToken.id,
-            symbol: tokenInfo.symbol,
-            name: tokenInfo.name,
-            address: tokenInfo.address,
-            decimals: tokenInfo.decimals,
-            logo: customToken.logo,
-            price: 0,
-            priceChange: 0
-          });
-          
-          // Update customToken with saved data (it may have an updated id)
-          customToken.id = savedToken.id || customToken.id;
-          
-          // Add the new token to the local tokens list so it's immediately available
-          setTokens(prevTokens => [...prevTokens, customToken]);
-          
-          toast.success(`Token ${tokenInfo.symbol} discovered and saved!`, {
-            description: `${tokenInfo.name} has been added to the token list.`
-          });
-        } catch (saveError) {
-          // Token might already exist in DB (race condition) - still show it
-          console.warn('Could not save token to database:', saveError);
-          // Don't show error toast - the token can still be used
-        }
+        // Add the new token to the local tokens list so it's immediately available
+        setTokens(prevTokens => (
+          prevTokens.some(t => t.address.toLowerCase() === customToken.address.toLowerCase())
+            ? prevTokens
+            : [...prevTokens, customToken]
+        ));
+        
+        toast.success(`Token ${tokenInfo.symbol} discovered and saved!`, {
+          description: `${tokenInfo.name} has been added to the token list.`
+        });
 
         setCustomTokenInfo(customToken);
 
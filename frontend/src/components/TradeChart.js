@@ -76,6 +76,7 @@ const TradeChart = ({ token0, token1, height = 400 }) => {
       };
       
       const days = daysMap[timeframe] || 30;
+      const interval = timeframe === '1H' ? '5m' : '1d';
       
       // Try to fetch real price history
       let priceData = [];
@@ -83,7 +84,7 @@ const TradeChart = ({ token0, token1, height = 400 }) => {
       let realDataAvailable = false;
       
       try {
-        const history = await getPriceHistory(token0.address, token1.address, days);
+        const history = await getPriceHistory(token0.address, token1.address, days, interval);
         
         if (history.hasRealData && history.candles.length > 0) {
           // Use real data
@@ -97,7 +98,7 @@ const TradeChart = ({ token0, token1, height = 400 }) => {
           }));
           volumeData = history.candles.map(candle => ({
             time: Math.floor(new Date(candle.time).getTime() / 1000),
-            value: candle.volume * 1000,
+            value: candle.volume,
             color: candle.close >= candle.open ? 'rgba(34, 197, 94, 0.5)' : 'rgba(239, 68, 68, 0.5)'
           }));
         } else {
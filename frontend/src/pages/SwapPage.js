@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { ethers } from 'ethers';
 import { useWallet } from '../context/WalletContextV2';
-import { getTokens, getSwapQuote, executeSwap, getTradeHistory } from '../services/api';
+import { getTokens, getSwapQuote, executeSwap, getTradeHistory, subscribeTrades } from '../services/api';
 import { web3Service, CONTRACT_ADDRESSES } from '../services/web3';
 import TokenSelector from '../components/TokenSelector';
 import TradeChart from '../components/TradeChart';
@@ -31,6 +31,19 @@ import {
 } from '../components/ui/popover';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '../components/ui/tabs';
 
+const TRADE_REFRESH_MS = 30000;
+
+const formatTrade = (trade, index) => ({
+  id: trade.id || index,
+  type: trade.token0Amount > 0 ? 'sell' : 'buy',
+  amount: trade.token0Amount.toFixed(4),
+  price: trade.price.toFixed(6),
+  total: (trade.token0Amount * trade.price).toFixed(2),
+  time: trade.timestamp.toLocaleTimeString(),
+  txHash: trade.txHash,
+  isReal: true
+});
+
 const SwapPage = () => {
   const { isConnected, connectWallet, getBalance, isConnecting, address, isCorrectNetwork, switchNetwork } = useWallet();
   
@@ -77,18 +90,7 @@ const SwapPage = () => {
         try {
           const trades = await getTradeHistory(sellToken.address, buyToken.address, 20);
           if (trades.length > 0) {
-            // Format real trades
-            const formattedTrades = trades.map((trade, index) => ({
-              id: trade.id || index,
-              type: trade.token0Amount > 0 ? 'sell' : 'buy',
-              amount: trade.token0Amount.toFixed(4),
-              price: trade.price.toFixed(6),
-              total: (trade.token0Amount * trade.price).toFixed(2),
-              time: trade.timestamp.toLocaleTimeString(),
-              txHash: trade.txHash,
-              isReal: true
-            }));
-            setRecentTrades(formattedTrades);
+            setRecentTrades(trades.map(formatTrade));
           } else {
             // No real trades - show placeholder message
             setRecentTrades([]);
@@ -99,6 +101,19 @@ const SwapPage = () => {
         }
       };
       loadTrades();
+
+      // Push new trades as they happen. Each API worker only pushes the trades it
+      // recorded itself, so the history is also reloaded now and then and after
+      // the stream reconnects.
+      const unsubscribe = subscribeTrades(sellToken.address, buyToken.address, (trade) => {
+        const pushed = formatTrade(trade);
+        setRecentTrades((prev) => [pushed, ...prev.filter((t) => t.id !== pushed.id)].slice(0, 20));
+      }, loadTrades);
+      const refresh = setInterval(loadTrades, TRADE_REFRESH_MS);
+      return () => {
+        unsubscribe();
+        clearInterval(refresh);
+      };
     }
   }, [sellToken, buyToken]);
 
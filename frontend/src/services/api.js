@@ -30,6 +30,21 @@ export const getToken = async (address) => {
   };
 };
 
+// Resolve a pasted address through the backend; null if it isn't an ERC-20 token
+export const discoverToken = async (address) => {
+  try {
+    const response = await apiClient.get(`/tokens/discover/${address.toLowerCase()}`);
+    return {
+      ...response.data,
+      priceChange: response.data.price_change_24h,
+      isNative: response.data.is_native
+    };
+  } catch (error) {
+    if (error.response?.status === 404) return null;
+    throw error;
+  }
+};
+
 export const createToken = async (tokenData) => {
   const response = await apiClient.post('/tokens', {
     id: tokenData.id || `token_${tokenData.address.slice(0, 8)}`,
@@ -154,23 +169,25 @@ export const getPositions = async (walletAddress) => {
   }));
 };
 
-export const addLiquidity = async (poolId, walletAddress, token0Amount, token1Amount, minPrice, maxPrice) => {
+export const addLiquidity = async (poolId, walletAddress, token0Amount, token1Amount, minPrice, maxPrice, txHash = null) => {
   const response = await apiClient.post('/positions/add', {
     pool_id: poolId,
     wallet_address: walletAddress,
     token0_amount: token0Amount,
     token1_amount: token1Amount,
     min_price: minPrice,
-    max_price: maxPrice
+    max_price: maxPrice,
+    tx_hash: txHash
   });
   return response.data;
 };
 
-export const removeLiquidity = async (positionId, walletAddress, percent) => {
+export const removeLiquidity = async (positionId, walletAddress, percent, txHash = null) => {
   const response = await apiClient.post('/positions/remove', {
     position_id: positionId,
     wallet_address: walletAddress,
-    percent
+    percent,
+    tx_hash: txHash
   });
   return response.data;
 };
@@ -205,6 +222,43 @@ export const executeSwap = async (walletAddress, tokenIn, tokenOut, amountIn, am
   return response.data;
 };
 
+// Subscribe to live trades for a token pair; returns an unsubscribe function.
+// onReconnect is called when the stream comes back after dropping, since
+// trades recorded while it was down were never pushed.
+export const subscribeTrades = (token0Address, token1Address, onTrade, onReconnect) => {
+  const token0 = token0Address.toLowerCase();
+  const source = new EventSource(`${API}/stream/${token0Address}/${token1Address}`);
+  let dropped = false;
+  source.addEventListener('error', () => {
+    dropped = true;
+  });
+  source.addEventListener('open', () => {
+    if (dropped && onReconnect) {
+      onReconnect();
+    }
+    dropped = false;
+  });
+  source.addEventListener('trade', (event) => {
+    const trade = JSON.parse(event.data);
+    const sold = trade.token_in_address === token0;
+    const token0Amount = sold ? trade.amount_in : trade.amount_out;
+    const token1Amount = sold ? trade.amount_out : trade.amount_in;
+    onTrade({
+      id: trade.id,
+      type: 'swap',
+      token0Symbol: sold ? trade.token_in_symbol : trade.token_out_symbol,
+      token1Symbol: sold ? trade.token_out_symbol : trade.token_in_symbol,
+      token0Amount,
+      token1Amount,
+      txHash: trade.tx_hash,
+      walletAddress: trade.wallet_address,
+      timestamp: new Date(trade.timestamp),
+      price: token0Amount > 0 ? token1Amount / token0Amount : 0
+    });
+  });
+  return () => source.close();
+};
+
 // Get trade history for a token pair
 export const getTradeHistory = async (token0Address, token1Address, limit = 50) => {
   try {
@@ -228,9 +282,9 @@ export const getTradeHistory = async (token0Address, token1Address, limit = 50)
 };
 
 // Get price history for charting
-export const getPriceHistory = async (token0Address, token1Address, days = 30) => {
+export const getPriceHistory = async (token0Address, token1Address, days = 30, interval = '1d') => {
   try {
-    const response = await apiClient.get(`/swap/price-history/${token0Address}/${token1Address}?days=${days}`);
+    const response = await apiClient.get(`/swap/price-history/${token0Address}/${token1Address}?days=${days}&interval=${interval}`);
     return {
       candles: response.data.candles || [],
       basePrice: response.data.basePrice || 1,